@@ -1,8 +1,12 @@
 from __future__ import absolute_import
 
-from .wiener import deltaW, Ikpw, Jkpw, Iwik, Jwik
-from .integrate import (SDEValueError, itoint, stratint, itoEuler, stratHeun,
-                        itoSRI2, stratSRS2, stratKP2iS, itoMilstein,
-                        numItoMilstein, itoImplicitEuler, itoQuasiImplicitEuler)
+from .wiener import (deltaW, Ikpw, Jkpw, Iwik, Jwik, deltaW2pt, deltaW3pt,
+                     Iweak, PackedIntegrals, deltaWcorr, Icorr, deltaOU,
+                     deltaFBM, poissonJumps, CounterNoise)
+from .integrate import (SDEValueError, SDEProblem, itoint, stratint, itoEuler,
+                        stratHeun, itoSRI2, stratSRS2, stratKP2iS, itoMilstein,
+                        numItoMilstein, itoImplicitEuler, itoQuasiImplicitEuler,
+                        itoSplitStep, itoJumpEuler, itoJumpSRI2,
+                        itoWeakEuler, itoWeakKP2)
 
 __version__ = '0.2.1-dev'
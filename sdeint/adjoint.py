@@ -0,0 +1,242 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Gradients of path functionals with respect to many parameters, by the
+discrete adjoint (reverse mode) of the integration algorithm.
+
+For the system dy = f(y,t,theta)dt + G(y,t,theta)dW and the objective
+  J = phi(y(T)) + integral of r(y, t) dt  (by the trapezoidal rule)
+the adjoint state lambda_n = dJ/dy_n is propagated backwards through the
+steps of itoEuler or itoSRI2, on the same Brownian path, and accumulates
+dJ/dtheta. Each step back needs only vector-Jacobian products of f and G, so
+when these are supplied (as f_vjp and G_vjp) the cost is independent of the
+number p of parameters (compare the forward mode of sdeint.sensitivity, whose
+cost grows with p). Without them, the products are computed by the complex
+step method from d + p evaluations of f and of G at each step, so the cost
+then grows with p after all.
+
+Only the states at every k'th step are kept (checkpoints) during the forward
+pass. In the reverse sweep, the steps of each segment are recomputed from its
+checkpoint, so memory is O(N/k + k), which is O(sqrt(N)) for the default k.
+The noise of each segment is taken again from dW and I, or regenerated on
+demand from a sdeint.CounterNoise, so the noise need not be stored either.
+
+Usage:
+    noise = sdeint.CounterNoise(m, h, seed=1)
+    result = adjoint_gradient(f, G, y0, tspan, theta, terminal=phi,
+                              noise=noise, f_vjp=f_vjp, G_vjp=G_vjp)
+    result['gradient']  # dJ/dtheta, shape (p,)
+"""
+
+from __future__ import absolute_import
+import numpy as np
+from .wiener import CounterNoise
+from .integrate import itoEuler, itoSRI2, SDEValueError, _check_tspan
+
+
+def _complex_step_vjp(fn, eps):
+    """A vector-Jacobian product function for fn(y, t, theta), computed from
+    the full Jacobians by the complex step method (d + p evaluations)"""
+    def vjp(y, t, theta, V):
+        gy = np.empty(len(y))
+        for i in range(len(y)):
+            z = np.array(y, dtype=complex)
+            z[i] += 1j*eps
+            gy[i] = np.sum(V*fn(z, t, theta).imag)/eps
+        gtheta = np.empty(len(theta))
+        for j in range(len(theta)):
+            th = np.array(theta, dtype=complex)
+            th[j] += 1j*eps
+            gtheta[j] = np.sum(V*fn(y, t, th).imag)/eps
+        return (gy, gtheta)
+    return vjp
+
+
+def _complex_step_grad(fn, eps):
+    """The gradient of a scalar function fn(y, *args) by the complex step"""
+    def grad(y, *args):
+        g = np.empty(len(y))
+        for i in range(len(y)):
+            z = np.array(y, dtype=complex)
+            z[i] += 1j*eps
+            g[i] = np.imag(fn(z, *args))/eps
+        return g
+    return grad
+
+
+def _euler_back(f_vjp, G_vjp, y, t, h, dW, theta, lam):
+    """Adjoint of one Euler-Maruyama step y1 = y + f(y)h + G(y)dW. Given
+    lam = dJ/dy1, returns (dJ/dy, the contribution to dJ/dtheta)"""
+    fy, ftheta = f_vjp(y, t, theta, h*lam)
+    Gy, Gtheta = G_vjp(y, t, theta, np.outer(lam, dW))
+    return (lam + fy + Gy, ftheta + Gtheta)
+
+
+def _sri2_back(f, G, f_vjp, G_vjp, y, t, h, dW, I, theta, lam):
+    """Adjoint of one step of the Roessler2010 SRI2 algorithm (as in
+    sdeint.integrate._Roessler2010_SRK2, with G a single function), with the
+    stage values recomputed from y"""
+    sqrth = np.sqrt(h)
+    t1 = t + h
+    m = len(dW)
+    Gn = G(y, t, theta)
+    sum1 = Gn.dot(I)/sqrth
+    H20 = y + h*f(y, t, theta)
+    lam_y = lam.copy()
+    gtheta = 0.0
+    lam_H20 = np.zeros_like(lam)
+    lam_sum1 = np.empty((len(y), m))
+    for k in range(m):
+        V = np.zeros((len(y), m))
+        V[:, k] = 0.5*sqrth*lam
+        a2y, a2theta = G_vjp(H20 + sum1[:, k], t1, theta, V)
+        a3y, a3theta = G_vjp(H20 - sum1[:, k], t1, theta, -V)
+        lam_H20 += a2y + a3y
+        lam_sum1[:, k] = a2y - a3y
+        gtheta = gtheta + a2theta + a3theta
+    fy, ftheta = f_vjp(H20, t1, theta, 0.5*h*lam)
+    lam_H20 += fy
+    gtheta = gtheta + ftheta
+    lam_Gn = np.outer(lam, dW) + lam_sum1.dot(np.transpose(I))/sqrth
+    fy, ftheta = f_vjp(y, t, theta, h*(0.5*lam + lam_H20))
+    Gy, Gtheta = G_vjp(y, t, theta, lam_Gn)
+    lam_y += lam_H20 + fy + Gy
+    return (lam_y, gtheta + ftheta + Gtheta)
+
+
+def adjoint_gradient(f, G, y0, tspan, theta, terminal=None, running=None,
+                     solver=itoEuler, noise=None, dW=None, I=None, path=0,
+                     checkpoint_every=None, f_vjp=None, G_vjp=None,
+                     terminal_grad=None, running_grad=None, eps=1e-20):
+    """The value and gradient of J = terminal(y(T)) + integral of
+    running(y, t) dt along one sample path of dy = f(y,t,theta)dt +
+    G(y,t,theta)dW, by a checkpointed reverse sweep.
+
+    Args:
+      f: callable(y, t, theta) returning (d,) array
+      G: callable(y, t, theta) returning (d, m) array
+      y0: array of shape (d,) giving the initial state
+      tspan (array): The sequence of increasing time points
+      theta: array of shape (p,) giving the parameters
+      terminal (callable(y), optional): the terminal cost, a real number
+      running (callable(y, t), optional): the running cost, a real number
+      solver (optional): sdeint.itoEuler (default) or sdeint.itoSRI2
+      noise (CounterNoise, optional): the replayable noise source, from which
+        the noise of each segment is regenerated. If neither this nor dW is
+        given, a CounterNoise with a random seed is used.
+      dW: optional array of shape (len(tspan)-1, m), instead of noise. This
+        is needed if tspan is not equally spaced.
+      I: optional array of shape (len(tspan)-1, m, m) for itoSRI2
+      path (int, optional): which path of the noise source to use
+      checkpoint_every (int, optional): the number of steps between stored
+        states. Default about sqrt(len(tspan)).
+      f_vjp (callable(y, t, theta, v), optional): returns the vector-Jacobian
+        products (v.f_y, v.f_theta) as arrays of shapes (d,) and (p,)
+      G_vjp (callable(y, t, theta, V), optional): given V of shape (d, m),
+        returns the derivatives of sum(V*G) with respect to y and theta.
+        Without f_vjp and G_vjp, the products are computed by the complex
+        step method at a cost that grows with d + p.
+      terminal_grad, running_grad (callable, optional): the gradients of the
+        costs with respect to y. Default by the complex step method.
+      eps (float, optional): the complex step
+
+    Returns:
+      dict with keys
+        "value": J
+        "gradient": dJ/dtheta, array of shape (p,)
+        "gradient_y0": dJ/dy0, array of shape (d,)
+        "y_final": the state at the final time
+
+    Raises:
+      SDEValueError
+    """
+    if solver not in (itoEuler, itoSRI2):
+        raise SDEValueError('solver must be itoEuler or itoSRI2.')
+    if terminal is None and running is None:
+        raise SDEValueError('Give a terminal or running cost.')
+    y0 = np.asarray(y0, dtype=float)
+    theta = np.asarray(theta, dtype=float)
+    if y0.ndim != 1 or theta.ndim != 1:
+        raise SDEValueError('y0 and theta must be 1-D arrays.')
+    tspan = np.asarray(tspan, dtype=float)
+    N = len(tspan) - 1
+    h = _check_tspan(tspan)
+    m = np.shape(G(y0, tspan[0], theta))[1]
+    if dW is None:
+        if np.ndim(h) != 0:
+            raise SDEValueError('The noise can only be generated for an '
+                                'equally spaced tspan. Otherwise give dW.')
+        if noise is None:
+            noise = CounterNoise(m, h, seed=np.random.randint(2**31 - 1))
+        elif not isinstance(noise, CounterNoise):
+            raise SDEValueError('noise must be a CounterNoise.')
+    elif solver is itoSRI2 and I is None:
+        raise SDEValueError('itoSRI2 needs I as well as dW.')
+    k = checkpoint_every or max(1, int(np.ceil(np.sqrt(N))))
+    if f_vjp is None:
+        f_vjp = _complex_step_vjp(f, eps)
+    if G_vjp is None:
+        G_vjp = _complex_step_vjp(G, eps)
+    if terminal is not None and terminal_grad is None:
+        terminal_grad = _complex_step_grad(terminal, eps)
+    if running is not None and running_grad is None:
+        running_grad = _complex_step_grad(running, eps)
+    ft = lambda y, t: f(y, t, theta)
+    Gt = lambda y, t: G(y, t, theta)
+
+    def segment_noise(a, b):
+        if dW is not None:
+            return (dW[a:b], None if I is None else I[a:b])
+        if solver is itoSRI2:
+            return noise.integrals(a, b, path)
+        return (noise.deltaW(a, b, path), None)
+
+    def run_segment(y, a, b):
+        dWs, Is = segment_noise(a, b)
+        if solver is itoSRI2:
+            y = itoSRI2(ft, Gt, y, tspan[a:b+1], dW=dWs, I=Is)
+        else:
+            y = itoEuler(ft, Gt, y, tspan[a:b+1], dW=dWs)
+        return (y["trajectory"], dWs, Is)
+
+    # forward pass, keeping only the checkpoints:
+    bounds = list(range(0, N, k)) + [N]
+    checkpoints = [y0]
+    for a, b in zip(bounds[:-1], bounds[1:-1]):
+        checkpoints.append(run_segment(checkpoints[-1], a, b)[0][-1])
+    # reverse sweep, recomputing the states of each segment:
+    value = 0.0
+    gradient = np.zeros(len(theta))
+    lam = None
+    for s in range(len(bounds) - 2, -1, -1):
+        a, b = bounds[s], bounds[s+1]
+        ys, dWs, Is = run_segment(checkpoints[s], a, b)
+        if lam is None:
+            lam = np.zeros(len(y0))
+            y_final = ys[-1]
+            if terminal is not None:
+                value += terminal(y_final)
+                lam += terminal_grad(y_final)
+            if running is not None:
+                hN = tspan[N] - tspan[N-1]
+                value += 0.5*hN*running(y_final, tspan[N])
+                lam += 0.5*hN*running_grad(y_final, tspan[N])
+        for n in range(b - 1, a - 1, -1):
+            hn = tspan[n+1] - tspan[n]
+            if solver is itoSRI2:
+                lam, g = _sri2_back(f, G, f_vjp, G_vjp, ys[n-a], tspan[n], hn,
+                                    dWs[n-a], Is[n-a], theta, lam)
+            else:
+                lam, g = _euler_back(f_vjp, G_vjp, ys[n-a], tspan[n], hn,
+                                     dWs[n-a], theta, lam)
+            gradient += g
+            if running is not None:
+                w = 0.5*(hn + (tspan[n] - tspan[n-1] if n > 0 else 0.0))
+                value += w*running(ys[n-a], tspan[n])
+                lam = lam + w*running_grad(ys[n-a], tspan[n])
+    return dict(value=value, gradient=gradient, gradient_y0=lam,
+                y_final=y_final)
@@ -0,0 +1,84 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Projections onto constraint sets, for systems whose exact solution stays on
+a manifold that the numerical solution drifts away from.
+
+Each projection is a function project(y) returning the projected state. It can
+be passed to the integration algorithms as ``project=...`` and is then applied
+after every ``project_every``'th step. All of these act on the last axis of y,
+so they work both for a single state of shape (d,) and for an ensemble of
+states of shape (P, d).
+
+normalize: divide by the Euclidean norm (the same as normalized=True).
+normalize_blocks(sizes): normalize each block of consecutive components.
+normalize_metric(M): divide by the norm sqrt(y^* M y) for a positive definite
+  matrix M.
+project_simplex: Euclidean projection onto the probability simplex
+  {y : y_i >= 0, sum_i y_i == 1}.
+"""
+
+from __future__ import absolute_import
+import numpy as np
+from numpy import linalg as la
+
+
+def normalize(y):
+    """Divide y by its Euclidean norm"""
+    return y/la.norm(y, axis=-1, keepdims=True)
+
+
+def normalize_blocks(sizes):
+    """Generate a projection that normalizes separately each block of
+    consecutive components of the state, e.g. for a product of unit spheres.
+
+    Args:
+      sizes (sequence of int): the length of each block. These must add up to
+        the dimension d of the system.
+
+    Returns:
+      callable project(y)
+    """
+    bounds = np.cumsum([0] + list(sizes))
+    def project(y):
+        out = np.empty_like(y)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            block = y[..., start:end]
+            out[..., start:end] = block/la.norm(block, axis=-1, keepdims=True)
+        return out
+    return project
+
+
+def normalize_metric(M):
+    """Generate a projection that divides the state by its norm with respect
+    to a metric, sqrt(y^* M y).
+
+    Args:
+      M (array of shape (d, d)): Hermitian positive definite matrix
+
+    Returns:
+      callable project(y)
+    """
+    M = np.asarray(M)
+    def project(y):
+        norm2 = np.sum(np.conj(y)*np.dot(y, M.T), axis=-1, keepdims=True)
+        return y/np.sqrt(norm2.real)
+    return project
+
+
+def project_simplex(y):
+    """Euclidean projection of y onto the probability simplex, using the
+    sorting algorithm of Duchi et al. (2008) Efficient projections onto the
+    l1-ball for learning in high dimensions"""
+    d = y.shape[-1]
+    u = -np.sort(-y, axis=-1) # sorted in decreasing order
+    css = np.cumsum(u, axis=-1) - 1.0
+    k = np.arange(1, d + 1)
+    # number of components that stay positive:
+    rho = np.sum(u - css/k > 0, axis=-1, keepdims=True)
+    theta = np.take_along_axis(css, rho - 1, axis=-1)/rho
+    return np.maximum(y - theta, 0.0)
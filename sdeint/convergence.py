@@ -0,0 +1,255 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Empirical convergence studies, to compare the accuracy and cost of the
+integration algorithms on a given problem and choose the cheapest algorithm
+and step size for a required accuracy.
+
+For each sample path, the Wiener increments dW and the repeated integrals I
+are generated once on the finest time grid. The coarser levels use the same
+Brownian path, by combining consecutive steps with coarsen(), so that the
+differences between levels are due to the algorithms and not to sampling.
+
+Usage:
+    problem = SDEProblem(f, G, y0, np.linspace(0.0, 1.0, 1025))
+    results = convergence_study(problem, [itoEuler, itoSRI2],
+                                factors=(4, 8, 16, 32, 64), paths=200)
+    results['itoSRI2']['strong_order']
+    cheapest(results, 1e-3)  # -> (solver name, factor, h)
+"""
+
+from __future__ import absolute_import
+import inspect
+import numpy as np
+import time
+from .wiener import Ikpw, deltaW
+from .integrate import SDEProblem, SDEValueError
+
+# CPU time of the calling thread (Python >= 3.7), else of the whole process
+if hasattr(time, 'thread_time'):
+    _cpu_time = time.thread_time
+elif hasattr(time, 'process_time'):
+    _cpu_time = time.process_time
+else:
+    _cpu_time = time.clock
+
+
+def coarsen(dW, I=None, factor=2):
+    """Combine each run of factor consecutive time steps into one step of the
+    same Brownian path. The increments add, and the repeated integrals over
+    the combined step are
+      I_ij = sum_l I^l_ij + sum_l (W^l_i - W^0_i) dW^l_j
+    where l runs over the substeps and W^l - W^0 is the Wiener increment from
+    the start of the combined step to the start of substep l. This holds for
+    both Ito integrals I and Stratonovich integrals J.
+
+    Args:
+      dW (array of shape (N, m)): Wiener increments, with N divisible by
+        factor
+      I (array of shape (N, m, m), optional): repeated integrals
+      factor (int): how many steps to combine
+
+    Returns:
+      dW of shape (N/factor, m) if I is None, otherwise a tuple (dW, I)
+    """
+    N, m = dW.shape
+    if N % factor != 0:
+        raise SDEValueError('The number of steps %d is not divisible by %d.'
+                            % (N, factor))
+    sub = dW.reshape((N//factor, factor, m))
+    dWc = sub.sum(axis=1)
+    if I is None:
+        return dWc
+    W_before = np.cumsum(sub, axis=1) - sub
+    Ic = (np.asarray(I).reshape((N//factor, factor, m, m)).sum(axis=1) +
+          np.einsum('nli,nlj->nij', W_before, sub))
+    return (dWc, Ic)
+
+
+def _accepts(fn, name):
+    """whether callable fn (a function, functools.partial, decorated function
+    or other callable) has a parameter called name"""
+    try:
+        return name in inspect.signature(fn).parameters
+    except AttributeError:
+        # Python 2 has no inspect.signature
+        try:
+            return name in inspect.getargspec(getattr(fn, 'func', fn)).args
+        except TypeError:
+            return False
+    except (TypeError, ValueError):
+        return False
+
+
+def _run_level(solver, problem, tspan, noise):
+    """Integrate each path at one level. noise is a list of (dW, I, J) per
+    path. Returns (final states, CPU seconds)"""
+    use_I = _accepts(solver, 'I')
+    use_J = _accepts(solver, 'J')
+    finals = []
+    start = _cpu_time()
+    for dW, I, J in noise:
+        kwargs = dict(dW=dW)
+        if use_I:
+            kwargs['I'] = I
+        elif use_J:
+            kwargs['J'] = J
+        y = solver(problem, tspan=tspan, **kwargs)["trajectory"]
+        finals.append(y[-1])
+    return (np.array(finals), _cpu_time() - start)
+
+
+def _peak_memory(solver, problem, tspan, noise):
+    """Peak memory in bytes allocated while integrating one path, or nan
+    if tracemalloc is not available (Python < 3.4)"""
+    try:
+        import tracemalloc
+    except ImportError:
+        return np.nan
+    tracemalloc.start()
+    try:
+        _run_level(solver, problem, tspan, noise[:1])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def convergence_study(problem, solvers, factors=(1, 2, 4, 8, 16), paths=100,
+                      exact=None, weak=None, executor=None, memory=True):
+    """Estimate the strong and weak errors of each algorithm for a range of
+    step sizes, all using the same sample paths of the Wiener process.
+
+    Args:
+      problem (SDEProblem): the system, whose tspan gives the finest time
+        grid. This must be equally spaced, with len(tspan)-1 divisible by
+        each of the factors.
+      solvers: a list of integration functions (e.g. [itoEuler, itoSRI2]), or
+        a dict mapping names to them. Each is called with the problem and the
+        arguments dW and either I or J (if it has such a parameter).
+      factors (sequence of int): coarsening factors. Level k uses the step
+        size factors[k] times that of the fine grid.
+      paths (int): number of sample paths
+      exact (callable(t, W), optional): the exact solution at final time t
+        given the value W (array of shape (m,)) of the Wiener process then.
+        If not given, the reference solution is that of the first solver on
+        the fine grid.
+      weak (callable(y), optional): function of the final state whose
+        expectation is compared to give the weak error. Default the state
+        itself.
+      executor (optional): a concurrent.futures.Executor, such as a
+        ThreadPoolExecutor, in which to run the algorithms and levels
+        concurrently. CPU time is then measured per thread (on Python >= 3.7;
+        before that it is the CPU time of the whole process).
+      memory (bool, optional): whether to measure the peak memory allocated
+        by each algorithm for one path (with tracemalloc, on Python >= 3.4;
+        otherwise the memory is nan).
+
+    Returns:
+      dict mapping each solver name to a dict with keys:
+        'factor', 'h': the coarsening factor and step size of each level
+        'strong_error': root mean square error at the final time
+        'weak_error': error of the mean of weak(y) at the final time
+        'strong_order', 'weak_order': the empirical orders, fitted to these
+        'cpu_time': CPU seconds for all paths at each level
+        'error_per_cpu_second': strong_error/cpu_time at each level
+        'memory': peak bytes allocated for one path at each level
+
+    Raises:
+      SDEValueError
+    """
+    if not isinstance(problem, SDEProblem):
+        raise SDEValueError('convergence_study() needs an SDEProblem.')
+    if problem.paths is not None:
+        raise SDEValueError('The problem must be for a single path.')
+    if not isinstance(solvers, dict):
+        solvers = dict((s.__name__, s) for s in solvers)
+    names = list(solvers)
+    tspan = problem.tspan
+    N = len(tspan) - 1
+    h = problem.h
+    if np.ndim(h) != 0:
+        raise SDEValueError('problem.tspan must be equally spaced.')
+    m = problem.m
+    if weak is None:
+        weak = lambda y: y
+    # the same Brownian paths at every level:
+    fine = []
+    for p in range(paths):
+        dW = deltaW(N, m, h)
+        __, I = Ikpw(dW, h)
+        fine.append((dW, I))
+    levels = []
+    for factor in factors:
+        noise = []
+        for dW, I in fine:
+            dWc, Ic = coarsen(dW, I, factor)
+            Jc = Ic + 0.5*factor*h*np.eye(m)
+            noise.append((dWc, Ic, Jc))
+        levels.append((factor, tspan[::factor], noise))
+    jobs = [(name, k) for name in names for k in range(len(levels))]
+    run = lambda name, k: _run_level(solvers[name], problem, levels[k][1],
+                                     levels[k][2])
+    if executor is None:
+        outputs = [run(name, k) for (name, k) in jobs]
+    else:
+        futures = [executor.submit(run, name, k) for (name, k) in jobs]
+        outputs = [future.result() for future in futures]
+    outputs = dict(zip(jobs, outputs))
+    if exact is not None:
+        W = [dW.sum(axis=0) for dW, I in fine]
+        reference = np.array([exact(tspan[-1], w) for w in W])
+    else:
+        reference = _run_level(solvers[names[0]], problem, tspan,
+                               [(dW, I, I + 0.5*h*np.eye(m))
+                                for dW, I in fine])[0]
+    ref_mean = np.mean([weak(y) for y in reference], axis=0)
+    results = dict()
+    for name in names:
+        r = dict(factor=np.array(factors), h=h*np.array(factors))
+        finals = [outputs[(name, k)][0] for k in range(len(levels))]
+        r['cpu_time'] = np.array([outputs[(name, k)][1]
+                                  for k in range(len(levels))])
+        r['strong_error'] = np.array([
+            np.sqrt(np.mean(np.sum(np.abs(y - reference)**2, axis=-1)))
+            for y in finals])
+        r['weak_error'] = np.array([
+            np.linalg.norm(np.atleast_1d(
+                np.mean([weak(yp) for yp in y], axis=0) - ref_mean))
+            for y in finals])
+        for kind in ('strong', 'weak'):
+            err = r[kind + '_error']
+            ok = err > 0
+            if np.count_nonzero(ok) >= 2:
+                order = np.polyfit(np.log(r['h'][ok]), np.log(err[ok]), 1)[0]
+            else:
+                order = np.nan
+            r[kind + '_order'] = order
+        with np.errstate(divide='ignore'):
+            r['error_per_cpu_second'] = r['strong_error']/r['cpu_time']
+        if memory:
+            r['memory'] = np.array([_peak_memory(solvers[name], problem,
+                                                 level[1], level[2])
+                                    for level in levels])
+        results[name] = r
+    return results
+
+
+def cheapest(results, tol, kind='strong'):
+    """Choose the algorithm and step size with the least CPU time whose error
+    in results (from convergence_study) is at most tol.
+
+    Returns:
+      (name, factor, h), or None if no level reached the tolerance
+    """
+    best = None
+    for name, r in results.items():
+        for k in range(len(r['h'])):
+            if r[kind + '_error'][k] <= tol:
+                if best is None or r['cpu_time'][k] < best[0]:
+                    best = (r['cpu_time'][k], name, r['factor'][k], r['h'][k])
+    return None if best is None else best[1:]
@@ -0,0 +1,175 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Sequential Monte Carlo state estimation (the bootstrap particle filter)
+for a system dy = f(y,t)dt + G(y,t)dW observed at discrete times.
+
+An ensemble of P particles is advanced between observation times by an
+integration algorithm, then weighted by the likelihood of each observation
+and resampled by systematic resampling when the effective sample size drops.
+Observations are processed one at a time as they arrive.
+
+The system is validated once, as an SDEProblem. Each advance then passes only
+the new particle states and times to the algorithm, which records just the
+final states (as a TerminalValue functional, with downsample=None) rather
+than a trajectory. The algorithms that integrate an ensemble (itoEuler,
+stratHeun and itoSplitStep) advance all particles in one loop; any other
+algorithm is applied to each particle in turn.
+
+Usage:
+    pf = ParticleFilter(f, G, particles, t0, loglik, dt=0.01)
+    for t, obs in stream:
+        pf.update(t, obs)
+        pf.mean()  # filtered estimate of the state
+"""
+
+from __future__ import absolute_import
+import numpy as np
+from .integrate import (SDEProblem, SDEValueError, itoEuler, stratHeun,
+                        itoSplitStep)
+
+_ensemble_solvers = (itoEuler, stratHeun, itoSplitStep)
+
+
+def systematic_resample(weights, u=None):
+    """Indices of the particles chosen by systematic resampling, in O(P).
+
+    Particle i is copied floor(P c_i - u) - floor(P c_{i-1} - u) times, where
+    c_i is the cumulative sum of the weights and u is uniform on [0, 1), so
+    that the number of copies differs from P w_i by less than one.
+
+    Args:
+      weights (array of shape (P,)): normalized weights
+      u (float, optional): the uniform random offset. Default random.
+
+    Returns:
+      array of P indices, in increasing order
+    """
+    P = len(weights)
+    if u is None:
+        u = np.random.uniform()
+    c = np.cumsum(weights)
+    c *= 1.0/c[-1]
+    edges = np.floor(P*c - u)
+    counts = np.diff(np.concatenate(([np.floor(-u)], edges))).astype(int)
+    return np.repeat(np.arange(P), counts)
+
+
+class ParticleFilter(object):
+    """The bootstrap particle filter for dy = f(y,t)dt + G(y,t)dW.
+
+    Args:
+      f: callable(y, t) returning (d,) array. For the algorithms that
+        integrate an ensemble, f and G are called with the states of all
+        particles, as for an ensemble y0 of shape (P, d) in itoEuler.
+      G: callable(y, t) returning (d, m) array
+      particles (array of shape (P, d)): the initial particles, samples from
+        the distribution of the state at time t0
+      t0 (float): the initial time
+      loglik (callable(y, obs, t)): the log likelihood of the observation obs
+        at time t given each particle state, as an array of shape (P,)
+      solver (optional): the integration algorithm. Default sdeint.itoEuler.
+      dt (float, optional): the largest step size. Default None takes one
+        step from each observation time to the next.
+      resample_threshold (float, optional): resample when the effective
+        sample size is below this fraction of P. 1.0 resamples every time.
+      **kwargs: other arguments for the solver, e.g. L for itoSplitStep
+
+    Attributes:
+      particles (array of shape (P, d)): the current particles, updated in
+        place
+      logw (array of shape (P,)): normalized log weights
+      t (float): the current time
+      log_likelihood (float): estimate of the log likelihood of all the
+        observations so far
+
+    Raises:
+      SDEValueError
+    """
+    def __init__(self, f, G, particles, t0, loglik, solver=itoEuler, dt=None,
+                 resample_threshold=0.5, **kwargs):
+        self.particles = np.array(particles, dtype=float)
+        if self.particles.ndim != 2:
+            raise SDEValueError('particles should have shape (P, d).')
+        P = self.particles.shape[0]
+        self.t = t0
+        self.loglik = loglik
+        self.solver = solver
+        self.dt = dt
+        self.resample_threshold = resample_threshold
+        self.kwargs = kwargs
+        self.logw = np.full(P, -np.log(P))
+        self.log_likelihood = 0.0
+        self._ensemble = solver in _ensemble_solvers
+        y0 = self.particles if self._ensemble else self.particles[0]
+        self.problem = SDEProblem(f, G, y0, np.array([t0, t0 + 1.0]))
+
+    def advance(self, t1):
+        """Integrate the particles from the current time to t1, in place"""
+        if t1 < self.t:
+            raise SDEValueError('Observations must be in time order.')
+        if t1 == self.t:
+            return
+        n = 1
+        if self.dt is not None:
+            n = max(1, int(np.ceil((t1 - self.t)/self.dt)))
+        tspan = np.linspace(self.t, t1, n + 1)
+        if self._ensemble:
+            self.particles[...] = self._step(self.particles, tspan)
+        else:
+            for i in range(len(self.particles)):
+                self.particles[i] = self._step(self.particles[i], tspan)
+        self.t = t1
+
+    def _step(self, y0, tspan):
+        result = self.solver(self.problem, y0=y0, tspan=tspan,
+                             downsample=None, functionals={'y': 'terminal'},
+                             **self.kwargs)
+        return result["functionals"]['y']
+
+    def ess(self):
+        """The effective sample size 1/sum(w**2)"""
+        return 1.0/np.sum(np.exp(2.0*self.logw))
+
+    def mean(self):
+        """The weighted mean of the particles, the filtered estimate"""
+        return np.exp(self.logw).dot(self.particles)
+
+    def resample(self):
+        """Resample the particles systematically and reset the weights"""
+        idx = systematic_resample(np.exp(self.logw))
+        self.particles[...] = self.particles[idx]
+        self.logw[:] = -np.log(len(self.logw))
+
+    def update(self, t, obs):
+        """Process the observation obs made at time t: advance the particles
+        to t, weight them by the likelihood and resample if needed.
+
+        Returns:
+          the filtered mean at time t
+        """
+        self.advance(t)
+        logw = self.logw + self.loglik(self.particles, obs, t)
+        top = np.max(logw)
+        if not np.isfinite(top):
+            raise SDEValueError('All particles have zero likelihood at t=%g.'
+                                % t)
+        total = top + np.log(np.sum(np.exp(logw - top)))
+        self.log_likelihood += total
+        self.logw[:] = logw - total
+        if self.ess() < self.resample_threshold*len(self.logw):
+            self.resample()
+        return self.mean()
+
+    def run(self, times, observations):
+        """Process a sequence of observations in order.
+
+        Returns:
+          array of shape (len(times), d) giving the filtered means
+        """
+        return np.array([self.update(t, obs) for t, obs in
+                         zip(times, observations)])
@@ -0,0 +1,145 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Path functionals that are accumulated during integration, so that the
+trajectory does not need to be stored to compute them afterwards.
+
+Pass a dictionary of them to an integration algorithm as
+``functionals={name: functional}``. The result dictionary then has an entry
+"functionals" holding the value of each one by name. With
+``downsample=None`` the trajectory itself is not recorded at all.
+
+Each functional applies to g(y, t), which defaults to the state y itself. For
+an ensemble of paths (y0 of shape (P, d)), g receives the states of all paths
+and the functional has a value for each path.
+
+TimeIntegral(g): integral of g over time, by the trapezoidal rule
+TimeAverage(g): time average of g, e.g. for Asian averages
+RunningMax(g): maximum of g over the time points of the steps
+RunningMin(g): minimum of g over the time points of the steps
+TerminalValue(g): g at the final time (or when a terminal event stopped it)
+Reducer(step, init, finish): any other accumulation, given as functions
+
+The strings 'integral', 'average', 'max', 'min' and 'terminal' may be given
+instead, to apply these to the state y.
+"""
+
+from __future__ import absolute_import
+import abc
+import numpy as np
+
+
+class Functional(abc.ABCMeta('_ABC', (object,), {})):
+    """Abstract base class of the path functionals. Subclasses must define
+    step(), and may override start() and value().
+
+    Args:
+      g (callable(y, t), optional): the function of the state to accumulate.
+        Default None uses the state y itself.
+    """
+    def __init__(self, g=None):
+        self.g = g
+
+    def _eval(self, y, t):
+        if self.g is None:
+            return np.array(y)
+        return np.array(self.g(y, t))
+
+    def start(self, y0, t0):
+        """Begin accumulating, from state y0 at time t0"""
+        self.acc = self._eval(y0, t0)
+
+    @abc.abstractmethod
+    def step(self, tn, tn1, Yn1, rows=Ellipsis):
+        """Accumulate the step from tn to tn1 that ended at state Yn1. For an
+        ensemble in which some paths have stopped, rows gives the indices of
+        the paths that were stepped and Yn1 holds only those."""
+
+    def value(self):
+        """The value of the functional, after integration has finished"""
+        return self.acc
+
+
+class TimeIntegral(Functional):
+    """The integral over time of g(y, t), by the trapezoidal rule on the
+    time points of the steps"""
+    def start(self, y0, t0):
+        self.g_prev = self._eval(y0, t0)
+        self.acc = np.zeros_like(self.g_prev, dtype=np.result_type(
+            self.g_prev, float))
+
+    def step(self, tn, tn1, Yn1, rows=Ellipsis):
+        g_new = self._eval(Yn1, tn1)
+        self.acc[rows] += 0.5*(tn1 - tn)*(self.g_prev[rows] + g_new)
+        self.g_prev[rows] = g_new
+
+
+class TimeAverage(TimeIntegral):
+    """The time average of g(y, t) over the interval of integration (for an
+    ensemble path stopped by an event, over its own interval)"""
+    def start(self, y0, t0):
+        super(TimeAverage, self).start(y0, t0)
+        self.duration = np.zeros(self.acc.shape)
+
+    def step(self, tn, tn1, Yn1, rows=Ellipsis):
+        super(TimeAverage, self).step(tn, tn1, Yn1, rows)
+        self.duration[rows] += tn1 - tn
+
+    def value(self):
+        return self.acc/self.duration
+
+
+class RunningMax(Functional):
+    """The maximum of g(y, t) over the time points of the steps"""
+    def step(self, tn, tn1, Yn1, rows=Ellipsis):
+        self.acc[rows] = np.maximum(self.acc[rows], self._eval(Yn1, tn1))
+
+
+class RunningMin(Functional):
+    """The minimum of g(y, t) over the time points of the steps"""
+    def step(self, tn, tn1, Yn1, rows=Ellipsis):
+        self.acc[rows] = np.minimum(self.acc[rows], self._eval(Yn1, tn1))
+
+
+class TerminalValue(Functional):
+    """The value of g(y, t) at the last time point reached"""
+    def step(self, tn, tn1, Yn1, rows=Ellipsis):
+        self.acc[rows] = self._eval(Yn1, tn1)
+
+
+class Reducer(Functional):
+    """A user defined accumulation.
+
+    Args:
+      step (callable(acc, tn, tn1, y, rows)): returns the new accumulated
+        value after the step from tn to tn1 that ended at state y. For an
+        ensemble, rows is Ellipsis or the indices of the paths still being
+        stepped, and y holds only those paths.
+      init (callable(y0, t0)): returns the initial accumulated value
+      finish (callable(acc), optional): returns the value of the functional
+        from the final accumulated value
+    """
+    def __init__(self, step, init, finish=None):
+        super(Reducer, self).__init__()
+        self._step = step
+        self._init = init
+        self._finish = finish
+
+    def start(self, y0, t0):
+        self.acc = self._init(y0, t0)
+
+    def step(self, tn, tn1, Yn1, rows=Ellipsis):
+        self.acc = self._step(self.acc, tn, tn1, Yn1, rows)
+
+    def value(self):
+        if self._finish is None:
+            return self.acc
+        return self._finish(self.acc)
+
+
+by_name = {'integral': TimeIntegral, 'average': TimeAverage,
+           'max': RunningMax, 'min': RunningMin, 'terminal': TerminalValue}
@@ -13,7 +13,7 @@ Usage:
     stratint(f, G, y0, tspan)  for Stratonovich equation dy = f dt + G \circ dW
 
     y0 is the initial value
-    tspan is an array of time values (currently these must be equally spaced)
+    tspan is an array of increasing time values (need not be equally spaced)
     function f is the deterministic part of the system (scalar or  dx1  vector)
     function G is the stochastic part of the system (scalar or  d x m matrix)
 
@@ -27,10 +27,26 @@ stratSRS2: the Roessler2010 order 1.0 strong Stochastic Runge-Kutta
   algorithm SRS2 for Stratonovich equations.
 stratKP2iS: the Kloeden and Platen two-step implicit order 1.0 strong algorithm
   for Stratonovich equations.
+itoSplitStep: linearly implicit (IMEX) or exponential Euler-Maruyama schemes
+  for Ito equations with a stiff linear part dy = (L y + f)dt + G dW.
+itoJumpEuler: the jump-adapted Euler-Maruyama algorithm for Ito jump-diffusion
+  equations dy = f dt + G dW + c dN.
+itoJumpSRI2: the jump-adapted order 1.0 strong algorithm for Ito
+  jump-diffusion equations.
+
+For expectations only (weak convergence) there are also:
+
+itoWeakEuler: the simplified weak Euler scheme for Ito equations.
+itoWeakKP2: the Kloeden and Platen derivative-free weak order 2.0 algorithm for
+  Ito equations.
 """
 
 from __future__ import absolute_import
 from .wiener import deltaW, Ikpw, Iwik, Jkpw, Jwik
+from .wiener import deltaW2pt, deltaW3pt, Iweak, PackedIntegrals
+from .wiener import poissonJumps
+from .constraints import normalize
+from .functionals import Functional, by_name
 import numpy as np
 import numbers
 from numpy import linalg as la
@@ -78,78 +94,164 @@ class SDEValueError(Error):
     pass
 
 
-def _check_args(f, G, y0, tspan, dW=None, IJ=None, H=None):
-    """Do some validation common to all algorithms. Find dimension d and number
-    of Wiener processes m.
+def _check_tspan(tspan):
+    """Check the sequence of time points, computing the time steps only once.
+
+    Returns:
+      h: the step size (float) if the time points are equally spaced, or else
+        an array of shape (len(tspan)-1,) giving the size of each step.
+    """
+    steps = np.diff(tspan)
+    if len(steps) == 0:
+        raise SDEValueError('tspan must contain at least two time points.')
+    hmin = steps.min()
+    hmax = steps.max()
+    if not hmin > 0:
+        raise SDEValueError('The time points in tspan must be increasing.')
+    if np.isclose(hmin, hmax, rtol=1e-5, atol=0.0):
+        return (tspan[-1] - tspan[0])/len(steps)
+    else:
+        return steps
+
+
+class SDEProblem(object):
+    """An SDE system dy = f(y,t)dt + G(y,t)dW with its initial value and the
+    time points at which to solve, validated once so that it can be integrated
+    many times without repeating the checks.
+
+    An SDEProblem can be passed to any of the integration functions in place
+    of the argument f, leaving out G, y0 and tspan, e.g.
+        problem = SDEProblem(f, G, y0, tspan)
+        for i in range(1000):
+            result = itoSRI2(problem)
+    A different y0 or tspan can still be given to override those stored in the
+    problem. Then only that argument is checked.
+
+    Args:
+      f: callable(y, t) returning (d,) array
+         Vector-valued function to define the deterministic part of the system
+      G: callable(y, t) returning (d,m) array, or a list of m callables
+         each returning a column of G with shape (d,)
+      y0: array of shape (d,) (or a scalar) giving the initial state. Or an
+         array of shape (P, d) giving initial states for an ensemble of P
+         sample paths to be integrated together. In that case f, G (and H)
+         are called with an array of shape (P, d) and must return arrays of
+         shape (P, d), (P, d, m) (and (P, d, m, m)) giving the values for
+         every path.
+      tspan (array): The sequence of increasing time points
+      H: optional callable(y, t) returning (d,m,m) array, giving the Milstein
+         correction term (see itoMilstein)
+      m (int, optional): the number of independent Wiener processes. If given,
+        the shapes are taken as declared and f, G and H are not called to
+        check them. (For a scalar equation f and G must then return scalars.)
+      scalar (bool, optional): declares an ensemble of a scalar equation,
+        given by y0 of shape (P,) with f and G acting elementwise on arrays
+        of shape (P,). It is integrated as an ensemble with d = m = 1.
+
+    Attributes:
+      f, G, H, y0, tspan: as above, with scalar equations already converted to
+        1D vector systems.
+      d (int): dimension of the system
+      m (int): number of independent Wiener processes
+      paths (int): number of sample paths P of an ensemble, or None if y0
+        is a single state.
+      h: the time step size (float), or an array giving the size of each
+        step if the time points in tspan are not equally spaced.
+
+    Raises:
+      SDEValueError
     """
-    if not np.isclose(min(np.diff(tspan)), max(np.diff(tspan))):
-        raise SDEValueError('Currently time steps must be equally spaced.')
-    # Be flexible to allow scalar equations. convert them to a 1D vector system
-    if isinstance(y0, numbers.Number):
-        if isinstance(y0, numbers.Integral):
-            numtype = np.float64
+    def __init__(self, f, G, y0, tspan, H=None, m=None, scalar=False):
+        h = _check_tspan(tspan)
+        declared = m is not None
+        # the functions as given, if this is a scalar equation that can use
+        # the scalar engine:
+        self._scalar = None
+        # Be flexible to allow scalar equations. convert them to a 1D vector
+        # system
+        if isinstance(y0, numbers.Number):
+            y0_orig = y0
+            y0 = _scalar_to_vector(y0)
+            scalar_f = declared or isinstance(f(y0_orig, tspan[0]),
+                                              numbers.Number)
+            if scalar_f:
+                f = _make_vector_fn(f)
+            if callable(G) and (declared or isinstance(G(y0_orig, tspan[0]),
+                                                       numbers.Number)):
+                if scalar_f and H is None:
+                    self._scalar = (f.__wrapped__, G)
+                G = _make_matrix_fn(G)
+        elif scalar:
+            y0 = _as_state(y0)
+            if y0.ndim != 1 or not callable(G) or H is not None:
+                raise SDEValueError('For an ensemble of a scalar equation, y0 '
+                                    'must have shape (P,) and G be a single '
+                                    'function.')
+            self._scalar = (f, G)
+            y0 = y0.reshape((-1, 1))
+            f = _make_ensemble_vector_fn(f)
+            G = _make_ensemble_matrix_fn(G)
+        else:
+            y0 = _as_state(y0)
+        # determine dimension d of the system
+        if np.ndim(y0) == 2:
+            paths, d = np.shape(y0)
         else:
-            numtype = type(y0)
-        y0_orig = y0
-        y0 = np.array([y0], dtype=numtype)
-        def make_vector_fn(fn):
-            def newfn(y, t):
-                return np.array([fn(y[0], t)])
-            newfn.__name__ = fn.__name__
-            return newfn
-        def make_matrix_fn(fn):
-            def newfn(y, t):
-                return np.array([[fn(y[0], t)]])
-            newfn.__name__ = fn.__name__
-            return newfn
-        if isinstance(f(y0_orig, tspan[0]), numbers.Number):
-            f = make_vector_fn(f)
-        if isinstance(G(y0_orig, tspan[0]), numbers.Number):
-            G = make_matrix_fn(G)
-    # determine dimension d of the system
-    d = len(y0)
-    if len(f(y0, tspan[0])) != d:
-        raise SDEValueError('y0 and f have incompatible shapes.')
-    message = """y0 has length %d. So G must either be a single function
+            paths, d = None, len(y0)
+        message = """y0 has length %d. So G must either be a single function
               returning a matrix of shape (%d, m), or else a list of m separate
               functions each returning a column of G, with shape (%d,)""" % (
                   d, d, d)
-    if callable(G):
-        # then G must be a function returning a d x m matrix
-        Gtest = G(y0, tspan[0])
-        if Gtest.ndim != 2 or Gtest.shape[0] != d:
-            raise SDEValueError(message)
-        # determine number of independent Wiener processes m
-        m = Gtest.shape[1]
-    else:
-        # G should be a list of m functions g_i giving columns of G
-        G = tuple(G)
-        m = len(G)
-        Gtest = np.zeros((d, m))
-        for k in range(0, m):
-            if not callable(G[k]):
+        if not callable(G):
+            # G should be a list of m functions g_i giving columns of G
+            G = tuple(G)
+            for g in G:
+                if not callable(g):
+                    raise SDEValueError(message)
+            if declared and m != len(G):
                 raise SDEValueError(message)
-            Gtestk = G[k](y0, tspan[0])
-            if np.shape(Gtestk) != (d,):
+            m = len(G)
+        if H is not None and not callable(H):
+            raise NotImplementedError("Currently H must be callable if used.")
+        if not declared:
+            m = self._probe(f, G, H, y0, tspan[0], d, message)
+        self.f = f
+        self.G = G
+        self.H = H
+        self.y0 = y0
+        self.tspan = tspan
+        self.d = d
+        self.m = m
+        self.paths = paths
+        self.h = h
+
+    @staticmethod
+    def _probe(f, G, H, y0, t0, d, message):
+        """Call f, G and H once to check their shapes. Returns m"""
+        ys = np.shape(y0) # (d,) or (P, d) for an ensemble
+        ftest = f(y0, t0)
+        if len(ftest) != ys[0] or (len(ys) == 2 and np.shape(ftest) != ys):
+            raise SDEValueError('y0 and f have incompatible shapes.')
+        if callable(G):
+            # then G must be a function returning a d x m matrix
+            Gtest = G(y0, t0)
+            if len(Gtest.shape) != len(ys) + 1 or Gtest.shape[:-1] != ys:
                 raise SDEValueError(message)
-            Gtest[:,k] = Gtestk
-    message = """From function G, it seems m==%d. If present, the optional
-              parameter dW must be an array of shape (len(tspan)-1, m) giving
-              m independent Wiener increments for each time interval.""" % m
-    if dW is not None:
-        if not hasattr(dW, 'shape') or dW.shape != (len(tspan) - 1, m):
-            raise SDEValueError(message)
-    message = """From function G, it seems m==%d. If present, the optional
-              parameter I or J must be an array of shape (len(tspan)-1, m, m)
-              giving an m x m matrix of repeated integral values for each
-              time interval.""" % m
-    if IJ is not None:
-        if not hasattr(IJ, 'shape') or IJ.shape != (len(tspan) - 1, m, m):
-            raise SDEValueError(message)
-    if H is not None:
-        if callable(H):
+            # determine number of independent Wiener processes m
+            m = Gtest.shape[-1]
+        else:
+            m = len(G)
+            for k in range(0, m):
+                if np.shape(G[k](y0, t0)) != ys:
+                    raise SDEValueError(message)
+        if H is not None:
             # then H must be a function returning a d x m x m tensor
-            Htest = H(y0, tspan[0])
+            Htest = H(y0, t0)
+            if len(ys) == 2:
+                if Htest.shape[0] != ys[0]:
+                    raise SDEValueError('H must return an array of shape '
+                                        '(P, d, m, m) for an ensemble.')
+                Htest = Htest[0]
             if Htest.shape[0] != d:
                 raise SDEValueError("""y0 has length %d, but this does not match
                     the first dimension of H(y0, tspan[0]).""" % d)
@@ -159,32 +261,581 @@ def _check_args(f, G, y0, tspan, dW=None, IJ=None, H=None):
             if Htest.shape[1] != m:
                 raise SDEValueError("""The last two dimensions of H match,
                     but are not equal to m==%d, the second dimension of G""" % d)
+        return m
+
+    def _check_y0(self, y0):
+        """Check a new initial value against the dimension of the problem"""
+        if isinstance(y0, numbers.Number):
+            y0 = _scalar_to_vector(y0)
         else:
-            raise NotImplementedError("Currently H must be callable if used.")
-    return (d, m, f, G, y0, tspan, dW, IJ)
+            y0 = _as_state(y0)
+        if np.shape(y0) != np.shape(self.y0):
+            raise SDEValueError('y0 should have shape %s' % (
+                np.shape(self.y0),))
+        return y0
+
+
+def _scalar_to_vector(y0):
+    """Convert a scalar initial value to an array of shape (1,)"""
+    if isinstance(y0, numbers.Integral):
+        numtype = np.float64
+    else:
+        numtype = type(y0)
+    return np.array([y0], dtype=numtype)
+
+
+def _as_state(y0):
+    """Convert an initial value given as a sequence to an array, with
+    integers converted to floating point as for a scalar"""
+    y0 = np.asarray(y0)
+    if np.issubdtype(y0.dtype, np.integer):
+        y0 = y0.astype(np.float64)
+    return y0
+
+
+def _make_vector_fn(fn):
+    """Wrap scalar function fn(y, t) to act on arrays of shape (1,)"""
+    def newfn(y, t, out=None):
+        if out is not None:
+            out[0] = fn(y[0], t)
+            return out
+        return np.array([fn(y[0], t)])
+    newfn.__name__ = fn.__name__
+    newfn.__wrapped__ = fn
+    return newfn
+
+
+def _make_ensemble_vector_fn(fn):
+    """Wrap elementwise scalar function fn(y, t) to act on an ensemble of
+    states of shape (P, 1)"""
+    def newfn(y, t):
+        return np.reshape(fn(y[:, 0], t), (-1, 1))
+    newfn.__name__ = fn.__name__
+    return newfn
+
+
+def _make_ensemble_matrix_fn(fn):
+    """Wrap elementwise scalar function fn(y, t) to return arrays of shape
+    (P, 1, 1) for an ensemble of states of shape (P, 1)"""
+    def newfn(y, t):
+        return np.reshape(fn(y[:, 0], t), (-1, 1, 1))
+    newfn.__name__ = fn.__name__
+    return newfn
+
+
+def _make_matrix_fn(fn):
+    """Wrap scalar function fn(y, t) to return arrays of shape (1, 1)"""
+    def newfn(y, t, out=None):
+        if out is not None:
+            out[0, 0] = fn(y[0], t)
+            return out
+        return np.array([[fn(y[0], t)]])
+    newfn.__name__ = fn.__name__
+    return newfn
+
+
+def _check_args(f, G, y0, tspan, dW=None, IJ=None, H=None, ensemble=False):
+    """Do some validation common to all algorithms. Find dimension d and number
+    of Wiener processes m. If f is an SDEProblem, the system has already been
+    validated so only the remaining arguments are checked. Set ensemble=True
+    if the algorithm can integrate an ensemble of paths given by y0 of shape
+    (P, d).
+    """
+    if isinstance(f, SDEProblem):
+        problem = f
+        if G is not None:
+            raise SDEValueError('G cannot be given when the first argument is '
+                                'an SDEProblem, which already holds G.')
+        y0 = problem.y0 if y0 is None else problem._check_y0(y0)
+        if tspan is None:
+            tspan = problem.tspan
+        else:
+            _check_tspan(tspan)
+    else:
+        if G is None or y0 is None or tspan is None:
+            raise SDEValueError('G, y0 and tspan must be given, unless the '
+                                'first argument is an SDEProblem.')
+        problem = SDEProblem(f, G, y0, tspan, H)
+        y0 = problem.y0
+    d = problem.d
+    m = problem.m
+    if problem.paths is None:
+        paths = ()
+    elif ensemble:
+        paths = (problem.paths,)
+    else:
+        raise SDEValueError('This algorithm does not integrate an ensemble of '
+                            'paths: y0 must have shape (d,).')
+    message = """From function G, it seems m==%d. If present, the optional
+              parameter dW must be an array of shape (len(tspan)-1, m) giving
+              m independent Wiener increments for each time interval (or
+              shape (len(tspan)-1, P, m) for an ensemble of P paths).""" % m
+    if dW is not None:
+        if not hasattr(dW, 'shape') or dW.shape != (len(tspan)-1,) + paths + (m,):
+            raise SDEValueError(message)
+    message = """From function G, it seems m==%d. If present, the optional
+              parameter I or J must be an array of shape (len(tspan)-1, m, m)
+              giving an m x m matrix of repeated integral values for each
+              time interval.""" % m
+    if IJ is not None:
+        if not hasattr(IJ, 'shape') or IJ.shape != (len(tspan)-1,) + paths + (m, m):
+            raise SDEValueError(message)
+    return (d, m, problem.f, problem.G, y0, tspan, dW, IJ)
+
+
+def _Gmatrix(G):
+    """Return a function giving the whole d x m matrix G(y, t), whether G was
+    given as a single function or as a list of m functions for the columns"""
+    if callable(G):
+        return G
+    def Gmat(y, t):
+        return np.stack([g(y, t) for g in G], axis=-1)
+    return Gmat
+
+
+def _check_project(normalized, project, project_every):
+    """Return the projection to apply after every project_every'th step, or
+    None. normalized=True is short for project=normalize."""
+    if project_every < 1 or int(project_every) != project_every:
+        raise SDEValueError('project_every must be a positive integer.')
+    if project is None and normalized:
+        project = normalize
+    if project is not None and not callable(project):
+        raise SDEValueError('project must be a function project(y).')
+    return project
+
+
+def _solve_implicit(F, y_guess, rtol, root_method='hybr'):
+    """Solve the implicit equation F(y) == 0 for y, starting from y_guess.
+
+    By default this uses MINPACK's HYBRD algorithm, as scipy.optimize.fsolve.
+    Other methods of scipy.optimize.root can be chosen, e.g. 'krylov' for a
+    Newton-Krylov method that does not form the d x d Jacobian, when d is
+    large. A complex equation is solved as a real system for the real and
+    imaginary parts, so F need not be holomorphic.
+
+    Returns:
+      (y, success, message)
+    """
+    from scipy.optimize import root
+    if np.iscomplexobj(y_guess):
+        y_guess = np.ascontiguousarray(y_guess, dtype=np.complex128)
+        def Freal(x):
+            y = np.ascontiguousarray(x).view(np.complex128)
+            return np.ascontiguousarray(F(y), dtype=np.complex128).view(
+                np.float64)
+        sol = root(Freal, y_guess.view(np.float64), method=root_method,
+                   tol=rtol)
+        y = np.ascontiguousarray(sol.x).view(np.complex128)
+    else:
+        sol = root(F, y_guess, method=root_method, tol=rtol)
+        y = sol.x
+    return (y, sol.success, sol.message)
+
+
+def _generate_dW(N, m, h, paths=None):
+    """Generate Wiener increments for N steps, with shape (N, m), or with shape
+    (N, paths, m) for an ensemble"""
+    if paths is None:
+        return deltaW(N, m, h)
+    return deltaW(N, paths*m, h).reshape((N, paths, m))
+
+
+def _matvec(A, x):
+    """Product of matrix A with vector x, or of each of a stack of matrices
+    with the corresponding vector (for an ensemble). A that is not an array
+    is taken to be a matrix-free operator providing A.dot(x)"""
+    if not isinstance(A, np.ndarray) or A.ndim == 2:
+        return A.dot(x)
+    return np.einsum('...ij,...j->...i', A, x)
+
+
+def _run_columns(executor, jobs, t, inplace=False):
+    """Evaluate column functions concurrently in executor. Each job is a tuple
+    (g, y, out, k) meaning out[:,k] = g(y, t)"""
+    if inplace:
+        futures = [executor.submit(g, y, t, out[:,k]) for (g, y, out, k) in jobs]
+        for future in futures:
+            future.result()
+    else:
+        futures = [executor.submit(g, y, t) for (g, y, out, k) in jobs]
+        for (g, y, out, k), future in zip(jobs, futures):
+            out[:,k] = future.result()
+
+
+class _Events(object):
+    """Locates events during the step loop of a solver.
+
+    Each event function g(y, t) returns a float (or for an ensemble, an array
+    of shape (P,) giving a value for each path). An event occurs where g
+    changes sign. As in scipy.integrate.solve_ivp, g may have the attributes:
+      terminal (bool): if True, integration stops at the first occurrence.
+        For an ensemble, only the paths on which the event occurred are
+        stopped, and the others continue until all of them have stopped.
+      direction (float): if positive, the event is only triggered when g
+        goes from negative to positive. If negative, only from positive to
+        negative. If 0 (the default), in either direction.
+    The time and state of the event are found by linear interpolation within
+    the step in which g changed sign.
+
+    Args:
+      events: callable g(y, t), or a list of them
+      y0 (array): the initial state, of shape (d,) or (P, d)
+      t0 (float): the initial time
+    """
+    def __init__(self, events, y0, t0):
+        if callable(events):
+            events = [events]
+        self.events = list(events)
+        self.terminal = [bool(getattr(g, 'terminal', False))
+                         for g in self.events]
+        self.direction = [float(getattr(g, 'direction', 0))
+                          for g in self.events]
+        self.ensemble = (np.ndim(y0) == 2)
+        self.gvalues = [np.array(g(y0, t0), dtype=float) for g in self.events]
+        self.t_events = [[] for g in self.events]
+        self.y_events = [[] for g in self.events]
+        self.path_events = [[] for g in self.events]
+        if self.ensemble:
+            self.done = np.zeros(len(y0), dtype=bool)
+
+    def check(self, tn, tn1, Yn, Yn1, active=None):
+        """Check for events in the step from (tn, Yn) to (tn1, Yn1). For an
+        ensemble in which some paths have stopped, active gives the indices of
+        the paths that were stepped. Returns True if integration should stop.
+        """
+        stop = False
+        if active is not None:
+            Yn = Yn[active]
+            Yn1 = Yn1[active]
+        for i, g in enumerate(self.events):
+            g_new = np.array(g(Yn1, tn1), dtype=float)
+            if active is None:
+                g_old = self.gvalues[i]
+                self.gvalues[i] = g_new
+            else:
+                g_old = self.gvalues[i][active]
+                self.gvalues[i][active] = g_new
+            up = (g_old < 0) & (g_new >= 0)
+            down = (g_old > 0) & (g_new <= 0)
+            if self.direction[i] > 0:
+                hit = up
+            elif self.direction[i] < 0:
+                hit = down
+            else:
+                hit = up | down
+            if not np.any(hit):
+                continue
+            if not self.ensemble:
+                theta = g_old/(g_old - g_new)
+                self.t_events[i].append(tn + theta*(tn1 - tn))
+                self.y_events[i].append(Yn + theta*(Yn1 - Yn))
+                stop = stop or self.terminal[i]
+                continue
+            idx = np.nonzero(hit)[0]
+            theta = g_old[idx]/(g_old[idx] - g_new[idx])
+            self.t_events[i].append(tn + theta*(tn1 - tn))
+            self.y_events[i].append(Yn[idx] + theta[:,np.newaxis]*(
+                Yn1[idx] - Yn[idx]))
+            self.path_events[i].append(idx if active is None else active[idx])
+            if self.terminal[i]:
+                self.done[self.path_events[i][-1]] = True
+        if self.ensemble:
+            stop = self.done.all()
+        return stop
+
+    def active(self):
+        """Indices of the paths of an ensemble that have not yet stopped, or
+        None if all of them are still going"""
+        if not self.ensemble or not self.done.any():
+            return None
+        return np.nonzero(~self.done)[0]
+
+    def update(self, result, d):
+        """Add the event times and states to the result dictionary"""
+        if self.ensemble:
+            join = lambda a, shape: (np.concatenate(a) if a else
+                                     np.zeros(shape))
+            result["t_events"] = [join(t, (0,)) for t in self.t_events]
+            result["y_events"] = [join(y, (0, d)) for y in self.y_events]
+            result["path_events"] = [join(p, (0,)).astype(int)
+                                     for p in self.path_events]
+        else:
+            result["t_events"] = [np.array(t) for t in self.t_events]
+            result["y_events"] = [np.array(y).reshape((-1, d))
+                                  for y in self.y_events]
+        return result
+
 
+class _Recorder(object):
+    """Stores the values that a solver returns, as the step loop proceeds.
 
-def itoint(f, G, y0, tspan, normalized=False):
+    By default the state is kept at every downsample'th time point of tspan.
+    If t_eval is given, the output times are decoupled from the steps: the
+    state at each time in t_eval is filled in when the step containing it has
+    been taken, by interpolating with a Brownian bridge conditioned on the
+    Wiener increment of that step. For t in (t_n, t_{n+1}] with s = t - t_n,
+      y(t) = y_n + (s/h)(y_{n+1} - y_n) + G(y_n, t_n).(W(s) - (s/h) dW_n)
+    where W(s) is sampled given W(0) = 0 and W(h) = dW_n. So the fine solution
+    never needs to be stored.
+
+    Path functionals (see module sdeint.functionals) are accumulated at every
+    step. With downsample None (and no t_eval), only they are kept and the
+    trajectory is not recorded.
+
+    Args:
+      tspan (array): the time points of the steps
+      y0 (array): the initial state
+      downsample (int or None): keep every downsample'th step (if t_eval is
+        None)
+      t_eval (array, optional): increasing output times within the interval
+        [tspan[0], tspan[-1]]
+      G (callable, optional): the noise coefficient function, needed only for
+        interpolation with t_eval
+      functionals (dict, optional): maps names to Functional instances or to
+        the names of the built-in ones, e.g. {'peak': 'max'}
+
+    Raises:
+      SDEValueError
+    """
+    def __init__(self, tspan, y0, downsample=1, t_eval=None, G=None,
+                 functionals=None):
+        self.tspan = tspan
+        self.downsample = downsample
+        self.t_eval = t_eval
+        self.functionals = dict()
+        for name, spec in (functionals or dict()).items():
+            if not isinstance(spec, Functional):
+                if spec not in by_name:
+                    raise SDEValueError(
+                        'Unknown functional %r. Use an instance of '
+                        'sdeint.functionals.Functional or one of %s.' %
+                        (spec, sorted(by_name)))
+                spec = by_name[spec]()
+            spec.start(y0, tspan[0])
+            self.functionals[name] = spec
+        if t_eval is None and downsample is None:
+            if not self.functionals:
+                raise SDEValueError('downsample=None records nothing unless '
+                                    'functionals are given.')
+            self.y = None
+            return
+        if t_eval is None:
+            N_record = (len(tspan) - 1)//downsample + 1
+        else:
+            t_eval = np.asarray(t_eval)
+            if (t_eval.ndim != 1 or np.any(np.diff(t_eval) < 0) or
+                    len(t_eval) == 0 or t_eval[0] < tspan[0] or
+                    t_eval[-1] > tspan[-1]):
+                raise SDEValueError('t_eval must be an increasing sequence of '
+                                    'times between tspan[0] and tspan[-1].')
+            N_record = len(t_eval)
+            # index of the step that ends at or after each output time:
+            self._step_end = np.searchsorted(tspan, t_eval, side='left')
+            self._k = np.searchsorted(self._step_end, 1, side='left')
+            self.G = None if G is None else _Gmatrix(G)
+        self.y = np.zeros((N_record,) + np.shape(y0), dtype=y0.dtype)
+        if t_eval is None:
+            self.y[0] = y0
+        else:
+            self.y[:self._k] = y0 # output times equal to tspan[0]
+
+    def record(self, n, Yn, Yn1, dWn=None, Gn=None, active=None):
+        """Record what is needed, after the step from tspan[n] to tspan[n+1]
+        that went from state Yn to Yn1 with Wiener increments dWn. Gn may be
+        given if G(Yn, tspan[n]) was already computed. For an ensemble in which
+        some paths have stopped, active gives the indices of the paths that
+        were stepped (and Gn is then given only for those)."""
+        if self.functionals:
+            rows = Ellipsis if active is None else active
+            for functional in self.functionals.values():
+                functional.step(self.tspan[n], self.tspan[n+1], Yn1[rows],
+                                rows)
+        if self.y is None:
+            return
+        if self.t_eval is None:
+            if (n + 1) % self.downsample == 0:
+                self.y[(n + 1)//self.downsample] = Yn1
+            return
+        k = self._k
+        K = len(self.t_eval)
+        if k == K or self._step_end[k] != n + 1:
+            return
+        tn = self.tspan[n]
+        h = self.tspan[n+1] - tn
+        rows = Ellipsis if active is None else active
+        Yn_full = Yn1
+        Yn = Yn[rows]
+        Yn1 = Yn1[rows]
+        dWn = None if dWn is None else dWn[rows]
+        s_prev = 0.0
+        W_prev = 0.0
+        while k < K and self._step_end[k] == n + 1:
+            s = self.t_eval[k] - tn
+            self.y[k] = Yn_full
+            if s < h:
+                if Gn is None:
+                    Gn = self.G(Yn, tn)
+                # sample W(s) given W(s_prev) and W(h) == dWn
+                mean = W_prev + (s - s_prev)/(h - s_prev)*(dWn - W_prev)
+                var = (s - s_prev)*(h - s)/(h - s_prev)
+                Ws = mean + np.sqrt(var)*np.random.normal(0.0, 1.0,
+                                                          np.shape(dWn))
+                theta = s/h
+                self.y[k][rows] = (Yn + theta*(Yn1 - Yn) +
+                                   _matvec(Gn, Ws - theta*dWn))
+                s_prev = s
+                W_prev = Ws
+            k += 1
+        self._k = k
+
+    def stop(self, n):
+        """Integration stopped after the step ending at tspan[n+1]. Discard the
+        rows of output that will not be reached."""
+        if self.y is None:
+            return
+        if self.t_eval is None:
+            self.y = self.y[:(n + 1)//self.downsample + 1]
+        else:
+            self.y = self.y[:self._k]
+
+    def result(self):
+        """The dictionary to be returned by the solver"""
+        result = dict()
+        if self.y is not None:
+            result["trajectory"] = self.y
+        if self.functionals:
+            result["functionals"] = dict(
+                (name, functional.value()) for name, functional in
+                self.functionals.items())
+        return result
+
+
+def _scalar_paths(f, G, y0, tspan, downsample=1, extras=()):
+    """Decide whether a scalar equation can use the scalar engine, from the
+    shapes already probed by SDEProblem, so f and G are not called again.
+    extras are the values of other options of the solver, which the scalar
+    engine can be used for only if they are all None or False.
+
+    Returns:
+      (f, G, y0, tspan, use): the arguments for the solver, where f is
+        replaced by the validated SDEProblem if one was made here, and use
+        says whether to use the scalar engine.
+    """
+    if not isinstance(f, SDEProblem):
+        if G is None or y0 is None or tspan is None:
+            # _check_args reports the missing arguments
+            return (f, G, y0, tspan, False)
+        f = SDEProblem(f, G, y0, tspan)
+        G = y0 = tspan = None
+    elif G is not None:
+        # _check_args rejects G given with an SDEProblem
+        return (f, G, y0, tspan, False)
+    plain = (downsample is not None and
+             all(x is None or x is False for x in extras))
+    return (f, G, y0, tspan, plain and f._scalar is not None)
+
+
+def _scalar_engine(scheme, problem, y0=None, tspan=None, dW=None, IJ=None,
+                   downsample=1):
+    """Integrate a scalar equation dy = f(y,t)dt + g(y,t)dW with one Wiener
+    process, in scalar arithmetic without wrapping the state in arrays. The
+    state is a number, or for an ensemble an array of shape (P,) updated
+    elementwise. scheme is 'euler', 'heun', 'sri2' or 'srs2'. y0 and tspan
+    optionally override those of the SDEProblem.
+
+    The result has the same shape as for the vector algorithms: (N, 1) for
+    a single path or (N, P, 1) for an ensemble."""
+    f, G = problem._scalar
+    paths = problem.paths
+    y0 = problem.y0 if y0 is None else problem._check_y0(y0)
+    y0 = y0[0] if paths is None else y0[:, 0]
+    tspan = problem.tspan if tspan is None else tspan
+    h = _check_tspan(tspan)
+    N = len(tspan)
+    shape = () if paths is None else (paths,)
+    message = ('dW must be an array of shape %s.' % (((N - 1,) + shape +
+                                                      (1,)),))
+    if dW is None:
+        dW = _generate_dW(N - 1, 1, h, paths)
+    elif np.shape(dW) != (N - 1,) + shape + (1,):
+        raise SDEValueError(message)
+    dW = dW[..., 0]
+    if paths is None:
+        # plain floats are much faster than numpy scalars in this loop
+        dW = dW.tolist()
+        t = np.asarray(tspan).tolist()
+        y = y0
+    else:
+        t = tspan
+        y = np.array(y0, dtype=np.result_type(y0, float))
+    if scheme in ('sri2', 'srs2'):
+        if IJ is None:
+            # with one Wiener process the repeated integral is exact:
+            I = None
+        else:
+            I = np.asarray(IJ)[:, 0, 0] if paths is None else np.asarray(
+                IJ)[..., 0, 0]
+            I = I.tolist() if paths is None else I
+    N_record = (N - 1)//downsample + 1
+    out = np.zeros((N_record,) + shape + (1,), dtype=np.result_type(y, float))
+    out[0, ..., 0] = y
+    for n in range(0, N-1):
+        tn = t[n]
+        tn1 = t[n+1]
+        h = tn1 - tn
+        dWn = dW[n]
+        fn = f(y, tn)
+        gn = G(y, tn)
+        if scheme == 'euler':
+            y = y + fn*h + gn*dWn
+        elif scheme == 'heun':
+            ybar = y + fn*h + gn*dWn
+            y = y + 0.5*(fn + f(ybar, tn1))*h + 0.5*(gn + G(ybar, tn1))*dWn
+        else:
+            sqrth = h**0.5
+            if I is not None:
+                In = I[n]
+            elif scheme == 'sri2':
+                In = 0.5*(dWn*dWn - h)
+            else:
+                In = 0.5*dWn*dWn
+            H20 = y + fn*h
+            s = gn*In/sqrth
+            y = (y + 0.5*(fn + f(H20, tn1))*h + gn*dWn +
+                 0.5*sqrth*(G(H20 + s, tn1) - G(H20 - s, tn1)))
+        if (n + 1) % downsample == 0:
+            out[(n + 1)//downsample, ..., 0] = y
+    return {"trajectory": out}
+
+
+def itoint(f, G=None, y0=None, tspan=None, normalized=False):
     """ Numerically integrate Ito equation  dy = f dt + G dW
     """
     # In future versions we can automatically choose here the most suitable
     # Ito algorithm based on properties of the system and noise.
-    (d, m, f, G, y0, tspan, __, __) = _check_args(f, G, y0, tspan, None, None)
+    if not isinstance(f, SDEProblem):
+        f = SDEProblem(f, G, y0, tspan)
+        y0 = tspan = None
     chosenAlgorithm = itoSRI2
-    return chosenAlgorithm(f, G, y0, tspan, normalized=normalized)
+    return chosenAlgorithm(f, None, y0, tspan, normalized=normalized)
 
 
-def stratint(f, G, y0, tspan, normalized=False):
+def stratint(f, G=None, y0=None, tspan=None, normalized=False):
     """ Numerically integrate Stratonovich equation  dy = f dt + G \circ dW
     """
     # In future versions we can automatically choose here the most suitable
     # Stratonovich algorithm based on properties of the system and noise.
-    (d, m, f, G, y0, tspan, __, __) = _check_args(f, G, y0, tspan, None, None)
+    if not isinstance(f, SDEProblem):
+        f = SDEProblem(f, G, y0, tspan)
+        y0 = tspan = None
     chosenAlgorithm = stratSRS2
-    return chosenAlgorithm(f, G, y0, tspan, normalized=normalized)
+    return chosenAlgorithm(f, None, y0, tspan, normalized=normalized)
 
 
-def itoEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1):
+def itoEuler(f, G=None, y0=None, tspan=None, dW=None, normalized=False,
+             downsample=1, t_eval=None, events=None, project=None,
+             project_every=1, functionals=None):
     """Use the Euler-Maruyama algorithm to integrate the Ito equation
     dy = f(y,t)dt + G(y,t) dW(t)
 
@@ -197,18 +848,54 @@ def itoEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1):
          Vector-valued function to define the deterministic part of the system
       G: callable(y, t) returning (d,m) array
          Matrix-valued function to define the noise coefficients of the system
-      y0: array of shape (d,) giving the initial state vector y(t==0)
+      y0: array of shape (d,) giving the initial state vector y(t==0).
+        Or an array of shape (P, d) to integrate an ensemble of P sample paths
+        together. Then f and G are called with an array of shape (P, d) and
+        must return arrays of shape (P, d) and (P, d, m).
+        For a scalar equation, y0 may be a number. If f and G then return
+        numbers, a scalar engine is used that avoids wrapping the state in
+        arrays. An ensemble of a scalar equation can also be given as
+        SDEProblem(f, G, y0, tspan, scalar=True) with y0 of shape (P,), with
+        f and G acting elementwise on arrays of shape (P,).
+        (This engine is used with the options dW and downsample only.)
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
       dW: optional array of shape (len(tspan)-1, d). This is for advanced use,
         if you want to use a specific realization of the d independent Wiener
         processes. If not provided Wiener increments will be generated randomly
+        (For an ensemble of P paths, dW has shape (len(tspan)-1, P, m).)
       downsample: optional, integer to indicate how frequently to save values.
+      t_eval: optional array of increasing times within [tspan[0], tspan[-1]]
+        at which to return the solution, instead of at the points of tspan.
+        Values between steps are interpolated using a Brownian bridge.
+      events: optional callable g(y, t) returning a float, or a list of
+        them, to locate events where g changes sign. g may have attributes
+        ``terminal`` (stop integrating at the event) and ``direction``, as
+        in scipy.integrate.solve_ivp. The times and states of the events are
+        then also returned, with keys "t_events" and "y_events".
+        For an ensemble, g returns an array of shape (P,). A terminal event
+        stops only the paths on which it occurred: after that f and G are
+        called only with the remaining paths and the stopped ones keep their
+        last value. The result then also has key "path_events" giving the
+        path index of each event.
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+      functionals: optional dict mapping names to path functionals, such as
+        running maxima or time integrals (see sdeint.functionals), which are
+        accumulated during integration. Their values are returned by name
+        with key "functionals". Use downsample=None to return only these,
+        without recording the trajectory.
 
     Returns:
       y: array, with shape (len(tspan), len(y0))
          With the initial value y0 in the first row
+         (or shape (len(tspan), P, d) for an ensemble). If integration is
+         stopped by a terminal event, the rows after that are left out.
 
     Raises:
       SDEValueError
@@ -217,33 +904,59 @@ def itoEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1):
       G. Maruyama (1955) Continuous Markov processes and stochastic equations
       Kloeden and Platen (1999) Numerical Solution of Differential Equations
     """
-    (d, m, f, G, y0, tspan, dW, __) = _check_args(f, G, y0, tspan, dW, None)
+    f, G, y0, tspan, scalar = _scalar_paths(
+        f, G, y0, tspan, downsample,
+        (normalized, t_eval, events, project, functionals))
+    if scalar:
+        return _scalar_engine('euler', f, y0, tspan, dW, None, downsample)
+    (d, m, f, G, y0, tspan, dW, __) = _check_args(f, G, y0, tspan, dW, None,
+                                                  ensemble=True)
     N = len(tspan)
-    N_record = int((N-1)/downsample)+1
-    h = (tspan[N-1] - tspan[0])/(N - 1)
+    paths = y0.shape[0] if y0.ndim == 2 else None
+    project = _check_project(normalized, project, project_every)
     # allocate space for result
-    y = np.zeros((N_record, d), dtype=type(y0[0]))
+    rec = _Recorder(tspan, y0, downsample, t_eval, G, functionals)
+    if events is not None:
+        ev = _Events(events, y0, tspan[0])
     if dW is None:
         # pre-generate Wiener increments (for m independent Wiener processes):
-        dW = deltaW(N - 1, m, h)
+        dW = _generate_dW(N - 1, m, _check_tspan(tspan), paths)
 
-    y[0] = y0
-    y_next = y[0]
+    y_next = y0
+    active = None # indices of paths still going, if some have stopped
     for n in range(0, N-1):
         tn = tspan[n]
+        h = tspan[n+1] - tn
         yn = y_next
-        dWn = dW[n,:]
-        y_next = yn + f(yn, tn)*h + G(yn, tn).dot(dWn)
-        if normalized:
-            y_next /= la.norm(y_next)
-        if n % downsample == 0:
-            y[int((n-1)/downsample)+1] = y_next
-    return {"trajectory": y}
-
-def itoImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1, implicit_type = "implicit"):
+        dWn = dW[n]
+        if active is None:
+            Gn = G(yn, tn)
+            y_next = yn + f(yn, tn)*h + _matvec(Gn, dWn)
+        else:
+            ya = yn[active]
+            Gn = G(ya, tn)
+            y_next = yn.copy()
+            y_next[active] = ya + f(ya, tn)*h + _matvec(Gn, dWn[active])
+        if project is not None and (n + 1) % project_every == 0:
+            y_next = project(y_next)
+        rec.record(n, yn, y_next, dWn, Gn, active)
+        if events is not None:
+            if ev.check(tn, tspan[n+1], yn, y_next, active):
+                rec.stop(n)
+                break
+            active = ev.active()
+    result = rec.result()
+    if events is not None:
+        ev.update(result, d)
+    return result
+
+def itoImplicitEuler(f, G=None, y0=None, tspan=None, dW=None, normalized=False,
+                     downsample=1, implicit_type = "implicit", rtol=None,
+                     root_method='hybr'):
     """Use the Implicit Euler-Maruyama algorithm to integrate the Ito equation
     dy = f(y,t)dt + G(y,t) dW(t). The implicit step is taken by using an initial
     approximation from the explicit equation (and repeated once more).
+    Or if rtol is given, the implicit equation is solved to that tolerance.
 
     The implicit step can be taken either for diffusion, drift, or both terms.
     This is specified by the implicit_type argument.
@@ -259,7 +972,8 @@ def itoImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1, i
          Matrix-valued function to define the noise coefficients of the system
       y0: array of shape (d,) giving the initial state vector y(t==0)
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
       dW: optional array of shape (len(tspan)-1, d). This is for advanced use,
         if you want to use a specific realization of the d independent Wiener
@@ -267,13 +981,19 @@ def itoImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1, i
       downsample: optional, integer to indicate how frequently to save values.
       implicit_type: Which implicit step type to use.
         "implicit", "semi_implicit_drift", or "semi_implicit_diffusion".
+      rtol (float, optional): If given, solve the implicit equation at each
+        step with relative tolerance rtol, using a root finder, instead of
+        by a fixed number of iterations. This also works for complex y.
+      root_method (str, optional): which method of scipy.optimize.root to
+        use if rtol is given. The default 'hybr' is MINPACK's HYBRD. For
+        large d, 'krylov' avoids forming the d x d Jacobian.
 
     Returns:
       y: array, with shape (len(tspan), len(y0))
          With the initial value y0 in the first row
 
     Raises:
-      SDEValueError
+      SDEValueError, RuntimeError
 
     See also:
       G. Maruyama (1955) Continuous Markov processes and stochastic equations
@@ -284,50 +1004,66 @@ def itoImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1, i
                              "semi_implicit_drift",
                              "semi_implicit_diffusion"]
     N = len(tspan)
-    N_record = int((N-1)/downsample)+1
-    h = (tspan[N-1] - tspan[0])/(N - 1)
     # allocate space for result
-    y = np.zeros((N_record, d), dtype=type(y0[0]))
-    norms = np.zeros((N_record), dtype=type(y0[0]))
+    rec = _Recorder(tspan, y0, downsample)
+    norms = np.zeros((len(rec.y),), dtype=type(y0[0]))
+    norms[0] = la.norm(y0)
     if dW is None:
         # pre-generate Wiener increments (for m independent Wiener processes):
-        dW = deltaW(N - 1, m, h)
+        dW = deltaW(N - 1, m, _check_tspan(tspan))
 
-    def implicit_step(yn, y_next, tn, dWn):
+    def step_map(y, yn, tn, h, dWn):
+        """The implicit step is the solution y of step_map(y, ...) == y"""
         if implicit_type == "implicit":
-            y_next = yn + f(y_next, tn)*h + G(y_next, tn).dot(dWn)
+            return yn + f(y, tn)*h + G(y, tn).dot(dWn)
         elif implicit_type == "semi_implicit_drift":
-            y_next = yn + f(y_next, tn)*h + G(yn, tn).dot(dWn)
+            return yn + f(y, tn)*h + G(yn, tn).dot(dWn)
         else:
-            y_next = yn + f(yn, tn)*h + G(y_next, tn).dot(dWn)
+            return yn + f(yn, tn)*h + G(y, tn).dot(dWn)
+
+    def implicit_step(yn, y_next, tn, h, dWn, solve=False):
+        if solve:
+            F = lambda y: step_map(y, yn, tn, h, dWn) - y
+            y_next, success, msg = _solve_implicit(F, y_next, rtol,
+                                                   root_method)
+            if not success:
+                raise RuntimeError("""At time t_n = %g Failed to solve for
+                    Y_{n+1}. Reason: %s""" % (tn, msg))
+        else:
+            y_next = step_map(y_next, yn, tn, h, dWn)
 
         norm_next = la.norm(y_next)
-        if n % downsample == 0:
-            norms[int((n-1)/downsample)+1] = norm_next
+        if (n + 1) % downsample == 0:
+            norms[(n + 1)//downsample] = norm_next
         if normalized:
             y_next /= norm_next
         return y_next
 
-    y[0] = y0
-    y_next = y[0]
+    y_next = y0
     for n in range(0, N-1):
         tn = tspan[n]
+        h = tspan[n+1] - tn
         yn = y_next
         dWn = dW[n,:]
 
         ## initial approximation using explicit step
-        y_next = implicit_step(yn, yn, tn, dWn)
+        y_next = implicit_step(yn, yn, tn, h, dWn)
 
         ## updated approximation using implicit step
-        for _ in range(2):
-            y_next = implicit_step(yn, y_next, tn, dWn)
+        if rtol is None:
+            for _ in range(2):
+                y_next = implicit_step(yn, y_next, tn, h, dWn)
+        else:
+            y_next = implicit_step(yn, y_next, tn, h, dWn, solve=True)
 
-        if n % downsample == 0:
-            y[int((n-1)/downsample)+1] = y_next
-    return {"trajectory": y, "norms": norms}
+        rec.record(n, yn, y_next)
+    result = rec.result()
+    result["norms"] = norms
+    return result
 
 
-def itoQuasiImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample=1, implicit_ports = None):
+def itoQuasiImplicitEuler(f, G=None, y0=None, tspan=None, dW=None,
+                          normalized=False, downsample=1, implicit_ports = None):
     """Use the Implicit Euler-Maruyama algorithm to integrate the Ito equation
     dy = f(y,t)dt + G(y,t) dW(t), where implicit steps are taken over only ports
     specified as implicit_ports.
@@ -343,7 +1079,8 @@ def itoQuasiImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample
          Matrix-valued function to define the noise coefficients of the system
       y0: array of shape (d,) giving the initial state vector y(t==0)
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
       dW: optional array of shape (len(tspan)-1, d). This is for advanced use,
         if you want to use a specific realization of the d independent Wiener
@@ -369,19 +1106,18 @@ def itoQuasiImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample
         implicit_ports = []
 
     N = len(tspan)
-    N_record = int((N-1)/downsample)+1
-    h = (tspan[N-1] - tspan[0])/(N - 1)
     # allocate space for result
-    y = np.zeros((N_record, d), dtype=type(y0[0]))
-    norms = np.zeros((N_record), dtype=type(y0[0]))
+    rec = _Recorder(tspan, y0, downsample)
+    norms = np.zeros((len(rec.y),), dtype=type(y0[0]))
+    norms[0] = la.norm(y0)
     if dW is None:
         # pre-generate Wiener increments (for m independent Wiener processes):
-        dW = deltaW(N - 1, m, h)
+        dW = deltaW(N - 1, m, _check_tspan(tspan))
 
-    y[0] = y0
-    y_next = y[0]
+    y_next = y0
     for n in range(0, N-1):
         tn = tspan[n]
+        h = tspan[n+1] - tn
         yn = y_next
         dWn = dW[n,:]
         fn = f(yn, tn)
@@ -404,16 +1140,63 @@ def itoQuasiImplicitEuler(f, G, y0, tspan, dW=None, normalized=False, downsample
         y_next = y_explicit_noise + G(y_tilde, tn+h)[:,implicit_ports].dot(dWn_implicit)
 
         norm_next = la.norm(y_next)
-        if n % downsample == 0:
-            norms[int((n-1)/downsample)+1] = norm_next
+        if (n + 1) % downsample == 0:
+            norms[(n + 1)//downsample] = norm_next
         if normalized:
             y_next /= norm_next
-        if n % downsample == 0:
-            y[int((n-1)/downsample)+1] = y_next
-    return {"trajectory": y, "norms": norms}
-
-def itoMilstein(f, G, H, y0, tspan, Imethod=Ikpw, dW=None, I=None,
-    normalized=False, downsample=1):
+        rec.record(n, yn, y_next, dWn, Gn)
+    result = rec.result()
+    result["norms"] = norms
+    return result
+
+def _milstein_term(H, I, d, m):
+    """The Milstein correction sum_jk H_ijk I_jk at each step, for a constant
+    H given as an array of shape (d, m, m) or in low-rank form as a tuple
+    (U, V, W) with H_ijk = sum_r U_ir V_jr W_kr. I can be a PackedIntegrals
+    object, which is then not expanded. Only the parts that do not depend on
+    the step are computed in advance. Returns a function of the step index n
+    giving an array of shape (d,)."""
+    if isinstance(H, tuple):
+        U, V, W = (np.asarray(a) for a in H)
+        R = U.shape[-1]
+        if U.shape != (d, R) or V.shape != (m, R) or W.shape != (m, R):
+            raise SDEValueError('Low-rank H must be a tuple (U, V, W) of '
+                                'arrays of shape (%d, R), (%d, R), (%d, R).'
+                                % (d, m, m))
+    else:
+        H = np.asarray(H)
+        if H.shape != (d, m, m):
+            raise SDEValueError('Constant H must have shape (%d, %d, %d).'
+                                % (d, m, m))
+    if isinstance(I, PackedIntegrals):
+        # I = (dW dW^T - h)/2 + A (Ito) or dW dW^T/2 + A (Stratonovich)
+        dW = I.dW
+        diag = 0.0 if I.stratonovich else 0.5
+        step_h = lambda n: I.h if np.ndim(I.h) == 0 else I.h[n]
+        i, j = I._upper
+        if isinstance(H, tuple):
+            VW = np.sum(V*W, axis=0)
+            area = V[i]*W[j] - V[j]*W[i] # shape (M, R)
+            def term(n):
+                T = (0.5*dW[n].dot(V)*dW[n].dot(W) - diag*step_h(n)*VW +
+                     I.A[n].dot(area))
+                return U.dot(T)
+            return term
+        trace = np.trace(H, axis1=1, axis2=2)
+        area = H[:, i, j] - H[:, j, i] # shape (d, M)
+        def term(n):
+            return (0.5*H.dot(dW[n]).dot(dW[n]) - diag*step_h(n)*trace +
+                    area.dot(I.A[n]))
+        return term
+    if isinstance(H, tuple):
+        return lambda n: U.dot(np.einsum('jr,jk,kr->r', V, I[n], W))
+    Hflat = H.reshape((d, m*m))
+    return lambda n: Hflat.dot(np.ravel(I[n]))
+
+
+def itoMilstein(f, G=None, H=None, y0=None, tspan=None, Imethod=Ikpw, dW=None,
+    I=None, normalized=False, downsample=1, t_eval=None, events=None,
+    project=None, project_every=1, functionals=None):
     """
     Args:
       f: callable(y, t) returning (d,) array
@@ -422,48 +1205,105 @@ def itoMilstein(f, G, H, y0, tspan, Imethod=Ikpw, dW=None, I=None,
          Matrix-valued function to define the noise coefficients of the system
       H: callable(y, t) returning (d,m,m) array
          Tensor-valued function to define the Milstein correction term.
+         If H does not depend on y or t it can be given as a constant array
+         of shape (d,m,m), or in low-rank form as a tuple (U, V, W) of arrays
+         of shape (d,R), (m,R) and (m,R) meaning
+           H_ijk = sum_r U_ir V_jr W_kr
+         Then H is not evaluated at every step, and only the parts of the
+         correction H:I that do not depend on the step are computed in
+         advance (for a low-rank H, without forming the (d,m,m) tensor).
+         G may likewise be given as a constant array of shape (d,m), so that
+         it is not evaluated at every step. (If G is constant, H is zero and
+         can be left out.)
       y0: array of shape (d,) giving the initial state vector y(t==0)
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
       dW: optional array of shape (len(tspan)-1, d). This is for advanced use,
         if you want to use a specific realization of the d independent Wiener
         processes. If not provided Wiener increments will be generated randomly
+      I: optional array of shape (len(tspan)-1, m, m), or a PackedIntegrals
+        object (see Imethod(..., packed=True)) storing only the Levy areas.
       downsample: optional, integer to indicate how frequently to save values.
+      t_eval: optional array of increasing times within [tspan[0], tspan[-1]]
+        at which to return the solution, instead of at the points of tspan.
+        Values between steps are interpolated using a Brownian bridge.
+      events: optional callable g(y, t) returning a float, or a list of
+        them, to locate events where g changes sign. g may have attributes
+        ``terminal`` (stop integrating at the event) and ``direction``, as
+        in scipy.integrate.solve_ivp. The times and states of the events are
+        then also returned, with keys "t_events" and "y_events".
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+      functionals: optional dict of path functionals to accumulate during
+        integration, as for itoEuler.
 
     """
+    Gconst = None
+    if isinstance(G, np.ndarray):
+        Gconst = G
+        G = lambda y, t: Gconst
+    Hconst = None
+    if H is not None and not callable(H):
+        Hconst = H
+        H = None
+    if isinstance(f, SDEProblem) and H is None and Hconst is None:
+        H = f.H
+    if H is None and Hconst is None and Gconst is None:
+        raise SDEValueError('itoMilstein() requires the Milstein term H.')
     (d, m, f, G, y0, tspan, dW, I) = _check_args(f, G, y0, tspan, dW, I, H)
     N = len(tspan)
-    N_record = int((N-1)/downsample)+1
-    h = (tspan[N-1] - tspan[0])/(N - 1)
+    project = _check_project(normalized, project, project_every)
     # allocate space for result
-    y = np.zeros((N_record, d), dtype=type(y0[0]))
+    rec = _Recorder(tspan, y0, downsample, t_eval, G, functionals)
+    if events is not None:
+        ev = _Events(events, y0, tspan[0])
+    if dW is None or I is None:
+        h = _check_tspan(tspan)
     if dW is None:
         # pre-generate Wiener increments (for m independent Wiener processes):
         dW = deltaW(N - 1, m, h)
     if I is None:
         # pre-generate repeated stochastic integrals for each time step.
         __, I = Imethod(dW, h) # shape (N, m, m)
+    HI = None
+    if Hconst is not None:
+        HI = _milstein_term(Hconst, I, d, m)
 
-    y[0] = y0
-    y_next = y[0]
+    y_next = y0
     for n in range(0, N-1):
         tn = tspan[n]
+        h = tspan[n+1] - tn
         yn = y_next
         dWn = dW[n,:]
-        Iij = I[n,:,:]
         fn = f(yn, tn)
-        Gn = G(yn, tn)
-        Hn = H(yn, tn)
-        y_next = (yn + fn*h + Gn.dot(dWn) +
-            np.dot(Hn.reshape(d, m**2), Iij.ravel()) )
-        if normalized:
-            y_next /= la.norm(y_next)
-        if n % downsample == 0:
-            y[int((n-1)/downsample)+1] = y_next
-    return {"trajectory": y}
-
-def numItoMilstein(f, G, y0, tspan, Imethod=Ikpw, dW=None, I=None, normalized=False, downsample=1, eps=1e-20):
+        Gn = G(yn, tn) if Gconst is None else Gconst
+        y_next = yn + fn*h + Gn.dot(dWn)
+        if HI is not None:
+            y_next += HI(n)
+        elif H is not None:
+            Hn = H(yn, tn)
+            Iij = I[n,:,:]
+            y_next += np.dot(Hn.reshape(d, m**2), Iij.ravel())
+        if project is not None and (n + 1) % project_every == 0:
+            y_next = project(y_next)
+        rec.record(n, yn, y_next, dWn, Gn)
+        if events is not None and ev.check(tn, tspan[n+1], yn, y_next):
+            rec.stop(n)
+            break
+    result = rec.result()
+    if events is not None:
+        ev.update(result, d)
+    return result
+
+def numItoMilstein(f, G=None, y0=None, tspan=None, Imethod=Ikpw, dW=None,
+                   I=None, normalized=False, downsample=1, eps=1e-20,
+                   t_eval=None, events=None, project=None, project_every=1,
+                   functionals=None):
     """
     Args:
       f: callable(y, t) returning (d,) array
@@ -472,7 +1312,8 @@ def numItoMilstein(f, G, y0, tspan, Imethod=Ikpw, dW=None, I=None, normalized=Fa
          Matrix-valued function to define the noise coefficients of the system
       y0: array of shape (d,) giving the initial state vector y(t==0)
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
       dW: optional array of shape (len(tspan)-1, d). This is for advanced use,
         if you want to use a specific realization of the d independent Wiener
@@ -481,10 +1322,15 @@ def numItoMilstein(f, G, y0, tspan, Imethod=Ikpw, dW=None, I=None, normalized=Fa
     """
     (d, m, f, G, y0, tspan, dW, I) = _check_args(f, G, y0, tspan, dW, I, None)
     H = gen_H_numerical(G, eps=eps)
-    return itoMilstein(f, G, H, y0, tspan, Imethod=Imethod, dW=dW, I=I, normalized=normalized, downsample=downsample)
+    problem = SDEProblem(f, G, y0, tspan, H, m=m)
+    return itoMilstein(problem, Imethod=Imethod, dW=dW, I=I, normalized=normalized, downsample=downsample, t_eval=t_eval,
+                       events=events, project=project,
+                       project_every=project_every, functionals=functionals)
 
 
-def stratHeun(f, G, y0, tspan, dW=None, normalized=False):
+def stratHeun(f, G=None, y0=None, tspan=None, dW=None, normalized=False,
+              downsample=1, t_eval=None, events=None, project=None,
+              project_every=1, functionals=None):
     """Use the Stratonovich Heun algorithm to integrate Stratonovich equation
     dy = f(y,t)dt + G(y,t) \circ dW(t)
 
@@ -497,17 +1343,38 @@ def stratHeun(f, G, y0, tspan, dW=None, normalized=False):
          Vector-valued function to define the deterministic part of the system
       G: callable(y, t) returning (d,m) array
          Matrix-valued function to define the noise coefficients of the system
-      y0: array of shape (d,) giving the initial state vector y(t==0)
+      y0: array of shape (d,) giving the initial state vector y(t==0).
+        Or an array of shape (P, d) to integrate an ensemble of P sample paths
+        together. Then f and G are called with an array of shape (P, d) and
+        must return arrays of shape (P, d) and (P, d, m).
+        For a scalar equation, y0 may be a number, or an ensemble may be
+        declared with SDEProblem(..., scalar=True), as for itoEuler.
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
       dW: optional array of shape (len(tspan)-1, d). This is for advanced use,
         if you want to use a specific realization of the d independent Wiener
         processes. If not provided Wiener increments will be generated randomly
+        (For an ensemble of P paths, dW has shape (len(tspan)-1, P, m).)
+      downsample: optional, integer to indicate how frequently to save values.
+      t_eval: optional array of increasing times within [tspan[0], tspan[-1]]
+        at which to return the solution, instead of at the points of tspan.
+        Values between steps are interpolated using a Brownian bridge.
+      events: optional callable g(y, t) returning a float, or a list of
+        them, to locate events where g changes sign, as for itoEuler.
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+      functionals: optional dict of path functionals to accumulate during
+        integration, as for itoEuler.
 
     Returns:
       y: array, with shape (len(tspan), len(y0))
          With the initial value y0 in the first row
+         (or shape (len(tspan), P, d) for an ensemble).
 
     Raises:
       SDEValueError
@@ -520,32 +1387,62 @@ def stratHeun(f, G, y0, tspan, dW=None, normalized=False):
       K. Burrage, P. M. Burrage and T. Tian (2004) Numerical methods for strong
          solutions of stochastic differential equations: an overview
     """
-    (d, m, f, G, y0, tspan, dW, __) = _check_args(f, G, y0, tspan, dW, None)
+    f, G, y0, tspan, scalar = _scalar_paths(
+        f, G, y0, tspan, downsample,
+        (normalized, t_eval, events, project, functionals))
+    if scalar:
+        return _scalar_engine('heun', f, y0, tspan, dW, None, downsample)
+    (d, m, f, G, y0, tspan, dW, __) = _check_args(f, G, y0, tspan, dW, None,
+                                                  ensemble=True)
     N = len(tspan)
-    h = (tspan[N-1] - tspan[0])/(N - 1)
+    paths = y0.shape[0] if y0.ndim == 2 else None
+    project = _check_project(normalized, project, project_every)
     # allocate space for result
-    y = np.zeros((N, d), dtype=type(y0[0]))
+    rec = _Recorder(tspan, y0, downsample, t_eval, G, functionals)
+    if events is not None:
+        ev = _Events(events, y0, tspan[0])
     if dW is None:
         # pre-generate Wiener increments (for m independent Wiener processes):
-        dW = deltaW(N - 1, m, h)
-    y[0] = y0;
+        dW = _generate_dW(N - 1, m, _check_tspan(tspan), paths)
+
+    y_next = y0
+    active = None # indices of paths still going, if some have stopped
     for n in range(0, N-1):
         tn = tspan[n]
         tnp1 = tspan[n+1]
-        yn = y[n]
-        dWn = dW[n,:]
+        h = tnp1 - tn
+        yn = y_next if active is None else y_next[active]
+        dWn = dW[n] if active is None else dW[n, active]
         fn = f(yn, tn)
         Gn = G(yn, tn)
-        ybar = yn + fn*h + Gn.dot(dWn)
+        ybar = yn + fn*h + _matvec(Gn, dWn)
         fnbar = f(ybar, tnp1)
         Gnbar = G(ybar, tnp1)
-        y[n+1] = yn + 0.5*(fn + fnbar)*h + 0.5*(Gn + Gnbar).dot(dWn)
-        if normalized:
-            y[n+1] /= la.norm(y[n+1])
-    return {"trajectory": y}
-
-
-def itoSRI2(f, G, y0, tspan, Imethod=Ikpw, dW=None, I=None, normalized=False, downsample=1):
+        ynp1 = yn + 0.5*(fn + fnbar)*h + 0.5*_matvec(Gn + Gnbar, dWn)
+        if project is not None and (n + 1) % project_every == 0:
+            ynp1 = project(ynp1)
+        yn = y_next
+        if active is None:
+            y_next = ynp1
+        else:
+            y_next = yn.copy()
+            y_next[active] = ynp1
+        rec.record(n, yn, y_next, dW[n], Gn, active)
+        if events is not None:
+            if ev.check(tn, tnp1, yn, y_next, active):
+                rec.stop(n)
+                break
+            active = ev.active()
+    result = rec.result()
+    if events is not None:
+        ev.update(result, d)
+    return result
+
+
+def itoSRI2(f, G=None, y0=None, tspan=None, Imethod=Ikpw, dW=None, I=None,
+            normalized=False, downsample=1, inplace=False, t_eval=None,
+            events=None, executor=None, batched_G=False, project=None,
+            project_every=1, functionals=None):
     """Use the Roessler2010 order 1.0 strong Stochastic Runge-Kutta algorithm
     SRI2 to integrate an Ito equation dy = f(y,t)dt + G(y,t)dW(t)
 
@@ -576,9 +1473,12 @@ def itoSRI2(f, G, y0, tspan, Imethod=Ikpw, dW=None, I=None, normalized=False, do
          G involves complicated functions, consider using this way.
 
       y0: array of shape (d,) giving the initial state vector y(t==0)
+        For a scalar equation, y0 may be a number, or an ensemble may be
+        declared with SDEProblem(..., scalar=True), as for itoEuler.
 
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
 
       Imethod (callable, optional): which function to use to simulate repeated
@@ -587,12 +1487,53 @@ def itoSRI2(f, G, y0, tspan, Imethod=Ikpw, dW=None, I=None, normalized=False, do
         current implementation).
 
       dW: optional array of shape (len(tspan)-1, d).
-      I: optional array of shape (len(tspan)-1, m, m).
+      I: optional array of shape (len(tspan)-1, m, m), or a PackedIntegrals
+        object (see Imethod(..., packed=True)) storing only the Levy areas.
         These optional arguments dW and I are for advanced use, if you want to
         use a specific realization of the d independent Wiener processes and
         their multiple integrals at each time step. If not provided, suitable
         values will be generated randomly.
 
+      downsample: optional, integer to indicate how frequently to save values.
+
+      inplace (bool, optional): Set this to avoid allocating new arrays at each
+        time step. Then f and G (or each g) must accept a third argument
+        ``out``, as in f(y, t, out), and write their result into that
+        preallocated array. When ``out`` is omitted they should return the
+        result as usual (this is used once to check the shapes).
+
+      executor (optional): a concurrent.futures.Executor, such as a
+        ThreadPoolExecutor. If G is given as a list of m functions, then at
+        each time step the m evaluations of the columns of G, and then the 2m
+        evaluations at the stage points, are submitted to this executor to run
+        concurrently. This helps when the functions g release the GIL.
+
+      batched_G (bool, optional): Set this if G is a single function that can
+        also be evaluated at many states in one call: given an array of shape
+        (d, K) whose columns are K states, G must return an array of shape
+        (K, d, m) giving the matrix G at each of them. (Given a state of shape
+        (d,) it should return (d, m) as usual.) Then the 2m stage points of
+        each time step are evaluated together in one call of G, rather than
+        with 2m separate calls.
+
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+      functionals: optional dict of path functionals to accumulate during
+        integration, as for itoEuler.
+
+      t_eval: optional array of increasing times within [tspan[0], tspan[-1]]
+        at which to return the solution, instead of at the points of tspan.
+        Values between steps are interpolated using a Brownian bridge.
+
+      events: optional callable g(y, t) returning a float, or a list of
+        them, to locate events where g changes sign. g may have attributes
+        ``terminal`` (stop integrating at the event) and ``direction``, as
+        in scipy.integrate.solve_ivp. The times and states of the events are
+        then also returned, with keys "t_events" and "y_events".
+
     Returns:
       y: array, with shape (len(tspan), len(y0))
          With the initial value y0 in the first row
@@ -604,10 +1545,21 @@ def itoSRI2(f, G, y0, tspan, Imethod=Ikpw, dW=None, I=None, normalized=False, do
       A. Roessler (2010) Runge-Kutta Methods for the Strong Approximation of
         Solutions of Stochastic Differential Equations
     """
-    return _Roessler2010_SRK2(f, G, y0, tspan, Imethod, dW, I, normalized, downsample)
-
-
-def stratSRS2(f, G, y0, tspan, Jmethod=Jkpw, dW=None, J=None, normalized=False):
+    f, G, y0, tspan, scalar = _scalar_paths(
+        f, G, y0, tspan, downsample,
+        (normalized, inplace, t_eval, events, executor,
+         batched_G, project, functionals))
+    if scalar:
+        return _scalar_engine('sri2', f, y0, tspan, dW, I, downsample)
+    return _Roessler2010_SRK2(f, G, y0, tspan, Imethod, dW, I, normalized,
+                              downsample, inplace, t_eval, events, executor,
+                              batched_G, project, project_every, functionals)
+
+
+def stratSRS2(f, G=None, y0=None, tspan=None, Jmethod=Jkpw, dW=None, J=None,
+              normalized=False, downsample=1, inplace=False, t_eval=None,
+              events=None, executor=None, batched_G=False, project=None,
+              project_every=1, functionals=None):
     """Use the Roessler2010 order 1.0 strong Stochastic Runge-Kutta algorithm
     SRS2 to integrate a Stratonovich equation dy = f(y,t)dt + G(y,t)\circ dW(t)
 
@@ -638,9 +1590,12 @@ def stratSRS2(f, G, y0, tspan, Jmethod=Jkpw, dW=None, J=None, normalized=False):
          G involves complicated functions, consider using this way.
 
       y0: array of shape (d,) giving the initial state vector y(t==0)
+        For a scalar equation, y0 may be a number, or an ensemble may be
+        declared with SDEProblem(..., scalar=True), as for itoEuler.
 
       tspan (array): The sequence of time points for which to solve for y.
-        These must be equally spaced, e.g. np.arange(0,10,0.005)
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
         tspan[0] is the intial time corresponding to the initial state y0.
 
       Jmethod (callable, optional): which function to use to simulate repeated
@@ -649,12 +1604,53 @@ def stratSRS2(f, G, y0, tspan, Jmethod=Jkpw, dW=None, J=None, normalized=False):
         memory in the current implementation).
 
       dW: optional array of shape (len(tspan)-1, d).
-      J: optional array of shape (len(tspan)-1, m, m).
+      J: optional array of shape (len(tspan)-1, m, m), or a PackedIntegrals
+        object (see Jmethod(..., packed=True)) storing only the Levy areas.
         These optional arguments dW and J are for advanced use, if you want to
         use a specific realization of the d independent Wiener processes and
         their multiple integrals at each time step. If not provided, suitable
         values will be generated randomly.
 
+      downsample: optional, integer to indicate how frequently to save values.
+
+      inplace (bool, optional): Set this to avoid allocating new arrays at each
+        time step. Then f and G (or each g) must accept a third argument
+        ``out``, as in f(y, t, out), and write their result into that
+        preallocated array. When ``out`` is omitted they should return the
+        result as usual (this is used once to check the shapes).
+
+      executor (optional): a concurrent.futures.Executor, such as a
+        ThreadPoolExecutor. If G is given as a list of m functions, then at
+        each time step the m evaluations of the columns of G, and then the 2m
+        evaluations at the stage points, are submitted to this executor to run
+        concurrently. This helps when the functions g release the GIL.
+
+      batched_G (bool, optional): Set this if G is a single function that can
+        also be evaluated at many states in one call: given an array of shape
+        (d, K) whose columns are K states, G must return an array of shape
+        (K, d, m) giving the matrix G at each of them. (Given a state of shape
+        (d,) it should return (d, m) as usual.) Then the 2m stage points of
+        each time step are evaluated together in one call of G, rather than
+        with 2m separate calls.
+
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+      functionals: optional dict of path functionals to accumulate during
+        integration, as for itoEuler.
+
+      t_eval: optional array of increasing times within [tspan[0], tspan[-1]]
+        at which to return the solution, instead of at the points of tspan.
+        Values between steps are interpolated using a Brownian bridge.
+
+      events: optional callable g(y, t) returning a float, or a list of
+        them, to locate events where g changes sign. g may have attributes
+        ``terminal`` (stop integrating at the event) and ``direction``, as
+        in scipy.integrate.solve_ivp. The times and states of the events are
+        then also returned, with keys "t_events" and "y_events".
+
     Returns:
       y: array, with shape (len(tspan), len(y0))
          With the initial value y0 in the first row
@@ -666,10 +1662,22 @@ def stratSRS2(f, G, y0, tspan, Jmethod=Jkpw, dW=None, J=None, normalized=False):
       A. Roessler (2010) Runge-Kutta Methods for the Strong Approximation of
         Solutions of Stochastic Differential Equations
     """
-    return _Roessler2010_SRK2(f, G, y0, tspan, Jmethod, dW, J, normalized)
-
-
-def _Roessler2010_SRK2(f, G, y0, tspan, IJmethod, dW=None, IJ=None, normalized=False, downsample=1):
+    f, G, y0, tspan, scalar = _scalar_paths(
+        f, G, y0, tspan, downsample,
+        (normalized, inplace, t_eval, events, executor,
+         batched_G, project, functionals))
+    if scalar:
+        return _scalar_engine('srs2', f, y0, tspan, dW, J, downsample)
+    return _Roessler2010_SRK2(f, G, y0, tspan, Jmethod, dW, J, normalized,
+                              downsample, inplace, t_eval, events, executor,
+                              batched_G, project, project_every, functionals)
+
+
+def _Roessler2010_SRK2(f, G, y0, tspan, IJmethod, dW=None, IJ=None,
+                       normalized=False, downsample=1, inplace=False,
+                       t_eval=None, events=None, executor=None,
+                       batched_G=False, project=None, project_every=1,
+                       functionals=None):
     """Implements the Roessler2010 order 1.0 strong Stochastic Runge-Kutta
     algorithms SRI2 (for Ito equations) and SRS2 (for Stratonovich equations).
 
@@ -683,17 +1691,29 @@ def _Roessler2010_SRK2(f, G, y0, tspan, IJmethod, dW=None, IJ=None, normalized=F
       G: Either a function G(y, t) that returns an array of shape (d, m),
          or a list of m functions g(y, t) each returning an array shape (d,).
       y0: array of shape (d,) giving the initial state
-      tspan (array): Sequence of equally spaced time points
+      tspan (array): Sequence of increasing time points
       IJmethod (callable): which function to use to generate repeated
         integrals. N.B. for an Ito equation, must use an Ito version here
         (either Ikpw or Iwik). For a Stratonovich equation, must use a
         Stratonovich version here (Jkpw or Jwik).
       dW: optional array of shape (len(tspan)-1, d).
-      IJ: optional array of shape (len(tspan)-1, m, m).
+      IJ: optional array of shape (len(tspan)-1, m, m), or PackedIntegrals.
         Optional arguments dW and IJ are for advanced use, if you want to
         use a specific realization of the d independent Wiener processes and
         their multiple integrals at each time step. If not provided, suitable
         values will be generated randomly.
+      inplace (bool, optional): If True, f and G (or each g) are called with
+        a third argument ``out``, a preallocated array into which they must
+        write their result. Work arrays are allocated once and reused.
+      t_eval (array, optional): times at which to return the solution,
+        interpolated between steps using a Brownian bridge.
+      events (optional): event functions g(y, t) to locate, see _Events.
+      executor (optional): a concurrent.futures.Executor in which to evaluate
+        the columns of G concurrently, if G is a list of m functions.
+      batched_G (bool, optional): If True, G accepts an array of shape (d, K)
+        of K states and returns an array of shape (K, d, m).
+      project (callable, optional): projection applied to the state after
+        every project_every'th step.
 
     Returns:
       y: array, with shape (len(tspan), len(y0))
@@ -708,8 +1728,15 @@ def _Roessler2010_SRK2(f, G, y0, tspan, IJmethod, dW=None, IJ=None, normalized=F
     (d, m, f, G, y0, tspan, dW, IJ) = _check_args(f, G, y0, tspan, dW, IJ)
     N = len(tspan)
     have_separate_g = (not callable(G)) # if G is given as m separate functions
-    N_record = int((N-1)/downsample)+1
-    h = (tspan[N-1] - tspan[0])/(N - 1) # assuming equal time steps
+    project = _check_project(normalized, project, project_every)
+    if executor is not None and not have_separate_g:
+        raise SDEValueError('To use an executor, G must be given as a list of '
+                            'm functions each giving one column of G.')
+    if batched_G and have_separate_g:
+        raise SDEValueError('batched_G requires G to be a single function '
+                            'returning the whole matrix.')
+    if dW is None or IJ is None:
+        h = _check_tspan(tspan) # float, or array if steps are not equal
     if dW is None:
         # pre-generate Wiener increments (for m independent Wiener processes):
         dW = deltaW(N - 1, m, h) # shape (N, m)
@@ -720,46 +1747,134 @@ def _Roessler2010_SRK2(f, G, y0, tspan, IJmethod, dW=None, IJ=None, normalized=F
     else:
         I = IJ
     # allocate space for result
-    y = np.zeros((N_record, d), dtype=type(y0[0]))
-    y[0] = y0;
-    Yn1 = y[0]
-    Gn = np.zeros((d, m), dtype=y.dtype)
+    rec = _Recorder(tspan, y0, downsample, t_eval, G, functionals)
+    if events is not None:
+        ev = _Events(events, y0, tspan[0])
+    # allocate work buffers once, to be reused at every step
+    dtype = y0.dtype
+    Yn = np.empty((d,), dtype=dtype)
+    Yn1 = np.array(y0, dtype=dtype)
+    fnh = np.empty((d,), dtype=dtype)
+    fn1h = np.empty((d,), dtype=dtype)
+    H20 = np.empty((d,), dtype=dtype)
+    Gn = np.zeros((d, m), dtype=dtype)
+    sum1 = np.empty((d, m), dtype=dtype)
+    H23 = np.empty((d, 2*m), dtype=dtype) # all 2m stage points together
+    H2 = H23[:,:m]
+    H3 = H23[:,m:]
+    GdW = np.empty((d,), dtype=dtype)
+    g2 = np.empty((d,), dtype=dtype)
+    g3 = np.empty((d,), dtype=dtype)
+    if (inplace and not have_separate_g) or executor is not None:
+        G2 = np.empty((d, m), dtype=dtype)
+        G3 = np.empty((d, m), dtype=dtype)
+    if batched_G:
+        cols = np.arange(m)
+        if inplace:
+            G23 = np.empty((2*m, d, m), dtype=dtype)
+    packed = isinstance(I, PackedIntegrals)
+    if packed:
+        Iij = np.empty((m, m))
     for n in range(0, N-1):
         tn = tspan[n]
         tn1 = tspan[n+1]
         h = tn1 - tn
         sqrth = np.sqrt(h)
-        Yn = Yn1 # shape (d,)
+        Yn, Yn1 = Yn1, Yn # shape (d,) swap buffers rather than allocating
         Ik = dW[n,:] # shape (m,)
-        Iij = I[n,:,:] # shape (m, m)
+        if packed:
+            I.matrix(n, out=Iij) # rebuilt from the Levy areas
+        else:
+            Iij = I[n,:,:] # shape (m, m)
 
-        fnh = f(Yn, tn)*h # shape (d,)
-        if have_separate_g:
+        if inplace:
+            f(Yn, tn, fnh)
+        else:
+            fnh[:] = f(Yn, tn)
+        fnh *= h # shape (d,)
+        if executor is not None:
+            _run_columns(executor, [(G[k], Yn, Gn, k) for k in range(m)],
+                         tn, inplace)
+        elif have_separate_g:
             for k in range(0, m):
-                Gn[:,k] = G[k](Yn, tn)
+                if inplace:
+                    G[k](Yn, tn, Gn[:,k])
+                else:
+                    Gn[:,k] = G[k](Yn, tn)
+        elif inplace:
+            G(Yn, tn, Gn)
         else:
             Gn = G(Yn, tn)
-        sum1 = Gn.dot(Iij)/sqrth # shape (d, m)
-        H20 = Yn + fnh # shape (d,)
-        H20b = np.reshape(H20, (d, 1))
-        H2 = H20b + sum1 # shape (d, m)
-        H3 = H20b - sum1
-        fn1h = f(H20, tn1)*h
-        Yn1 = Yn + 0.5*(fnh + fn1h) + Gn.dot(Ik)
-        if have_separate_g:
-            for k in range(0, m):
-                Yn1 += 0.5*sqrth*(G[k](H2[:,k], tn1) - G[k](H3[:,k], tn1))
+        np.matmul(Gn, Iij, out=sum1)
+        sum1 /= sqrth # shape (d, m)
+        np.add(Yn, fnh, out=H20) # shape (d,)
+        H20b = H20.reshape((d, 1)) # a view, not a copy
+        np.add(H20b, sum1, out=H2) # shape (d, m)
+        np.subtract(H20b, sum1, out=H3)
+        if inplace:
+            f(H20, tn1, fn1h)
+        else:
+            fn1h[:] = f(H20, tn1)
+        fn1h *= h
+        # Yn1 = Yn + 0.5*(fnh + fn1h) + Gn.dot(Ik)
+        np.add(fnh, fn1h, out=Yn1)
+        Yn1 *= 0.5
+        Yn1 += Yn
+        np.matmul(Gn, Ik, out=GdW)
+        Yn1 += GdW
+        if executor is not None:
+            # the 2m evaluations at the stage points are independent
+            _run_columns(executor, [(G[k], Hs[:,k], Gs, k) for k in range(m)
+                                    for (Hs, Gs) in ((H2, G2), (H3, G3))],
+                         tn1, inplace)
+            G2 -= G3
+            G2 *= 0.5*sqrth
+            Yn1 += np.sum(G2, axis=1, out=g2)
+        elif batched_G:
+            # evaluate G at all 2m stage points in one call, keeping column k
+            # of G at stage points k and m + k
+            if inplace:
+                G(H23, tn1, G23)
+            else:
+                G23 = G(H23, tn1)
+            g2[:] = np.sum(G23[cols,:,cols] - G23[m + cols,:,cols], axis=0)
+            g2 *= 0.5*sqrth
+            Yn1 += g2
         else:
             for k in range(0, m):
-                Yn1 += 0.5*sqrth*(G(H2[:,k], tn1)[:,k] - G(H3[:,k], tn1)[:,k])
-        if normalized:
-            Yn1 /= la.norm(Yn1)
-        if n % downsample == 0:
-            y[int((n-1)/downsample)+1] = Yn1
-    return {"trajectory": y}
-
-def stratKP2iS(f, G, y0, tspan, Jmethod=Jkpw, gam=None, al1=None, al2=None,
-               rtol=1e-4, dW=None, J=None, normalized=False):
+                if have_separate_g:
+                    if inplace:
+                        G[k](H2[:,k], tn1, g2)
+                        G[k](H3[:,k], tn1, g3)
+                    else:
+                        g2[:] = G[k](H2[:,k], tn1)
+                        g3[:] = G[k](H3[:,k], tn1)
+                elif inplace:
+                    G(H2[:,k], tn1, G2)
+                    G(H3[:,k], tn1, G3)
+                    g2[:] = G2[:,k]
+                    g3[:] = G3[:,k]
+                else:
+                    g2[:] = G(H2[:,k], tn1)[:,k]
+                    g3[:] = G(H3[:,k], tn1)[:,k]
+                g2 -= g3
+                g2 *= 0.5*sqrth
+                Yn1 += g2
+        if project is not None and (n + 1) % project_every == 0:
+            Yn1[...] = project(Yn1)
+        rec.record(n, Yn, Yn1, Ik, Gn)
+        if events is not None and ev.check(tn, tn1, Yn, Yn1):
+            rec.stop(n)
+            break
+    result = rec.result()
+    if events is not None:
+        ev.update(result, d)
+    return result
+
+def stratKP2iS(f, G=None, y0=None, tspan=None, Jmethod=Jkpw, gam=None,
+               al1=None, al2=None, rtol=1e-4, dW=None, J=None,
+               normalized=False, downsample=1, t_eval=None, project=None,
+               project_every=1, root_method='hybr', functionals=None):
     """Use the Kloeden and Platen two-step implicit order 1.0 strong algorithm
     to integrate a Stratonovich equation dy = f(y,t)dt + G(y,t)\circ dW(t)
 
@@ -770,6 +1885,8 @@ def stratKP2iS(f, G, y0, tspan, Jmethod=Jkpw, gam=None, al1=None, al2=None,
     equations (4.5) and (4.7). Here implementing that scheme with default
     parameters \gamma_k = \alpha_{1,k} = \alpha_{2,k} = 0.5 for k=1..d using
     MINPACK HYBRD algorithm to solve the implicit vector equation at each step.
+    For complex y, the implicit equation is solved for the real and imaginary
+    parts together.
 
     Args:
       f: A function f(y, t) returning an array of shape (d,) to define the
@@ -789,12 +1906,27 @@ def stratKP2iS(f, G, y0, tspan, Jmethod=Jkpw, gam=None, al1=None, al2=None,
         This is the relative tolerance used when solving the implicit equation
         for Y_{n+1} at each step. It does not mean that the overall sample path
         approximation has this relative precision.
+      root_method (str, optional): which method of scipy.optimize.root to
+        use to solve the implicit equation. The default 'hybr' is MINPACK's
+        HYBRD. For large d, 'krylov' avoids forming the d x d Jacobian.
       dW: optional array of shape (len(tspan)-1, d).
-      J: optional array of shape (len(tspan)-1, m, m).
+      J: optional array of shape (len(tspan)-1, m, m), or a PackedIntegrals
+        object (see Jmethod(..., packed=True)) storing only the Levy areas.
         These optional arguments dW and J are for advanced use, if you want to
         use a specific realization of the d independent Wiener processes and
         their multiple integrals at each time step. If not provided, suitable
         values will be generated randomly.
+      downsample: optional, integer to indicate how frequently to save values.
+      t_eval: optional array of increasing times within [tspan[0], tspan[-1]]
+        at which to return the solution, instead of at the points of tspan.
+        Values between steps are interpolated using a Brownian bridge.
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+      functionals: optional dict of path functionals to accumulate during
+        integration, as for itoEuler.
 
     Returns:
       y: array, with shape (len(tspan), len(y0))
@@ -807,14 +1939,13 @@ def stratKP2iS(f, G, y0, tspan, Jmethod=Jkpw, gam=None, al1=None, al2=None,
         Differential Equations, revised and updated 3rd printing.
     """
     try:
-        from scipy.optimize import fsolve
+        import scipy.optimize
     except ImportError:
         raise Error('stratKP2iS() requires package ``scipy`` to be installed.')
     (d, m, f, G, y0, tspan, dW, J) = _check_args(f, G, y0, tspan, dW, J)
     if not callable(G):
         raise SDEValueError('G should be a function returning a d x m matrix.')
-    if np.iscomplexobj(y0):
-        raise SDEValueError("stratKP2iS() can't yet handle complex variables.")
+    project = _check_project(normalized, project, project_every)
     if gam is None:
         gam = np.ones((d,))*0.5  # Default level of implicitness \gamma_k = 0.5
     if al1 is None:
@@ -822,7 +1953,10 @@ def stratKP2iS(f, G, y0, tspan, Jmethod=Jkpw, gam=None, al1=None, al2=None,
     if al2 is None:
         al2 = np.ones((d,))*0.5  # Default \alpha_{2,k} = 0.5
     N = len(tspan)
-    h = (tspan[N-1] - tspan[0])/(N - 1) # assuming equal time steps
+    h = _check_tspan(tspan)
+    if np.ndim(h) > 0:
+        raise SDEValueError('stratKP2iS() is a two-step method that currently '
+                            'requires equally spaced time points.')
     if dW is None:
         # pre-generate Wiener increments (for m independent Wiener processes):
         dW = deltaW(N - 1, m, h) # shape (N, m)
@@ -830,7 +1964,7 @@ def stratKP2iS(f, G, y0, tspan, Jmethod=Jkpw, gam=None, al1=None, al2=None,
         # pre-generate repeated Stratonovich integrals for each time step
         __, J = Jmethod(dW, h) # shape (N, m, m)
     # allocate space for result
-    y = np.zeros((N, d), dtype=type(y0[0]))
+    rec = _Recorder(tspan, y0, downsample, t_eval, G, functionals)
     def _imp(Ynp1, Yn, Ynm1, Vn, Vnm1, tnp1, tn, tnm1, fn, fnm1):
         """At each step we will solve _imp(Ynp1, ...) == 0 for Ynp1.
         The meaning of these arguments is: Y_{n+1}, Y_n, Y_{n-1}, V_n, V_{n-1},
@@ -838,42 +1972,539 @@ def stratKP2iS(f, G, y0, tspan, Jmethod=Jkpw, gam=None, al1=None, al2=None,
         return ((1 - gam)*Yn + gam*Ynm1 + (al2*f(Ynp1, tnp1) +
                 (gam*al1 + (1 - al2))*fn + gam*(1 - al1)*fnm1)*h + Vn +
                 gam*Vnm1 - Ynp1)
+    # only the two-step history Y_{n-1}, V_{n-1}, f_{n-1} is kept
     fn = None
     Vn = None
-    y[0] = y0;
+    Yn = None
+    Ynp1 = y0
     for n in range(0, N-1):
         tn = tspan[n]
         tnp1 = tspan[n+1]
         h = tnp1 - tn
         sqrth = np.sqrt(h)
-        Yn = y[n] # shape (d,)
+        Ynm1 = Yn
+        Yn = Ynp1 # shape (d,)
         Jk = dW[n,:] # shape (m,)
         Jij = J[n,:,:] # shape (m, m)
         fnm1 = fn
         fn = f(Yn, tn)
         Gn = G(Yn, tn)
         Ybar = (Yn + fn*h).reshape((d, 1)) + Gn*sqrth # shape (d, m)
-        sum1 = np.zeros((d,))
+        sum1 = np.zeros((d,), dtype=np.result_type(Gn, Jij))
         for j1 in range(0, m):
             sum1 += np.dot(G(Ybar[:,j1], tn) - Gn, Jij[j1,:])
         Vnm1 = Vn
         Vn = np.dot(Gn, Jk) + sum1/sqrth
         if n == 0:
             # First step uses Kloeden&Platen explicit order 1.0 strong scheme:
-            y[n+1] = Yn + fn*h + Vn
+            Ynp1 = Yn + fn*h + Vn
+            if project is not None and (n + 1) % project_every == 0:
+                Ynp1 = project(Ynp1)
+            rec.record(n, Yn, Ynp1, Jk, Gn)
             continue
         tnm1 = tspan[n-1]
-        Ynm1 = y[n-1] # shape (d,)
         # now solve _imp(Ynp1, ...) == 0 for Ynp1, near to Yn
         args = (Yn, Ynm1, Vn, Vnm1, tnp1, tn, tnm1, fn, fnm1)
-        (Ynp1, __, status, msg) = fsolve(_imp, Yn, args=args, xtol=rtol,
-                                         full_output=True)
-        if status == 1:
-            if normalized:
-                Ynp1 /= la.norm(Ynp1)
-            y[n+1] = Ynp1
+        (Ynp1, success, msg) = _solve_implicit(lambda Y: _imp(Y, *args), Yn,
+                                               rtol, root_method)
+        if success:
+            if project is not None and (n + 1) % project_every == 0:
+                Ynp1 = project(Ynp1)
+            rec.record(n, Yn, Ynp1, Jk, Gn)
         else:
             m = """At time t_n = %g Failed to solve for Y_{n+1} with args %s.
                 Reason: %s""" % (tn, args, msg)
             raise RuntimeError(m)
-    return {"trajectory": y}
+    return rec.result()
+
+
+class _LinearPropagator(object):
+    """Applies the linear part of a split-step scheme, y -> (I - hL)^{-1} y
+    (method 'imex') or y -> expm(hL) y (method 'exponential'), for states of
+    shape (d,) or (P, d). The factorization or matrix exponential is computed
+    once for each distinct step size h and reused for all later steps and
+    paths. At most _max_cached of them are kept, so that a grid of unequal
+    steps does not accumulate one for every step. L can also be a matrix-free
+    operator providing methods imex_solve(h, y) and expm_dot(h, y), such as
+    spde.FourierMultiplier."""
+    _max_cached = 8
+
+    def __init__(self, L, method):
+        if method not in ('imex', 'exponential'):
+            raise SDEValueError("method must be 'imex' or 'exponential'.")
+        self.method = method
+        self.matrix_free = (hasattr(L, 'imex_solve') and
+                            hasattr(L, 'expm_dot'))
+        if self.matrix_free:
+            self.L = L
+            return
+        try:
+            import scipy.linalg
+            import scipy.sparse
+            import scipy.sparse.linalg
+        except ImportError:
+            raise Error('itoSplitStep() requires package ``scipy`` to be '
+                        'installed.')
+        self.linalg = scipy.linalg
+        self.sparse = scipy.sparse if scipy.sparse.issparse(L) else None
+        self.L = scipy.sparse.csc_matrix(L) if self.sparse else np.asarray(L)
+        self._cache = dict()
+
+    def _operator(self, h):
+        key = float(h)
+        if key not in self._cache:
+            d = self.L.shape[0]
+            if self.method == 'exponential':
+                if self.sparse:
+                    op = self.sparse.linalg.expm(h*self.L)
+                else:
+                    op = self.linalg.expm(h*self.L)
+            elif self.sparse:
+                op = self.sparse.linalg.splu(
+                    self.sparse.identity(d, format='csc') - h*self.L)
+            else:
+                op = self.linalg.lu_factor(np.eye(d) - h*self.L)
+            if len(self._cache) >= self._max_cached:
+                self._cache.clear()
+            self._cache[key] = op
+        return self._cache[key]
+
+    def apply(self, h, y):
+        if self.matrix_free:
+            if self.method == 'exponential':
+                return self.L.expm_dot(h, y)
+            return self.L.imex_solve(h, y)
+        op = self._operator(h)
+        yT = y.T # shape (d,) or (d, P)
+        if self.method == 'exponential':
+            return op.dot(yT).T
+        elif self.sparse:
+            return op.solve(np.ascontiguousarray(yT)).T
+        else:
+            return self.linalg.lu_solve(op, yT).T
+
+
+def itoSplitStep(f, G=None, y0=None, tspan=None, L=None, method='imex',
+                 dW=None, normalized=False, downsample=1, t_eval=None,
+                 project=None, project_every=1, functionals=None):
+    """Integrate the Ito equation dy = (L y + f(y,t))dt + G(y,t) dW(t), where
+    L is a constant stiff linear operator and f and G are not stiff, with a
+    split-step scheme that treats only L implicitly or exactly.
+
+    method 'imex' is the linearly implicit Euler-Maruyama scheme
+      (I - hL) y_{n+1} = y_n + f(y_n, t_n)h + G(y_n, t_n)dW_n
+    and method 'exponential' is the exponential Euler-Maruyama scheme
+      y_{n+1} = expm(hL) (y_n + f(y_n, t_n)h + G(y_n, t_n)dW_n)
+    Either way, the LU factorization of (I - hL) or the matrix expm(hL) is
+    computed once for each step size and reused at every step (so with
+    equally spaced tspan, only once, for the common step size), making each
+    step cost about the same as an explicit Euler-Maruyama step. This is intended e.g. for spatial
+    discretizations of stiff reaction-diffusion SPDEs.
+
+    Args:
+      f: callable(y, t) returning (d,) array
+         The non-stiff part of the drift, apart from L y
+      G: callable(y, t) returning (d,m) array
+         Matrix-valued function to define the noise coefficients of the system
+      y0: array of shape (d,) giving the initial state vector y(t==0).
+        Or an array of shape (P, d) to integrate an ensemble of P sample paths
+        together, as for itoEuler. The linear solves are then done for all
+        paths at once.
+      tspan (array): The sequence of time points for which to solve for y.
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
+        tspan[0] is the intial time corresponding to the initial state y0.
+      L: array of shape (d, d) or a scipy.sparse matrix, the stiff linear part
+        of the drift. (For a sparse L, a sparse LU factorization is used.)
+        Or a matrix-free operator with attribute shape and methods
+        imex_solve(h, y) and expm_dot(h, y), such as the Fourier multipliers
+        of module sdeint.spde.
+      method (str, optional): 'imex' (the default) or 'exponential'
+      dW: optional array of shape (len(tspan)-1, m) (or (len(tspan)-1, P, m)
+        for an ensemble). If not provided, Wiener increments will be generated
+        randomly.
+      downsample: optional, integer to indicate how frequently to save values.
+      t_eval: optional array of increasing times within [tspan[0], tspan[-1]]
+        at which to return the solution, instead of at the points of tspan.
+      project: optional callable project(y), applied after every
+        project_every'th step, as for itoEuler.
+      project_every: optional, integer to indicate how often to project.
+      functionals: optional dict of path functionals to accumulate during
+        integration, as for itoEuler.
+
+    Returns:
+      y: array, with shape (len(tspan), len(y0))
+         With the initial value y0 in the first row
+
+    Raises:
+      SDEValueError
+
+    See also:
+      G. Lord and J. Rougemont (2004) A numerical scheme for stochastic PDEs
+        with Gevrey regularity
+      Kloeden and Platen (1999) Numerical Solution of Differential Equations
+        section 12.2
+    """
+    (d, m, f, G, y0, tspan, dW, __) = _check_args(f, G, y0, tspan, dW, None,
+                                                  ensemble=True)
+    if L is None or L.shape != (d, d):
+        raise SDEValueError('L must be given as a matrix of shape (%d, %d).'
+                            % (d, d))
+    propagator = _LinearPropagator(L, method)
+    N = len(tspan)
+    paths = y0.shape[0] if y0.ndim == 2 else None
+    project = _check_project(normalized, project, project_every)
+    # allocate space for result
+    rec = _Recorder(tspan, y0, downsample, t_eval, G, functionals)
+    h = _check_tspan(tspan) # float, or array if steps are not equal
+    if dW is None:
+        # pre-generate Wiener increments (for m independent Wiener processes):
+        dW = _generate_dW(N - 1, m, h, paths)
+
+    y_next = y0
+    for n in range(0, N-1):
+        tn = tspan[n]
+        hn = h if np.ndim(h) == 0 else h[n]
+        yn = y_next
+        dWn = dW[n]
+        Gn = G(yn, tn)
+        y_next = propagator.apply(hn, yn + f(yn, tn)*hn + _matvec(Gn, dWn))
+        if project is not None and (n + 1) % project_every == 0:
+            y_next = project(y_next)
+        rec.record(n, yn, y_next, dWn, Gn)
+    return rec.result()
+
+
+def _jump_adapted(solver, f, G, c, y0, tspan, rate, marks, jumps, dW,
+                  downsample, ensemble=False, Imethod=None, I=None):
+    """Integrate dy = f dt + G dW + c dN on the grid of tspan merged with the
+    jump times, using solver for the diffusion between jumps"""
+    if isinstance(f, SDEProblem):
+        problem = f
+        y0 = problem.y0 if y0 is None else problem._check_y0(y0)
+        tspan = problem.tspan if tspan is None else tspan
+    else:
+        if G is None or y0 is None or tspan is None:
+            raise SDEValueError('G, y0 and tspan must be given, unless the '
+                                'first argument is an SDEProblem.')
+        problem = SDEProblem(f, G, y0, tspan)
+        y0 = problem.y0
+    _check_tspan(tspan)
+    d, m, P = problem.d, problem.m, problem.paths
+    if P is not None and not ensemble:
+        raise SDEValueError('This algorithm does not integrate an ensemble of '
+                            'paths: y0 must have shape (d,).')
+    if rate < 0:
+        raise SDEValueError('rate must be non-negative.')
+    if (dW is not None or I is not None) and jumps is None and rate > 0:
+        # the grid that dW would have to match depends on the random jumps
+        raise SDEValueError('To give dW or I, give the jumps too, so that '
+                            'the merged time grid is known.')
+    if jumps is None:
+        jumps = poissonJumps(tspan[0], tspan[-1], rate, marks, P)
+    if P is None:
+        times, xi = jumps
+        path = None
+    else:
+        times, path, xi = jumps
+    times = np.asarray(times, dtype=float)
+    if np.any(np.diff(times) < 0) or (len(times) > 0 and (
+            times[0] <= tspan[0] or times[-1] > tspan[-1])):
+        raise SDEValueError('Jump times must be increasing and within the '
+                            'interval (tspan[0], tspan[-1]].')
+    # the merged time grid, and where the jumps and output times fall on it:
+    t = np.union1d(tspan, times)
+    h = np.diff(t)
+    jump_at = np.searchsorted(t, times)
+    out_at = np.searchsorted(t, tspan)[::downsample]
+    paths = () if P is None else (P,)
+    if dW is None:
+        dW = deltaW(len(h), np.prod(paths + (m,), dtype=int), h).reshape(
+            (len(h),) + paths + (m,))
+    elif dW.shape != (len(t) - 1,) + paths + (m,):
+        raise SDEValueError('dW must have shape %s, for the time grid of '
+                            'tspan merged with the jump times.' %
+                            (((len(t) - 1,) + paths + (m,)),))
+    if Imethod is not None and I is None:
+        __, I = Imethod(dW, h)
+    elif I is not None and np.shape(I) != (len(t) - 1,) + paths + (m, m):
+        raise SDEValueError('I must have shape %s, for the time grid of '
+                            'tspan merged with the jump times.' %
+                            (((len(t) - 1,) + paths + (m, m)),))
+    y = np.zeros((len(out_at),) + np.shape(y0), dtype=y0.dtype)
+    y[0] = y0
+    k = 1 # next row of output
+    bounds = np.unique(np.concatenate(([0], jump_at, [len(t) - 1])))
+    yn = y0
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        kwargs = dict(dW=dW[a:b]) if I is None else dict(dW=dW[a:b],
+                                                         I=I[a:b])
+        segment = solver(problem, None, yn, t[a:b+1], **kwargs)["trajectory"]
+        yn = segment[-1].copy()
+        # apply all jumps at time t[b], to the state just before the jump
+        i0, i1 = np.searchsorted(jump_at, [b, b + 1])
+        if i1 > i0:
+            if P is None:
+                for i in range(i0, i1):
+                    yn = yn + c(yn, t[b], xi[i])
+            else:
+                rows = np.asarray(path[i0:i1])
+                marks_b = np.asarray(xi[i0:i1])
+                # a path with several jumps at t[b] takes them in turn
+                while len(rows) > 0:
+                    __, first = np.unique(rows, return_index=True)
+                    r = rows[first]
+                    yn[r] = yn[r] + c(yn[r], t[b], marks_b[first])
+                    rest = np.ones(len(rows), dtype=bool)
+                    rest[first] = False
+                    rows, marks_b = rows[rest], marks_b[rest]
+        while k < len(out_at) and out_at[k] <= b:
+            y[k] = segment[out_at[k] - a] if out_at[k] < b else yn
+            k += 1
+    result = {"trajectory": y, "t_jumps": times}
+    if P is not None:
+        result["path_jumps"] = path
+    return result
+
+
+def itoJumpEuler(f, G=None, c=None, y0=None, tspan=None, rate=0.0,
+                 marks=None, jumps=None, dW=None, downsample=1):
+    """Use the jump-adapted Euler-Maruyama algorithm to integrate the Ito
+    jump-diffusion equation
+      dy = f(y,t)dt + G(y,t)dW(t) + c(y(t-),t,xi)dN(t)
+    where N is a Poisson process with intensity rate, and at each of its jumps
+    the state jumps by c(y, t, xi) with a random mark xi.
+
+    The jump times are generated all at once and merged into the time grid of
+    tspan, so that every jump falls at a step boundary (Bruti-Liberati and
+    Platen (2007)). Between jumps the diffusion is integrated by itoEuler with
+    Wiener increments for the merged grid, generated in bulk by deltaW. This
+    has strong order 0.5.
+
+    Args:
+      f: callable(y, t) returning (d,) array
+         Vector-valued function to define the deterministic part of the system
+      G: callable(y, t) returning (d,m) array
+         Matrix-valued function to define the noise coefficients of the system
+      c: callable(y, t, xi) returning (d,) array, the size of a jump from the
+         state y just before it. For an ensemble, c is called with the states
+         of shape (K, d) of the K paths that jump at time t and their marks,
+         and returns an array of shape (K, d).
+      y0: array of shape (d,) giving the initial state vector y(t==0), or of
+        shape (P, d) for an ensemble of P paths, each with its own jumps.
+      tspan (array): The sequence of time points for which to solve for y.
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced.
+      rate (float): the intensity of the Poisson process N
+      marks: optional callable(K) returning an array of K random marks xi,
+        whose first axis has length K. If not given, every xi is 1.
+      jumps: optional tuple (times, marks) (or (times, path, marks) for an
+        ensemble) of pre-generated jumps, as given by sdeint.poissonJumps.
+      dW: optional array of shape (len(t)-1, m) (or (len(t)-1, P, m) for an
+        ensemble) of Wiener increments for the merged time grid
+        t = np.union1d(tspan, times). This requires jumps to be given too.
+      downsample: optional, integer to indicate how frequently to save values.
+
+    Returns:
+      dict with "trajectory": array of shape (len(tspan), d) (or
+        (len(tspan), P, d)) giving the state at each time of tspan, just after
+        any jump at that time; "t_jumps": the jump times; and for an ensemble
+        "path_jumps": the path on which each jump occurred.
+
+    Raises:
+      SDEValueError
+
+    See also:
+      N. Bruti-Liberati and E. Platen (2007) Strong approximations of
+        stochastic differential equations with jumps
+    """
+    return _jump_adapted(itoEuler, f, G, c, y0, tspan, rate, marks, jumps, dW,
+                         downsample, ensemble=True)
+
+
+def itoJumpSRI2(f, G=None, c=None, y0=None, tspan=None, rate=0.0,
+                marks=None, jumps=None, Imethod=Ikpw, dW=None, I=None,
+                downsample=1):
+    """Use the jump-adapted order 1.0 strong algorithm to integrate the Ito
+    jump-diffusion equation
+      dy = f(y,t)dt + G(y,t)dW(t) + c(y(t-),t,xi)dN(t)
+    This is the same as itoJumpEuler, except that between jumps the diffusion
+    is integrated by the Roessler2010 SRI2 algorithm (itoSRI2), with the
+    repeated integrals for the merged grid generated in bulk by Imethod. With
+    jumps at step boundaries the scheme has strong order 1.0.
+
+    Args:
+      f, G, c, y0, tspan, rate, marks, jumps, dW, downsample: as for
+        itoJumpEuler, except that an ensemble is not supported.
+      Imethod (callable, optional): which function to use to simulate repeated
+        Ito integrals. Here you can choose either sdeint.Ikpw (the default) or
+        sdeint.Iwik (which is more accurate but uses a lot of memory in the
+        current implementation).
+      I: optional array of shape (len(t)-1, m, m) of repeated Ito integrals
+        for the merged time grid t = np.union1d(tspan, times).
+
+    Returns:
+      dict, as for itoJumpEuler
+
+    Raises:
+      SDEValueError
+
+    See also:
+      N. Bruti-Liberati and E. Platen (2007) Strong approximations of
+        stochastic differential equations with jumps
+    """
+    return _jump_adapted(itoSRI2, f, G, c, y0, tspan, rate, marks, jumps, dW,
+                         downsample, Imethod=Imethod, I=I)
+
+
+def itoWeakEuler(f, G=None, y0=None, tspan=None, dW=None, normalized=False,
+                 downsample=1, project=None, project_every=1):
+    """Use the simplified weak Euler scheme to integrate the Ito equation
+    dy = f(y,t)dt + G(y,t) dW(t)
+
+    This is the Euler-Maruyama algorithm with each Wiener increment replaced
+    by a two-point distributed random variable. It has weak order 1.0, so use
+    it when only expectations of functionals of the solution are needed. The
+    individual sample paths do not converge to those of the true solution.
+
+    Args:
+      f: callable(y, t) returning (d,) array
+         Vector-valued function to define the deterministic part of the system
+      G: callable(y, t) returning (d,m) array
+         Matrix-valued function to define the noise coefficients of the system
+      y0: array of shape (d,) giving the initial state vector y(t==0)
+      tspan (array): The sequence of time points for which to solve for y.
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
+        tspan[0] is the intial time corresponding to the initial state y0.
+      dW: optional array of shape (len(tspan)-1, m). If not provided, two-point
+        increments will be generated randomly using sdeint.deltaW2pt()
+      downsample: optional, integer to indicate how frequently to save values.
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+
+    Returns:
+      y: array, with shape (len(tspan), len(y0))
+         With the initial value y0 in the first row
+
+    Raises:
+      SDEValueError
+
+    See also:
+      P. Kloeden and E. Platen (1999) Numerical Solution of Stochastic
+        Differential Equations, revised and updated 3rd printing. section 14.1
+    """
+    (d, m, f, G, y0, tspan, dW, __) = _check_args(f, G, y0, tspan, dW, None)
+    if dW is None:
+        dW = deltaW2pt(len(tspan) - 1, m, _check_tspan(tspan))
+    problem = SDEProblem(f, G, y0, tspan, m=m)
+    return itoEuler(problem, dW=dW, normalized=normalized,
+                    downsample=downsample, project=project,
+                    project_every=project_every)
+
+
+def itoWeakKP2(f, G=None, y0=None, tspan=None, Imethod=Iweak, dW=None,
+               I=None, normalized=False, downsample=1, project=None,
+               project_every=1):
+    """Use the Kloeden and Platen explicit derivative-free weak order 2.0
+    algorithm to integrate the Ito equation dy = f(y,t)dt + G(y,t) dW(t)
+
+    This algorithm is for when only weak convergence is needed, i.e. when the
+    aim is to estimate expectations of functionals of the solution. By default
+    the Wiener increments are replaced by three-point distributed random
+    variables and the repeated Ito integrals by the simplified values from
+    sdeint.Iweak(), so no Levy areas need to be simulated. The noise does not
+    need to be scalar, diagonal, or commutative.
+
+    Args:
+      f: A function f(y, t) returning an array of shape (d,)
+         Vector-valued function to define the deterministic part of the system
+
+      G: Either a function G(y, t) that returns an array of shape (d, m),
+         or a list of m functions g(y, t) each returning an array shape (d,).
+
+      y0: array of shape (d,) giving the initial state vector y(t==0)
+
+      tspan (array): The sequence of time points for which to solve for y.
+        These must be increasing, e.g. np.arange(0,10,0.005). They need not
+        be equally spaced: each step is taken from one point to the next.
+        tspan[0] is the intial time corresponding to the initial state y0.
+
+      Imethod (callable, optional): which function to use to generate the
+        repeated integrals. The default sdeint.Iweak is sufficient for weak
+        order 2.0.
+
+      dW: optional array of shape (len(tspan)-1, m).
+      I: optional array of shape (len(tspan)-1, m, m).
+        These optional arguments are for advanced use. If not provided, dW
+        will be generated using sdeint.deltaW3pt() and I using Imethod.
+
+      downsample: optional, integer to indicate how frequently to save values.
+
+      project: optional callable project(y) returning the state y projected
+        onto a constraint set (see sdeint.constraints). It is applied after
+        every project_every'th step. normalized=True is short for
+        project=sdeint.constraints.normalize.
+      project_every: optional, integer to indicate how often to project.
+
+    Returns:
+      y: array, with shape (len(tspan), len(y0))
+         With the initial value y0 in the first row
+
+    Raises:
+      SDEValueError
+
+    See also:
+      P. Kloeden and E. Platen (1999) Numerical Solution of Stochastic
+        Differential Equations, revised and updated 3rd printing. eqn 15.1.3
+    """
+    (d, m, f, G, y0, tspan, dW, I) = _check_args(f, G, y0, tspan, dW, I)
+    N = len(tspan)
+    if dW is None or I is None:
+        h = _check_tspan(tspan)
+    if dW is None:
+        dW = deltaW3pt(N - 1, m, h) # shape (N, m)
+    if I is None:
+        __, I = Imethod(dW, h) # shape (N, m, m)
+    Gmat = _Gmatrix(G)
+    project = _check_project(normalized, project, project_every)
+    # allocate space for result
+    rec = _Recorder(tspan, y0, downsample)
+    Yn1 = y0
+    for n in range(0, N-1):
+        tn = tspan[n]
+        tn1 = tspan[n+1]
+        h = tn1 - tn
+        sqrth = np.sqrt(h)
+        Yn = Yn1 # shape (d,)
+        dWn = dW[n,:] # shape (m,)
+        Iij = I[n,:,:] # shape (m, m)
+        fn = f(Yn, tn)
+        Gn = Gmat(Yn, tn)
+        Yf = Yn + fn*h
+        Ybar = Yf + Gn.dot(dWn)
+        Yn1 = Yn + 0.5*(f(Ybar, tn1) + fn)*h
+        Gs = Gn*sqrth # column r is b^r sqrt(h)
+        for r in range(0, m):
+            # supporting values R+- for column r
+            GRp = Gmat(Yf + Gs[:,r], tn1)[:,r]
+            GRm = Gmat(Yf - Gs[:,r], tn1)[:,r]
+            Yn1 += 0.25*(GRp + GRm + 2.0*Gn[:,r])*dWn[r]
+            Yn1 += 0.5*(GRp - GRm)*Iij[r,r]/sqrth
+            if m > 1:
+                # supporting values U+- give all columns j != r
+                GUp = Gmat(Yn + Gs[:,r], tn)
+                GUm = Gmat(Yn - Gs[:,r], tn)
+                GUp[:,r] = 0.0
+                GUm[:,r] = 0.0
+                Gr = Gn.copy()
+                Gr[:,r] = 0.0
+                Yn1 += 0.25*(GUp + GUm - 2.0*Gr).dot(dWn)
+                Yn1 += 0.5*(GUp - GUm).dot(Iij[r,:])/sqrth
+        if project is not None and (n + 1) % project_every == 0:
+            Yn1 = project(Yn1)
+        rec.record(n, Yn, Yn1)
+    return rec.result()
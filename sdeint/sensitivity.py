@@ -0,0 +1,171 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Pathwise sensitivities of the solution with respect to parameters, by
+forward (tangent-linear) mode differentiation of the integration algorithm.
+
+For the system dy = f(y,t,theta)dt + G(y,t,theta)dW with p parameters theta,
+the sensitivity S = dy/dtheta (of shape (d, p)) is propagated alongside y on
+the same Brownian path. Applying a Runge-Kutta type algorithm such as
+Euler-Maruyama or SRI2 to the augmented state (y, S) with
+  dS = (f_y S + f_theta)dt + (G_y S + G_theta)dW
+gives exactly the derivative of the numerical solution itself, so one
+integration gives the gradient of each path instead of p+1 reruns with finite
+differences. The directional derivatives are computed by the complex step
+method (as in sdeint.integrate.der) unless the Jacobians are supplied.
+
+Gradients of path functionals (see sdeint.functionals) that are linear in
+their function g (TimeIntegral, TimeAverage and TerminalValue) are
+accumulated in the same pass.
+
+Usage:
+    f = lambda y, t, theta: theta[0]*y
+    G = lambda y, t, theta: theta[1]*y.reshape((1, 1))
+    result = sensitivities(f, G, np.array([1.0]), tspan, np.array([0.1, 0.3]),
+                           functionals={'mean': 'average'})
+    result['sensitivity'][-1]  # dy(T)/dtheta, shape (d, p)
+    result['gradients']['mean']  # d(time average of y)/dtheta
+"""
+
+from __future__ import absolute_import
+import copy
+import numpy as np
+from .integrate import itoEuler, itoSRI2, stratSRS2, SDEValueError
+from .functionals import TimeIntegral, TerminalValue, by_name
+
+
+def _tangent(fn, jac, y, S, t, theta, eps):
+    """The value of fn(y, t, theta) and its derivative along the columns of
+    S and the parameters, as an array with a last axis of length p"""
+    value = fn(y, t, theta)
+    if jac is not None:
+        fy, ftheta = jac
+        deriv = np.tensordot(fy(y, t, theta), S, axes=1) + ftheta(y, t, theta)
+        return (value, deriv)
+    p = len(theta)
+    deriv = []
+    for j in range(p):
+        th = np.array(theta, dtype=complex)
+        th[j] += 1j*eps
+        deriv.append(fn(y + 1j*eps*S[:, j], t, th).imag/eps)
+    return (value, np.stack(deriv, axis=-1))
+
+
+def _augmented(f, G, d, p, theta, f_jac, G_jac, eps):
+    """Drift and noise coefficient of the system for the state y together
+    with the sensitivities S, flattened as [y, S.ravel()]"""
+    def f_aug(Y, t):
+        y, S = Y[:d], Y[d:].reshape((d, p))
+        value, deriv = _tangent(f, f_jac, y, S, t, theta, eps)
+        return np.concatenate((value, deriv.ravel()))
+    def G_aug(Y, t):
+        y, S = Y[:d], Y[d:].reshape((d, p))
+        value, deriv = _tangent(G, G_jac, y, S, t, theta, eps)
+        m = value.shape[1]
+        # deriv has shape (d, m, p); rows are ordered as S.ravel():
+        return np.concatenate((value, deriv.transpose((0, 2, 1)).reshape(
+            (d*p, m))))
+    return (f_aug, G_aug)
+
+
+def _functional_tangent(spec, d, p, eps):
+    """A copy of the functional whose g acts on the augmented state, giving g
+    stacked on its p derivatives along the first axis"""
+    if not hasattr(spec, 'step'):
+        if spec not in by_name:
+            raise SDEValueError('Unknown functional %r.' % (spec,))
+        spec = by_name[spec]()
+    if not isinstance(spec, (TimeIntegral, TerminalValue)):
+        raise SDEValueError('Gradients are only available for the functionals '
+                            'TimeIntegral, TimeAverage and TerminalValue.')
+    g = spec.g
+    def g_aug(Y, t):
+        y, S = Y[:d], Y[d:].reshape((d, p))
+        if g is None:
+            return np.concatenate((y[np.newaxis], S.T))
+        deriv = [(g(y + 1j*eps*S[:, j], t)).imag/eps for j in range(p)]
+        return np.stack([np.asarray(g(y, t), dtype=float)] + deriv)
+    tangent = copy.copy(spec)
+    tangent.g = g_aug
+    return tangent
+
+
+def sensitivities(f, G, y0, tspan, theta, solver=itoEuler, dy0=None,
+                  f_jac=None, G_jac=None, functionals=None, eps=1e-20,
+                  **kwargs):
+    """Integrate dy = f(y,t,theta)dt + G(y,t,theta)dW together with the
+    pathwise sensitivity dy/dtheta, on the same realization of the noise.
+
+    Args:
+      f: callable(y, t, theta) returning (d,) array
+      G: callable(y, t, theta) returning (d, m) array
+      y0: array of shape (d,) giving the initial state
+      tspan (array): The sequence of increasing time points
+      theta: array of shape (p,) giving the parameters
+      solver (optional): the algorithm, one of sdeint.itoEuler (default),
+        sdeint.itoSRI2 or sdeint.stratSRS2
+      dy0 (array of shape (d, p), optional): the derivative of y0 with
+        respect to theta. Default zero.
+      f_jac (tuple, optional): (f_y, f_theta), functions of (y, t, theta)
+        returning the Jacobians of f, of shapes (d, d) and (d, p). If not
+        given, derivatives are computed by the complex step method, so f
+        must then accept complex y and theta.
+      G_jac (tuple, optional): (G_y, G_theta) returning the derivatives of G,
+        of shapes (d, m, d) and (d, m, p). Otherwise as for f_jac.
+      functionals (dict, optional): path functionals to accumulate (see
+        sdeint.functionals), each a TimeIntegral, TimeAverage, TerminalValue
+        or one of the names 'integral', 'average' or 'terminal'.
+      eps (float, optional): the complex step
+      **kwargs: other arguments for the solver, such as dW, I or J (to use a
+        specific realization of the noise) and downsample
+
+    Returns:
+      dict with keys
+        "trajectory": array of shape (len(tspan), d) (as downsampled)
+        "sensitivity": array of shape (len(tspan), d, p), dy/dtheta
+        "functionals", "gradients": if functionals were given, the value of
+          each and its derivative, with a last axis of length p
+
+    Raises:
+      SDEValueError
+    """
+    if solver not in (itoEuler, itoSRI2, stratSRS2):
+        raise SDEValueError('solver must be itoEuler, itoSRI2 or stratSRS2.')
+    for name in ('events', 'project', 'normalized', 'inplace'):
+        if kwargs.get(name):
+            raise SDEValueError('%s is not supported with sensitivities.'
+                                % name)
+    y0 = np.asarray(y0)
+    theta = np.asarray(theta, dtype=float)
+    if y0.ndim != 1 or theta.ndim != 1:
+        raise SDEValueError('y0 and theta must be 1-D arrays.')
+    if np.iscomplexobj(y0) and (f_jac is None or G_jac is None):
+        raise SDEValueError('The complex step method needs a real state. '
+                            'Give f_jac and G_jac for a complex equation.')
+    d, p = len(y0), len(theta)
+    S0 = np.zeros((d, p)) if dy0 is None else np.asarray(dy0)
+    if S0.shape != (d, p):
+        raise SDEValueError('dy0 should have shape %s' % ((d, p),))
+    f_aug, G_aug = _augmented(f, G, d, p, theta, f_jac, G_jac, eps)
+    Y0 = np.concatenate((y0, S0.ravel()))
+    if functionals:
+        kwargs['functionals'] = dict(
+            (name, _functional_tangent(spec, d, p, eps)) for name, spec in
+            functionals.items())
+    result = solver(f_aug, G_aug, Y0, tspan, **kwargs)
+    Y = result.get("trajectory")
+    if Y is not None:
+        result["trajectory"] = Y[:, :d]
+        result["sensitivity"] = Y[:, d:].reshape((len(Y), d, p))
+    if functionals:
+        values = result["functionals"]
+        result["functionals"] = dict()
+        result["gradients"] = dict()
+        for name, value in values.items():
+            result["functionals"][name] = value[0]
+            result["gradients"][name] = np.moveaxis(value[1:], 0, -1)
+    return result
@@ -0,0 +1,196 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Pseudo-spectral discretization of stochastic PDEs on periodic domains in
+1D or 2D, of the form
+  du = (nu Laplacian(u) + F(u, t))dt + sigma(u, t) dW(t, x)
+where W is a Wiener process in space and time, either space-time white noise
+or colored noise with a given spectrum in space.
+
+The state on a grid of d points is integrated by the existing SDE algorithms
+as a vector of length d. The Laplacian and the spatial correlation of the
+noise are applied with numpy.fft rather than as d x d matrices: the noise
+coefficient G(u, t) is returned as a matrix-free operator with a .dot()
+method, so memory is O(d) instead of O(d*m).
+
+Usage:
+    spde = PeriodicSPDE((128,), length=2*np.pi, nu=0.1,
+                        F=lambda u, t: u - u**3, sigma=0.2)
+    result = spde.integrate(u0, tspan)  # u0 of shape (128,)
+"""
+
+from __future__ import absolute_import
+import numpy as np
+from .integrate import itoSplitStep, SDEValueError
+
+
+def _wavenumbers(shape, length):
+    """Squared wavenumbers |k|^2 on the grid of numpy.fft.rfftn"""
+    k = [2.0*np.pi*np.fft.fftfreq(n, L/n) for n, L in zip(shape[:-1],
+                                                          length[:-1])]
+    k.append(2.0*np.pi*np.fft.rfftfreq(shape[-1], length[-1]/shape[-1]))
+    grids = np.meshgrid(*k, indexing='ij')
+    return sum(kk**2 for kk in grids)
+
+
+def _spectral(y, shape, multiplier):
+    """Apply a Fourier multiplier to real fields y of shape (..., d)"""
+    axes = tuple(range(-len(shape), 0))
+    field = y.reshape(y.shape[:-1] + shape)
+    out = np.fft.irfftn(multiplier*np.fft.rfftn(field, axes=axes), s=shape,
+                        axes=axes)
+    return out.reshape(y.shape)
+
+
+class FourierMultiplier(object):
+    """A linear operator that is diagonal in Fourier space, acting on fields
+    on a periodic grid flattened to vectors of length d. It can be passed as
+    L to sdeint.itoSplitStep, which then applies (I - hL)^{-1} or expm(hL)
+    by FFT without forming any d x d matrix.
+
+    Args:
+      symbol (array): the multiplier for each wavenumber, on the grid of
+        numpy.fft.rfftn for a real field of the given shape
+      shape (tuple): the shape of the spatial grid
+
+    Attributes:
+      shape: (d, d)
+    """
+    def __init__(self, symbol, shape):
+        self.symbol = symbol
+        self.grid_shape = tuple(shape)
+        d = int(np.prod(shape))
+        self.shape = (d, d)
+        self._cache = dict()
+
+    def dot(self, y):
+        return _spectral(y, self.grid_shape, self.symbol)
+
+    def imex_solve(self, h, y):
+        """Apply (I - hL)^{-1} to y"""
+        key = ('imex', float(h))
+        if key not in self._cache:
+            self._cache[key] = 1.0/(1.0 - h*self.symbol)
+        return _spectral(y, self.grid_shape, self._cache[key])
+
+    def expm_dot(self, h, y):
+        """Apply expm(hL) to y"""
+        key = ('exponential', float(h))
+        if key not in self._cache:
+            self._cache[key] = np.exp(h*self.symbol)
+        return _spectral(y, self.grid_shape, self._cache[key])
+
+
+class SpectralNoise(object):
+    """Matrix-free noise coefficient G = diag(sigma) C for a state of shape
+    (d,) (or (P, d) for an ensemble), where C applies the spatial correlation
+    of the noise to m = d independent Wiener increments, one per grid point.
+    Only .dot() is needed by the SDE algorithms, so the d x m matrix is never
+    formed.
+
+    Args:
+      sigma (float or array): the noise amplitude at each grid point
+      sqrt_spectrum (array): square root of the noise spectrum on the grid of
+        numpy.fft.rfftn, divided by sqrt of the grid cell volume
+      shape (tuple): the shape of the spatial grid
+      state_shape (tuple): the shape (d,) or (P, d) of the state
+    """
+    def __init__(self, sigma, sqrt_spectrum, shape, state_shape):
+        self.sigma = sigma
+        self.sqrt_spectrum = sqrt_spectrum
+        self.grid_shape = shape
+        self.shape = tuple(state_shape) + (state_shape[-1],)
+        self.ndim = len(self.shape)
+
+    def dot(self, dW):
+        return self.sigma*_spectral(dW, self.grid_shape, self.sqrt_spectrum)
+
+    def __add__(self, other):
+        return SpectralNoise(self.sigma + other.sigma, self.sqrt_spectrum,
+                             self.grid_shape, self.shape[:-1])
+
+
+class PeriodicSPDE(object):
+    """The SPDE du = (nu Laplacian(u) + F(u, t))dt + sigma(u, t) dW(t, x) on a
+    periodic 1D or 2D domain, discretized pseudo-spectrally on a uniform grid.
+
+    Args:
+      shape (tuple of int): the number of grid points along each dimension,
+        e.g. (256,) or (64, 64)
+      length (float or tuple, optional): the size of the periodic domain
+        along each dimension. Default 2 pi.
+      nu (float, optional): the diffusion coefficient
+      F (callable(u, t), optional): the nonlinear reaction term, acting on
+        the state as a vector of length d (or array of shape (P, d) for an
+        ensemble) and returning an array of the same shape.
+      sigma (float, or callable(u, t), optional): the noise amplitude, a
+        constant or a function returning an array of the same shape as u
+      noise_spectrum (callable(k2), optional): the spectrum q of the noise in
+        space, as a function of the squared wavenumber |k|^2. Default None
+        gives space-time white noise (q == 1).
+
+    Attributes:
+      d (int): number of grid points
+      L (FourierMultiplier): the linear operator nu Laplacian
+      x (tuple of arrays): the coordinates of the grid points
+    """
+    def __init__(self, shape, length=2.0*np.pi, nu=0.0, F=None, sigma=1.0,
+                 noise_spectrum=None):
+        shape = tuple(shape)
+        if len(shape) not in (1, 2):
+            raise SDEValueError('Only 1D and 2D domains are supported.')
+        if np.ndim(length) == 0:
+            length = (length,)*len(shape)
+        self.shape = shape
+        self.length = tuple(length)
+        self.d = int(np.prod(shape))
+        k2 = _wavenumbers(shape, self.length)
+        self.L = FourierMultiplier(-nu*k2, shape)
+        self.F = F
+        self.sigma = sigma
+        q = np.ones_like(k2) if noise_spectrum is None else noise_spectrum(k2)
+        cell_volume = np.prod([L/n for n, L in zip(shape, self.length)])
+        self._sqrt_spectrum = np.sqrt(q/cell_volume)
+        self.x = tuple(np.meshgrid(*[np.arange(n)*L/n for n, L in
+                                     zip(shape, self.length)], indexing='ij'))
+
+    def f(self, u, t):
+        """The drift apart from the linear part L"""
+        if self.F is None:
+            return np.zeros_like(u)
+        return self.F(u, t)
+
+    def G(self, u, t):
+        """The noise coefficient, as a matrix-free SpectralNoise operator"""
+        sigma = self.sigma(u, t) if callable(self.sigma) else self.sigma
+        return SpectralNoise(sigma, self._sqrt_spectrum, self.shape,
+                             np.shape(u))
+
+    def integrate(self, u0, tspan, method='exponential', **kwargs):
+        """Integrate from the initial field u0 using sdeint.itoSplitStep,
+        with the Laplacian applied exactly ('exponential') or implicitly
+        ('imex') in Fourier space.
+
+        Args:
+          u0 (array): initial field of shape self.shape, or (P,) + self.shape
+            for an ensemble of P paths
+          tspan (array): The sequence of increasing time points
+          method (str, optional): 'exponential' or 'imex'
+          **kwargs: other arguments for itoSplitStep, e.g. downsample
+
+        Returns:
+          dict with "trajectory": array of shape (len(tspan),) + u0.shape
+        """
+        u0 = np.asarray(u0, dtype=float)
+        if u0.shape[-len(self.shape):] != self.shape:
+            raise SDEValueError('u0 should have shape %s' % (self.shape,))
+        y0 = u0.reshape(u0.shape[:-len(self.shape)] + (self.d,))
+        result = itoSplitStep(self.f, self.G, y0, tspan, L=self.L,
+                              method=method, **kwargs)
+        y = result["trajectory"]
+        result["trajectory"] = y.reshape(y.shape[:-1] + self.shape)
+        return result
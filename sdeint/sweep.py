@@ -0,0 +1,113 @@
+# Copyright 2015 Matthew J. Aburn
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version. See <http://www.gnu.org/licenses/>.
+
+"""Simulation of a batch of parameter values together, with common random
+numbers.
+
+For K parameter vectors theta_k, the K copies of the system
+  dy = f(y,t,theta_k)dt + G(y,t,theta_k)dW
+are stacked into one system of dimension K*d that is driven by the same m
+Wiener processes. Any of the integration algorithms then advances all the
+parameter sets in one loop, sharing one realization of dW (and of the
+repeated integrals I or J). Differences between parameter values are then
+not obscured by independent sampling noise, and with f and G vectorized over
+the batch each step costs a few function calls instead of K times as many.
+
+Usage:
+    thetas = np.array([[0.5, 0.1], [0.6, 0.1], [0.7, 0.1]])
+    result = parameter_sweep(f, G, y0, tspan, thetas, vectorized=True)
+    result['trajectory']  # shape (len(tspan), K, d)
+"""
+
+from __future__ import absolute_import
+import copy
+import numpy as np
+from .integrate import itoSRI2, SDEValueError
+from .functionals import Functional, by_name
+
+
+def _batch_functional(spec, K, d):
+    """A copy of the functional whose g sees the stacked state as an array of
+    shape (K, d), so that its value has one entry per parameter vector"""
+    if not isinstance(spec, Functional):
+        if spec not in by_name:
+            raise SDEValueError('Unknown functional %r.' % (spec,))
+        spec = by_name[spec]()
+    g = spec.g
+    batch = copy.copy(spec)
+    if g is None:
+        batch.g = lambda Y, t: Y.reshape((K, d))
+    else:
+        batch.g = lambda Y, t: g(Y.reshape((K, d)), t)
+    return batch
+
+
+def parameter_sweep(f, G, y0, tspan, thetas, solver=itoSRI2, vectorized=False,
+                    **kwargs):
+    """Integrate dy = f(y,t,theta)dt + G(y,t,theta)dW for each of a batch of
+    parameter vectors, all on the same sample path of the Wiener process.
+
+    Args:
+      f: callable(y, t, theta) returning (d,) array. If vectorized, it is
+        called with y of shape (K, d) and theta of shape (K, p) and must
+        return an array of shape (K, d).
+      G: callable(y, t, theta) returning (d, m) array. If vectorized, it is
+        called as for f and must return an array of shape (K, d, m).
+      y0: array of shape (d,) giving the initial state for every parameter
+        vector, or of shape (K, d) giving one for each
+      tspan (array): The sequence of increasing time points
+      thetas: array of shape (K, p) giving the K parameter vectors
+      solver (optional): the algorithm, e.g. sdeint.itoEuler, sdeint.itoSRI2
+        (default, as used by itoint) or sdeint.stratSRS2
+      vectorized (bool, optional): whether f and G accept the whole batch.
+        Otherwise they are called once for each parameter vector.
+      **kwargs: other arguments for the solver, e.g. dW of shape
+        (len(tspan)-1, m) (shared by all parameter vectors) and downsample.
+        The function g of any functionals is called with the states of all
+        the parameter vectors, as an array of shape (K, d), as for an
+        ensemble.
+
+    Returns:
+      dict as returned by the solver, with "trajectory" of shape
+      (len(tspan), K, d) (unless downsample is None) and the values of any
+      functionals with a first axis of length K
+
+    Raises:
+      SDEValueError
+    """
+    thetas = np.asarray(thetas)
+    if thetas.ndim == 1:
+        thetas = thetas.reshape((-1, 1))
+    K = thetas.shape[0]
+    y0 = np.asarray(y0)
+    if y0.ndim == 1:
+        y0 = np.tile(y0, (K, 1))
+    if y0.ndim != 2 or y0.shape[0] != K:
+        raise SDEValueError('y0 should have shape (d,) or (%d, d).' % K)
+    d = y0.shape[1]
+    if vectorized:
+        def f_batch(Y, t):
+            return f(Y.reshape((K, d)), t, thetas).reshape((K*d,))
+        def G_batch(Y, t):
+            Gk = G(Y.reshape((K, d)), t, thetas)
+            return Gk.reshape((K*d, Gk.shape[-1]))
+    else:
+        def f_batch(Y, t):
+            Y = Y.reshape((K, d))
+            return np.concatenate([f(Y[k], t, thetas[k]) for k in range(K)])
+        def G_batch(Y, t):
+            Y = Y.reshape((K, d))
+            return np.concatenate([G(Y[k], t, thetas[k]) for k in range(K)])
+    if kwargs.get('functionals'):
+        kwargs['functionals'] = dict(
+            (name, _batch_functional(spec, K, d)) for name, spec in
+            kwargs['functionals'].items())
+    result = solver(f_batch, G_batch, y0.reshape((K*d,)), tspan, **kwargs)
+    if "trajectory" in result:
+        y = result["trajectory"]
+        result["trajectory"] = y.reshape((len(y), K, d))
+    return result
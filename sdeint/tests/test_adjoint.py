@@ -0,0 +1,80 @@
+"""Tests for adjoint gradients with a checkpointed reverse sweep.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.adjoint import adjoint_gradient
+from sdeint.sensitivity import sensitivities
+
+A = np.array([[-0.5, 0.2], [0.1, -0.3]])
+f = lambda y, t, theta: A.dot(y) + theta[0]*np.sin(y) + theta[1]
+G = lambda y, t, theta: np.array([[theta[2]*y[0], 0.1], [0.2, theta[2]*y[1]]])
+theta = np.array([0.4, -0.2, 0.3])
+y0 = np.array([1.0, 0.5])
+tspan = np.linspace(0.0, 1.0, 101)
+h = tspan[1] - tspan[0]
+terminal = lambda y: np.sum(y**2)
+running = lambda y, t: y[0]*y[1]
+
+
+def _forward_gradient(solver, dW, I):
+    """The same gradient, from the forward sensitivities"""
+    kwargs = dict(dW=dW) if I is None else dict(dW=dW, I=I)
+    result = sensitivities(f, G, y0, tspan, theta, solver=solver, **kwargs)
+    y, S = result["trajectory"], result["sensitivity"]
+    grad = 2*y[-1].dot(S[-1])
+    dr = y[:, 1, np.newaxis]*S[:, 0] + y[:, 0, np.newaxis]*S[:, 1]
+    grad += 0.5*h*np.sum(dr[1:] + dr[:-1], axis=0)
+    return grad
+
+
+def test_euler_adjoint():
+    dW = sdeint.deltaW(100, 2, h)
+    result = adjoint_gradient(f, G, y0, tspan, theta, terminal=terminal,
+                              running=running, dW=dW)
+    assert(np.allclose(result["gradient"], _forward_gradient(sdeint.itoEuler,
+                                                             dW, None)))
+    y = sdeint.itoEuler(lambda y, t: f(y, t, theta),
+                        lambda y, t: G(y, t, theta), y0, tspan,
+                        dW=dW)["trajectory"]
+    assert(np.allclose(result["y_final"], y[-1]))
+    J = terminal(y[-1]) + 0.5*h*np.sum(y[1:, 0]*y[1:, 1] + y[:-1, 0]*y[:-1, 1])
+    assert(np.isclose(result["value"], J))
+    # checkpoint spacing does not change the result:
+    other = adjoint_gradient(f, G, y0, tspan, theta, terminal=terminal,
+                             running=running, dW=dW, checkpoint_every=7)
+    assert(np.allclose(other["gradient"], result["gradient"]))
+    # gradient with respect to y0, checked by complex step:
+    eps = 1e-20
+    for i in range(2):
+        z0 = y0.astype(complex)
+        z0[i] += 1j*eps
+        y = sdeint.itoEuler(lambda y, t: f(y, t, theta),
+                            lambda y, t: G(y, t, theta), z0, tspan,
+                            dW=dW)["trajectory"]
+        Jc = terminal(y[-1]) + 0.5*h*np.sum(y[1:, 0]*y[1:, 1] +
+                                            y[:-1, 0]*y[:-1, 1])
+        assert(np.isclose(result["gradient_y0"][i], Jc.imag/eps))
+
+
+def test_sri2_adjoint_with_replayed_noise():
+    noise = sdeint.CounterNoise(2, h, seed=7, block=16)
+    dW, I = noise.integrals(0, 100)
+    f_vjp = lambda y, t, th, v: (A.T.dot(v) + th[0]*np.cos(y)*v,
+                                 np.array([v.dot(np.sin(y)), np.sum(v), 0.0]))
+    G_vjp = lambda y, t, th, V: (th[2]*np.diag(V), np.array(
+        [0.0, 0.0, V[0, 0]*y[0] + V[1, 1]*y[1]]))
+    result = adjoint_gradient(f, G, y0, tspan, theta, terminal=terminal,
+                              running=running, solver=sdeint.itoSRI2,
+                              noise=noise, f_vjp=f_vjp, G_vjp=G_vjp)
+    assert(np.allclose(result["gradient"], _forward_gradient(sdeint.itoSRI2,
+                                                             dW, I)))
+    with pytest.raises(sdeint.SDEValueError):
+        adjoint_gradient(f, G, y0, tspan, theta, terminal=terminal,
+                         solver=sdeint.itoSRI2, dW=dW)
+    # the noise is generated only for an equally spaced tspan:
+    uneven = np.concatenate((tspan[:50], tspan[50:] + 0.001))
+    uneven[-1] = tspan[-1]
+    with pytest.raises(sdeint.SDEValueError):
+        adjoint_gradient(f, G, y0, uneven, theta, terminal=terminal)
@@ -0,0 +1,54 @@
+"""Tests for the projections onto constraint sets.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.constraints import (normalize, normalize_blocks, normalize_metric,
+                                project_simplex)
+
+
+def test_projections():
+    P = 20
+    y = np.random.normal(size=(P, 5)) + 1j*np.random.normal(size=(P, 5))
+    assert(np.allclose(np.linalg.norm(normalize(y), axis=-1), 1.0))
+    yb = normalize_blocks([2, 3])(y)
+    assert(np.allclose(np.linalg.norm(yb[:,:2], axis=-1), 1.0))
+    assert(np.allclose(np.linalg.norm(yb[:,2:], axis=-1), 1.0))
+    assert(np.allclose(yb[3], normalize_blocks([2, 3])(y[3])))
+    L = np.random.normal(size=(5, 5))
+    M = L.dot(L.T) + 5*np.eye(5)
+    ym = normalize_metric(M)(y)
+    assert(np.allclose(np.einsum('pi,ij,pj->p', ym.conj(), M, ym), 1.0))
+    x = np.random.normal(size=(P, 5))
+    xs = project_simplex(x)
+    assert(np.all(xs >= 0) and np.allclose(xs.sum(axis=-1), 1.0))
+    # a point already on the simplex is unchanged
+    assert(np.allclose(project_simplex(xs), xs))
+    # and the projection is the nearest point: compare with random points
+    z = project_simplex(np.random.uniform(size=(1000, 5)))
+    dists = np.linalg.norm(z - x[0], axis=-1)
+    assert(np.linalg.norm(xs[0] - x[0]) <= dists.min() + 1e-12)
+
+
+def test_project_in_solvers():
+    """Projection applied every k steps keeps the solution on the sphere, and
+    project=normalize is the same as normalized=True"""
+    f = lambda y, t: -0.5*y
+    G = lambda y, t: np.array([[-y[1], 0.1], [y[0], 0.2]])
+    y0 = np.array([1.0, 0.0])
+    tspan = np.linspace(0.0, 2.0, 201)
+    dW = sdeint.deltaW(200, 2, 0.01)
+    __, I = sdeint.Ikpw(dW, 0.01)
+    for solver, kwargs in ((sdeint.itoEuler, {}),
+                           (sdeint.stratHeun, {}),
+                           (sdeint.itoSRI2, {'I': I}),
+                           (sdeint.itoWeakKP2, {'I': I})):
+        y1 = solver(f, G, y0, tspan, dW=dW, normalized=True, **kwargs)
+        y2 = solver(f, G, y0, tspan, dW=dW, project=normalize, **kwargs)
+        assert(np.allclose(y1["trajectory"], y2["trajectory"]))
+        y3 = solver(f, G, y0, tspan, dW=dW, project=normalize,
+                    project_every=10, **kwargs)["trajectory"]
+        assert(np.allclose(np.linalg.norm(y3[::10], axis=-1), 1.0))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoEuler(f, G, y0, tspan, project=normalize, project_every=0)
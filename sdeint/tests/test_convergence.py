@@ -0,0 +1,68 @@
+"""Tests for the convergence study tools.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.convergence import coarsen, convergence_study, cheapest
+
+
+def test_coarsen():
+    N, m, h = 64, 3, 0.01
+    dW = sdeint.deltaW(N, m, h)
+    A, I = sdeint.Ikpw(dW, h)
+    dW4, I4 = coarsen(dW, I, 4)
+    assert(np.allclose(dW4, dW.reshape((16, 4, m)).sum(axis=1)))
+    # combining in two stages is the same as combining in one:
+    dW2, I2 = coarsen(dW, I, 2)
+    assert(np.allclose(coarsen(dW2, I2, 2)[1], I4))
+    # the symmetric part is fixed by the increments for the longer step:
+    sym = 0.5*(I4 + I4.transpose((0, 2, 1)))
+    expected = 0.5*(np.einsum('ni,nj->nij', dW4, dW4) - 4*h*np.eye(m))
+    assert(np.allclose(sym, expected))
+    J = I + 0.5*h*np.eye(m)
+    assert(np.allclose(coarsen(dW, J, 4)[1], I4 + 2*h*np.eye(m)))
+    with pytest.raises(sdeint.SDEValueError):
+        coarsen(dW, I, 5)
+
+
+def test_convergence_study():
+    """Empirical strong orders for geometric Brownian motion"""
+    a, b = 1.0, 0.5
+    f = lambda y, t: a*y
+    G = lambda y, t: b*np.array([[y[0]]])
+    problem = sdeint.SDEProblem(f, G, np.array([1.0]),
+                                np.linspace(0.0, 1.0, 257))
+    exact = lambda t, W: np.exp((a - 0.5*b**2)*t + b*W)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(2) as executor:
+        results = convergence_study(problem, [sdeint.itoEuler, sdeint.itoSRI2],
+                                    factors=(4, 8, 16, 32), paths=200,
+                                    exact=exact, executor=executor)
+    euler = results['itoEuler']
+    sri2 = results['itoSRI2']
+    assert(np.allclose(euler['h'], [1/64., 1/32., 1/16., 1/8.]))
+    assert(0.25 < euler['strong_order'] < 0.9)
+    assert(0.75 < sri2['strong_order'] < 1.35)
+    assert(np.all(sri2['strong_error'] < euler['strong_error']))
+    assert(np.all(euler['cpu_time'] > 0) and np.all(euler['memory'] > 0))
+    tol = sri2['strong_error'][-1]
+    name, factor, h = cheapest(results, tol)
+    k = list(results[name]['factor']).index(factor)
+    assert(results[name]['strong_error'][k] <= tol)
+    for r in results.values():
+        ok = r['strong_error'] <= tol
+        assert(np.all(r['cpu_time'][ok] >= results[name]['cpu_time'][k]))
+    assert(cheapest(results, 0.0) is None)
+    # without an exact solution, the fine solution of the first is the
+    # reference
+    results = convergence_study(problem, {'SRI2': sdeint.itoSRI2},
+                                factors=(1, 4, 16), paths=20, memory=False)
+    assert(results['SRI2']['strong_error'][0] == 0.0)
+    assert('memory' not in results['SRI2'])
+    # I is also passed to a solver wrapped by functools.partial:
+    import functools
+    wrapped = functools.partial(sdeint.itoSRI2, downsample=1)
+    results = convergence_study(problem, {'SRI2': wrapped}, factors=(1, 4),
+                                paths=5, memory=False)
+    assert(results['SRI2']['strong_error'][0] == 0.0)
@@ -0,0 +1,55 @@
+"""Tests for the particle filter.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.filtering import ParticleFilter, systematic_resample
+
+
+def test_systematic_resample():
+    w = np.random.dirichlet(np.ones(50))
+    idx = systematic_resample(w)
+    assert(len(idx) == 50 and np.all(np.diff(idx) >= 0))
+    counts = np.bincount(idx, minlength=50)
+    assert(np.all(np.abs(counts - 50*w) < 1.0))
+    assert(np.array_equal(systematic_resample(np.full(4, 0.25), 0.5),
+                          np.arange(4)))
+
+
+def test_particle_filter_ou():
+    """Compare with the Kalman filter for an Ornstein-Uhlenbeck process
+    observed with Gaussian noise"""
+    a, s, r = 1.0, 0.8, 0.3
+    f = lambda y, t: -a*y
+    G = lambda y, t: s*np.ones(y.shape + (1,))
+    times = np.arange(1, 21)*0.25
+    # a true path and noisy observations of it:
+    x = 0.0
+    obs = []
+    for k in range(len(times)):
+        dt = 0.25
+        x = x*np.exp(-a*dt) + np.random.normal(
+            0.0, s*np.sqrt((1 - np.exp(-2*a*dt))/(2*a)))
+        obs.append(x + r*np.random.normal())
+    loglik = lambda y, z, t: -0.5*((y[:, 0] - z)/r)**2
+    P = 4000
+    pf = ParticleFilter(f, G, np.zeros((P, 1)), 0.0, loglik, dt=0.01)
+    means = pf.run(times, obs)
+    assert(means.shape == (20, 1))
+    m, v = 0.0, 0.0
+    kalman = []
+    for z in obs:
+        m = m*np.exp(-a*0.25)
+        v = v*np.exp(-2*a*0.25) + s**2*(1 - np.exp(-2*a*0.25))/(2*a)
+        gain = v/(v + r**2)
+        m, v = m + gain*(z - m), (1 - gain)*v
+        kalman.append(m)
+    assert(np.allclose(means[:, 0], kalman, atol=0.08))
+    assert(np.isfinite(pf.log_likelihood) and pf.t == times[-1])
+    # an algorithm without ensemble support steps each particle in turn:
+    pf2 = ParticleFilter(f, G, np.zeros((200, 1)), 0.0, loglik,
+                         solver=sdeint.itoSRI2, dt=0.05)
+    assert(pf2.update(times[0], obs[0]).shape == (1,))
+    with pytest.raises(sdeint.SDEValueError):
+        pf2.update(0.0, obs[0])
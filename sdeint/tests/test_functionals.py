@@ -0,0 +1,80 @@
+"""Tests for the path functionals accumulated during integration.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.functionals import (Functional, TimeIntegral, TimeAverage,
+                                RunningMax, TerminalValue, Reducer)
+
+
+def test_functionals_match_trajectory():
+    f = lambda y, t: -y
+    G = lambda y, t: 0.5*np.eye(2)
+    H = lambda y, t: np.zeros((2, 2, 2))
+    tspan = np.linspace(0.0, 1.0, 201)
+    dW = sdeint.deltaW(200, 2, tspan[1])
+    functionals = {'int': 'integral', 'avg': 'average', 'max': 'max',
+                   'min': 'min', 'end': 'terminal',
+                   'sq': TimeIntegral(lambda y, t: y[0]**2),
+                   'count': Reducer(lambda acc, tn, tn1, y, rows: acc + 1,
+                                    lambda y0, t0: 0)}
+    solvers = [(sdeint.itoEuler, (f, G)), (sdeint.stratHeun, (f, G)),
+               (sdeint.itoSRI2, (f, G)), (sdeint.stratSRS2, (f, G)),
+               (sdeint.itoMilstein, (f, G, H)), (sdeint.stratKP2iS, (f, G))]
+    for solver, fns in solvers:
+        result = solver(*(fns + (np.ones(2), tspan)), dW=dW,
+                        functionals=functionals)
+        y = result["trajectory"]
+        values = result["functionals"]
+        # the trapezoidal rule (np.trapezoid needs numpy >= 2.0)
+        integral = 0.5*np.sum((y[1:] + y[:-1])*np.diff(tspan)[:,None], axis=0)
+        assert(np.allclose(values['int'], integral))
+        assert(np.allclose(values['avg'], values['int']))
+        assert(np.allclose(values['max'], y.max(axis=0)))
+        assert(np.allclose(values['min'], y.min(axis=0)))
+        assert(np.allclose(values['end'], y[-1]))
+        sq = y[:,0]**2
+        assert(np.isclose(values['sq'], 0.5*np.sum((sq[1:] + sq[:-1])*
+                                                   np.diff(tspan))))
+        assert(values['count'] == 200)
+        # the same functionals without recording the trajectory:
+        result = solver(*(fns + (np.ones(2), tspan)), dW=dW,
+                        downsample=None, functionals=functionals)
+        assert("trajectory" not in result)
+        assert(np.allclose(result["functionals"]['max'], y.max(axis=0)))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoEuler(f, G, np.ones(2), tspan, functionals={'x': 'mean'})
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoEuler(f, G, np.ones(2), tspan, downsample=None)
+
+
+def test_functionals_ensemble():
+    """Each path of an ensemble accumulates its own values, and paths stopped
+    by a terminal event stop accumulating"""
+    P = 50
+    f = lambda y, t: -y
+    G = lambda y, t: 0.1*np.broadcast_to(np.eye(2), (len(y), 2, 2))
+    tspan = np.linspace(0.0, 2.0, 401)
+    event = lambda y, t: y[:,0] - 0.5
+    event.terminal = True
+    functionals = {'avg': TimeAverage(lambda y, t: y[:,0]),
+                   'peak': RunningMax(), 'end': TerminalValue()}
+    result = sdeint.itoEuler(f, G, np.ones((P, 2)), tspan, events=event,
+                             functionals=functionals, downsample=None)
+    values = result["functionals"]
+    assert(values['avg'].shape == (P,) and values['peak'].shape == (P, 2))
+    assert(np.all(values['peak'] >= 1.0))
+    # each path ends at its event, where y[0] is about 0.5:
+    assert(np.all(np.abs(values['end'][:,0] - 0.5) < 0.05))
+    assert(np.all((values['avg'] > 0.5) & (values['avg'] < 1.0)))
+
+
+def test_functional_abstract():
+    """A functional that does not define step() cannot be instantiated"""
+    class NoStep(Functional):
+        pass
+    with pytest.raises(TypeError):
+        NoStep()
+    with pytest.raises(TypeError):
+        Functional()
@@ -65,7 +65,7 @@ def _assert_close(approx_sol, exact_sol, relTol=1e-2, absTol=1e-2):
         absError = np.abs(approx_sol - exact_sol)
         relError = absError/np.abs(exact_sol)
     ok = (absError <= absTol) | (relError <= relTol)
-    if np.alltrue(ok):
+    if np.all(ok):
         return
     else:
         ind = np.nonzero(~ok)[0][0]
@@ -486,3 +486,588 @@ def test_stratKP2iS_1D_additive():
     y = sdeint.stratKP2iS(f, G, y0, tspan)
     assert(np.isclose(np.mean(y), 0.0, rtol=0, atol=1e-02))
     assert(np.isclose(np.var(y), 0.2*0.2/2, rtol=1e-01, atol=0))
+
+
+def _sin_noise_system(m, T):
+    """A 3D system with linear drift A y and noise coefficient B sin(y), whose
+    f, G and columns of G also accept an out argument (in-place mode) and G a
+    batch of states of shape (d, K). Returns (f, G, G_separate, y0, tspan,
+    dW, I) with one realization of the noise."""
+    d = 3
+    h = 0.002
+    tspan = np.arange(0.0, T, h)
+    A = np.array([[-1.0, 0.2, 0.0], [0.0, -0.5, 0.1], [0.3, 0.0, -2.0]])
+    B = np.random.uniform(0.0, 0.3, (d, m))
+    def f(y, t, out=None):
+        if out is None:
+            return A.dot(y)
+        np.dot(A, y, out=out)
+    def G(y, t, out=None):
+        if y.ndim == 2:
+            return B*np.sin(y.T).reshape((-1, d, 1)) # shape (K, d, m)
+        if out is None:
+            return B*np.sin(y).reshape((d, 1))
+        np.multiply(B, np.sin(y).reshape((d, 1)), out=out)
+    def make_g(k):
+        def g(y, t, out=None):
+            if out is None:
+                return B[:,k]*np.sin(y)
+            np.multiply(B[:,k], np.sin(y), out=out)
+        return g
+    G_separate = [make_g(k) for k in range(m)]
+    dW = sdeint.deltaW(len(tspan) - 1, m, h)
+    __, I = sdeint.Ikpw(dW, h)
+    return (f, G, G_separate, np.ones(d), tspan, dW, I)
+
+
+def test_SRK2_inplace():
+    """The in-place mode must reproduce exactly the same sample path"""
+    f, G, G_separate, y0, tspan, dW, I = _sin_noise_system(2, 1.0)
+    h = tspan[1] - tspan[0]
+    J = I + 0.5*h*np.eye(2).reshape((1, 2, 2))
+    y1 = sdeint.itoSRI2(f, G, y0, tspan, dW=dW, I=I)["trajectory"]
+    y2 = sdeint.itoSRI2(f, G, y0, tspan, dW=dW, I=I, inplace=True)
+    y3 = sdeint.itoSRI2(f, G_separate, y0, tspan, dW=dW, I=I, inplace=True)
+    assert(np.allclose(y1, y2["trajectory"], rtol=1e-12, atol=1e-14))
+    assert(np.allclose(y1, y3["trajectory"], rtol=1e-12, atol=1e-14))
+    y4 = sdeint.stratSRS2(f, G, y0, tspan, dW=dW, J=J)["trajectory"]
+    y5 = sdeint.stratSRS2(f, G_separate, y0, tspan, dW=dW, J=J, inplace=True)
+    assert(np.allclose(y4, y5["trajectory"], rtol=1e-12, atol=1e-14))
+
+
+def test_itoWeakKP2_moments():
+    """Weak order 2.0 scheme should give the first two moments of geometric
+    Brownian motion with two driving noise processes, even with few steps."""
+    a = 0.5
+    b1 = 0.4
+    b2 = 0.3
+    f = lambda y, t: a*y
+    G = lambda y, t: np.array([[b1*y[0], b2*y[0]]])
+    tspan = np.linspace(0.0, 1.0, 9)
+    P = 2000
+    X = np.array([sdeint.itoWeakKP2(f, G, np.array([1.0]), tspan)[
+                  "trajectory"][-1,0] for p in range(P)])
+    assert(np.abs(X.mean() - np.exp(a)) < 4.0*X.std()/np.sqrt(P))
+    X2 = X**2
+    exact2 = np.exp(2*a + b1**2 + b2**2)
+    assert(np.abs(X2.mean() - exact2) < 4.0*X2.std()/np.sqrt(P))
+
+
+def test_SDEProblem_reuse():
+    """A prepared problem gives the same results as the plain arguments, and
+    f, G are not called again to check shapes."""
+    calls = [0]
+    def f(y, t):
+        calls[0] += 1
+        return -1.0*y
+    G = lambda y, t: 0.2
+    tspan = np.linspace(0.0, 1.0, 101)
+    dW = sdeint.deltaW(100, 1, 0.01)
+    problem = sdeint.SDEProblem(f, G, 0.5, tspan)
+    assert(problem.d == 1 and problem.m == 1)
+    calls[0] = 0
+    y1 = sdeint.itoEuler(problem, dW=dW)["trajectory"]
+    assert(calls[0] == 100)
+    y2 = sdeint.itoEuler(f, G, 0.5, tspan, dW=dW)["trajectory"]
+    assert(np.allclose(y1, y2))
+    y3 = sdeint.itoEuler(problem, y0=0.5, dW=dW)["trajectory"]
+    assert(np.allclose(y1, y3))
+    # G is already part of the problem:
+    for solver in (sdeint.itoEuler, sdeint.itoSRI2):
+        with pytest.raises(sdeint.SDEValueError):
+            solver(problem, G, dW=dW)
+    declared = sdeint.SDEProblem(f, G, 0.5, tspan, m=1)
+    calls[0] = 0
+    sdeint.itoSRI2(declared)
+    assert(calls[0] == 2*100)
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoEuler(problem, y0=np.zeros(2))
+
+
+def test_nonuniform_tspan():
+    """Solve geometric Brownian motion on a grid that is fine near t=0 and
+    coarse later, comparing against the exact solution."""
+    a = -0.02
+    b1 = 1.0
+    b2 = 2.0
+    f = lambda y, t: np.array([a*y[0]])
+    G = lambda y, t: np.array([[b1*y[0], b2*y[0]]])
+    tspan = np.concatenate((np.arange(0.0, 1.0, 0.0001),
+                            np.arange(1.0, 2.0, 0.0004)))
+    N = len(tspan)
+    y0 = np.array([1.0])
+    h = np.diff(tspan)
+    dW = sdeint.deltaW(N - 1, 2, h)
+    __, I = sdeint.Iwik(dW, h)
+    W = np.vstack((np.zeros((1, 2)), np.cumsum(dW, axis=0)))
+    y = np.exp((a - (b1**2 + b2**2)/2.0)*tspan + b1*W[:,0] + b2*W[:,1])
+    yEuler = sdeint.itoEuler(f, G, y0, tspan, dW=dW)["trajectory"][:,0]
+    _assert_close(yEuler, y, 1e-1, 1e-1)
+    ySRI2 = sdeint.itoSRI2(f, G, y0, tspan, dW=dW, I=I)["trajectory"][:,0]
+    _assert_close(ySRI2, y, 1e-2, 1e-2)
+    # without dW given, increments are generated with the right variance
+    sdeint.itoSRI2(f, G, y0, tspan)
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoEuler(f, G, y0, tspan[::-1])
+    # steps are compared relative to their size, however small they are
+    h = sdeint.integrate._check_tspan(np.array([0.0, 1e-9, 1e-8, 1.1e-8]))
+    assert(np.allclose(h, [1e-9, 9e-9, 1e-9], rtol=1e-6, atol=0.0))
+    h = sdeint.integrate._check_tspan(np.linspace(0.0, 1e-8, 11))
+    assert(np.ndim(h) == 0 and np.isclose(h, 1e-9, rtol=1e-6, atol=0.0))
+
+
+def test_downsample_and_t_eval():
+    """Output every k'th step, or at arbitrary times t_eval"""
+    f = lambda y, t: -1.0*y
+    G = lambda y, t: np.array([[0.2, 0.1], [0.0, 0.3]])
+    y0 = np.array([1.0, 2.0])
+    tspan = np.linspace(0.0, 1.0, 101)
+    dW = sdeint.deltaW(100, 2, 0.01)
+    __, I = sdeint.Ikpw(dW, 0.01)
+    J = I + 0.005*np.eye(2)
+    for solver, kwargs in ((sdeint.itoEuler, {}),
+                           (sdeint.itoSRI2, {'I': I}),
+                           (sdeint.stratHeun, {}),
+                           (sdeint.stratSRS2, {'J': J}),
+                           (sdeint.stratKP2iS, {'J': J})):
+        y = solver(f, G, y0, tspan, dW=dW, **kwargs)["trajectory"]
+        assert(np.allclose(y[0], y0))
+        y10 = solver(f, G, y0, tspan, dW=dW, downsample=10, **kwargs)
+        assert(np.allclose(y10["trajectory"], y[::10]))
+        t_eval = tspan[[0, 5, 50, 100]]
+        ye = solver(f, G, y0, tspan, dW=dW, t_eval=t_eval, **kwargs)
+        assert(np.allclose(ye["trajectory"], y[[0, 5, 50, 100]]))
+    # Between steps, for dy = dW the Brownian bridge gives y(t) ~ N(0, t)
+    f = lambda y, t: 0.0
+    G = lambda y, t: 1.0
+    tspan = np.array([0.0, 1.0, 2.0])
+    t_eval = np.array([0.25, 0.5, 1.5])
+    P = 4000
+    ys = np.array([sdeint.itoEuler(f, G, 0.0, tspan, t_eval=t_eval)[
+                   "trajectory"][:,0] for p in range(P)])
+    assert(np.allclose(np.var(ys, axis=0), t_eval, rtol=0.1))
+    # increments over disjoint intervals are uncorrelated
+    assert(np.abs(np.corrcoef(ys[:,0], ys[:,1] - ys[:,0])[0,1]) < 0.1)
+
+
+def test_events():
+    """First passage of dy = dW through y == 1, for one path and an ensemble
+    in which the paths that have hit the barrier are stopped"""
+    f = lambda y, t: np.zeros_like(y)
+    G = lambda y, t: np.ones(y.shape + (1,))
+    def barrier(y, t):
+        return y[...,0] - 1.0
+    barrier.terminal = True
+    barrier.direction = 1
+    tspan = np.linspace(0.0, 5.0, 1001)
+    dW = sdeint.deltaW(1000, 1, 0.005)
+    W = np.concatenate(([0.0], np.cumsum(dW[:,0])))
+    for solver in (sdeint.itoEuler, sdeint.itoSRI2):
+        result = solver(f, G, np.zeros(1), tspan, dW=dW, events=barrier)
+        y = result["trajectory"]
+        if np.any(W >= 1.0):
+            n = np.argmax(W >= 1.0)
+            assert(len(y) == n + 1)
+            assert(np.allclose(y[:,0], W[:n+1]))
+            assert(tspan[n-1] < result["t_events"][0][0] <= tspan[n])
+            assert(np.allclose(result["y_events"][0], [[1.0]]))
+        else:
+            assert(len(y) == len(tspan))
+            assert(len(result["t_events"][0]) == 0)
+    P = 200
+    calls = []
+    def Gcount(y, t):
+        calls.append(len(y))
+        return G(y, t)
+    result = sdeint.itoEuler(f, Gcount, np.zeros((P, 1)), tspan,
+                             events=barrier)
+    y = result["trajectory"]
+    paths = result["path_events"][0]
+    assert(y.shape[1:] == (P, 1))
+    assert(len(np.unique(paths)) == len(paths))
+    assert(np.allclose(result["y_events"][0], 1.0))
+    # stopped paths keep their value, and are no longer stepped
+    assert(np.all(y[-1, paths, 0] >= 1.0))
+    assert(sum(calls) < P*len(tspan))
+    # P(hit 1 before t=5) == 2 P(W(5) > 1) for Brownian motion
+    assert(abs(len(paths)/P - 0.6547) < 0.15)
+
+
+def test_packed_integrals():
+    """Solvers give the same result when the repeated integrals are packed"""
+    f = lambda y, t: -1.0*y
+    G = lambda y, t: np.array([[0.2*y[0], 0.1, 0.0], [0.0, 0.3, 0.1*y[1]]])
+    H = lambda y, t: np.zeros((2, 3, 3))
+    y0 = np.array([1.0, 2.0])
+    tspan = np.linspace(0.0, 1.0, 101)
+    dW = sdeint.deltaW(100, 3, 0.01)
+    __, I = sdeint.Ikpw(dW, 0.01)
+    P = sdeint.PackedIntegrals.from_dense(dW, 0.01, I)
+    J = sdeint.PackedIntegrals.from_dense(
+        dW, 0.01, I + 0.005*np.eye(3), stratonovich=True)
+    for solver, kwargs, packed in (
+            (sdeint.itoSRI2, {'I': I}, {'I': P}),
+            (sdeint.stratSRS2, {'J': np.asarray(J)}, {'J': J}),
+            (sdeint.stratKP2iS, {'J': np.asarray(J)}, {'J': J}),
+            (sdeint.itoMilstein, {'H': H, 'I': I}, {'H': H, 'I': P})):
+        y = solver(f, G, y0=y0, tspan=tspan, dW=dW, **kwargs)["trajectory"]
+        yp = solver(f, G, y0=y0, tspan=tspan, dW=dW, **packed)["trajectory"]
+        assert(np.allclose(y, yp))
+
+
+def test_SRK2_executor():
+    """Evaluating the columns of G in a thread pool gives the same path"""
+    from concurrent.futures import ThreadPoolExecutor
+    f, G, G_separate, y0, tspan, dW, I = _sin_noise_system(4, 0.5)
+    y1 = sdeint.itoSRI2(f, G_separate, y0, tspan, dW=dW, I=I)["trajectory"]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        y2 = sdeint.itoSRI2(f, G_separate, y0, tspan, dW=dW, I=I,
+                            executor=executor)["trajectory"]
+        y3 = sdeint.stratSRS2(f, G_separate, y0, tspan, dW=dW, J=I,
+                              inplace=True, executor=executor)["trajectory"]
+        y4 = sdeint.stratSRS2(f, G_separate, y0, tspan, dW=dW,
+                              J=I)["trajectory"]
+        with pytest.raises(sdeint.SDEValueError):
+            sdeint.itoSRI2(f, G, y0, tspan, executor=executor)
+    assert(np.allclose(y1, y2, rtol=1e-12, atol=1e-14))
+    assert(np.allclose(y3, y4, rtol=1e-12, atol=1e-14))
+
+
+def test_SRK2_batched_G():
+    """Evaluating G at all stage points in one call gives the same path"""
+    f, G, G_separate, y0, tspan, dW, I = _sin_noise_system(4, 0.5)
+    y1 = sdeint.itoSRI2(f, G, y0, tspan, dW=dW, I=I)["trajectory"]
+    y2 = sdeint.itoSRI2(f, G, y0, tspan, dW=dW, I=I,
+                        batched_G=True)["trajectory"]
+    assert(np.allclose(y1, y2, rtol=1e-12, atol=1e-14))
+    y3 = sdeint.stratSRS2(f, G, y0, tspan, dW=dW, J=I)["trajectory"]
+    y4 = sdeint.stratSRS2(f, G, y0, tspan, dW=dW, J=I,
+                          batched_G=True)["trajectory"]
+    assert(np.allclose(y3, y4, rtol=1e-12, atol=1e-14))
+
+
+def test_ensemble():
+    """An ensemble of paths gives the same paths as integrating each alone"""
+    f = lambda y, t: -1.0*y
+    G = lambda y, t: np.array([[0.2*y[0], 0.1], [0.0, 0.3*y[1]]])
+    def fP(y, t):
+        return -1.0*y
+    def GP(y, t):
+        P = len(y)
+        Gs = np.zeros((P, 2, 2))
+        Gs[:,0,0] = 0.2*y[:,0]
+        Gs[:,0,1] = 0.1
+        Gs[:,1,1] = 0.3*y[:,1]
+        return Gs
+    P = 5
+    y0 = np.random.uniform(0.5, 2.0, (P, 2))
+    tspan = np.linspace(0.0, 1.0, 201)
+    dW = sdeint.deltaW(200, 2*P, 0.005).reshape((200, P, 2))
+    for solver in (sdeint.itoEuler, sdeint.stratHeun):
+        y = solver(fP, GP, y0, tspan, dW=dW, downsample=10)["trajectory"]
+        assert(y.shape == (21, P, 2))
+        for p in range(P):
+            yp = solver(f, G, y0[p], tspan, dW=dW[:,p,:])["trajectory"]
+            assert(np.allclose(y[:,p,:], yp[::10]))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoSRI2(fP, GP, y0, tspan)
+
+
+def test_matrix_free_G():
+    """G can be an operator with only a shape and a dot() method"""
+    class Diagonal(object):
+        def __init__(self, diag):
+            self.diag = diag
+            self.shape = (len(diag), len(diag))
+        def dot(self, dW):
+            return self.diag*dW
+    f = lambda y, t: -1.0*y
+    G = lambda y, t: np.diag(0.2*y)
+    tspan = np.linspace(0.0, 1.0, 201)
+    dW = sdeint.deltaW(200, 2, 0.005)
+    y0 = np.array([1.0, 2.0])
+    y1 = sdeint.itoEuler(f, G, y0, tspan, dW=dW)["trajectory"]
+    y2 = sdeint.itoEuler(f, lambda y, t: Diagonal(0.2*y), y0, tspan,
+                         dW=dW)["trajectory"]
+    assert(np.allclose(y1, y2))
+
+
+def test_complex_implicit():
+    """Implicit solvers on a complex linear equation, with exact
+    solution y = y0 exp(lam t + mu W) (Stratonovich)"""
+    lam = np.array([-1.0 - 5.0j, -0.5 + 3.0j])
+    mu = 0.3
+    f = lambda y, t: lam*y
+    G = lambda y, t: (mu*y).reshape((2, 1))
+    y0 = np.array([1.0 + 0.0j, 0.5j])
+    h = 0.001
+    tspan = np.arange(0.0, 1.0 + h/2, h)
+    N = len(tspan)
+    dW = sdeint.deltaW(N - 1, 1, h)
+    __, J = sdeint.Jkpw(dW, h)
+    W = np.concatenate(([0.0], np.cumsum(dW[:,0]))).reshape((N, 1))
+    exact = y0*np.exp(lam*tspan.reshape((N, 1)) + mu*W)
+    y = sdeint.stratKP2iS(f, G, y0, tspan, dW=dW, J=J, rtol=1e-10)
+    assert(y["trajectory"].dtype == np.complex128)
+    _assert_close(y["trajectory"], exact, 1e-1, 1e-1)
+    ito_exact = exact*np.exp(-0.5*mu**2*tspan.reshape((N, 1)))
+    for root_method in ('hybr', 'krylov'):
+        y = sdeint.itoImplicitEuler(f, G, y0, tspan, dW=dW, rtol=1e-10,
+                                    root_method=root_method)
+        _assert_close(y["trajectory"], ito_exact, 2e-1, 2e-1)
+
+
+def test_itoSplitStep():
+    """Stiff linear part: exact for the exponential scheme when f = G = 0,
+    and stable at a step size where Euler-Maruyama is not"""
+    from scipy import sparse
+    L = np.array([[-1000.0, 1.0], [0.0, -1.0]])
+    y0 = np.array([1.0, 2.0])
+    tspan = np.linspace(0.0, 1.0, 101)
+    zero_f = lambda y, t: np.zeros_like(y)
+    zero_G = lambda y, t: np.zeros(y.shape + (1,))
+    y = sdeint.itoSplitStep(zero_f, zero_G, y0, tspan, L=L,
+                            method='exponential')["trajectory"]
+    exact = np.array([linalg.expm(t*L).dot(y0) for t in tspan])
+    assert(np.allclose(y, exact))
+    f = lambda y, t: np.sin(y)
+    G = lambda y, t: np.array([[0.1], [0.2]])
+    dW = sdeint.deltaW(100, 1, 0.01)
+    for method in ('imex', 'exponential'):
+        y1 = sdeint.itoSplitStep(f, G, y0, tspan, L=L, method=method,
+                                 dW=dW)["trajectory"]
+        y2 = sdeint.itoSplitStep(f, G, y0, tspan, L=sparse.csr_matrix(L),
+                                 method=method, dW=dW)["trajectory"]
+        assert(np.allclose(y1, y2))
+        assert(np.all(np.abs(y1) < 10.0))
+        # an ensemble reuses the same factorization for all paths
+        GP = lambda y, t: np.broadcast_to(G(y, t), (len(y), 2, 1))
+        dWP = np.stack((dW, dW), axis=1)
+        yP = sdeint.itoSplitStep(lambda y, t: np.sin(y), GP,
+                                 np.stack((y0, y0)), tspan, L=L,
+                                 method=method, dW=dWP)["trajectory"]
+        assert(np.allclose(yP[:,1,:], y1))
+    with np.errstate(over='ignore', invalid='ignore'):
+        yE = sdeint.itoEuler(lambda y, t: L.dot(y) + f(y, t), G, y0, tspan,
+                             dW=dW)["trajectory"]
+    assert(not np.all(np.abs(yE) < 10.0))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoSplitStep(f, G, y0, tspan, L=np.eye(3))
+
+
+def test_itoSplitStep_step_sizes():
+    """An equally spaced tspan uses one step size throughout, although
+    np.diff(tspan) has several distinct values, and the cache of
+    factorizations stays bounded for unequal steps"""
+    class Recording(object):
+        shape = (2, 2)
+        def __init__(self):
+            self.steps = set()
+        def imex_solve(self, h, y):
+            self.steps.add(h)
+            return y
+        expm_dot = imex_solve
+    tspan = np.linspace(0.0, 1.0, 2001)
+    assert(len(set(np.diff(tspan))) > 1)
+    f = lambda y, t: -y
+    G = lambda y, t: np.array([[0.1], [0.2]])
+    L = Recording()
+    sdeint.itoSplitStep(f, G, np.ones(2), tspan, L=L)
+    assert(L.steps == set([0.0005]))
+    from sdeint.integrate import _LinearPropagator
+    propagator = _LinearPropagator(-np.eye(2), 'imex')
+    for h in np.linspace(0.01, 0.02, 50):
+        propagator.apply(h, np.ones(2))
+        assert(len(propagator._cache) <= propagator._max_cached)
+
+
+def test_correlated_noise():
+    """Correlated increments with a diagonal G give the same paths as
+    independent increments with the correlation folded into a dense G"""
+    C = np.array([[1.0, 0.6], [0.6, 1.0]])
+    L = np.linalg.cholesky(C)
+    tspan = np.linspace(0.0, 1.0, 101)
+    dV = sdeint.deltaW(100, 2, 0.01)
+    dW = dV.dot(L.T)
+    f = lambda y, t: -y
+    G = lambda y, t: np.diag(0.3*y)
+    Gfolded = lambda y, t: G(y, t).dot(L)
+    y0 = np.array([1.0, 2.0])
+    y1 = sdeint.itoEuler(f, G, y0, tspan, dW=dW)["trajectory"]
+    y2 = sdeint.itoEuler(f, Gfolded, y0, tspan, dW=dV)["trajectory"]
+    assert(np.allclose(y1, y2))
+    H = lambda y, t: 0.3*np.einsum('ij,jk->ijk', np.diag(0.3*y), np.eye(2))
+    Hfolded = lambda y, t: np.einsum('ijk,jm,kn->imn', H(y, t), L, L)
+    np.random.seed(1)
+    A, I = sdeint.Icorr(dW, 0.01, C)
+    np.random.seed(1)
+    A, IV = sdeint.Ikpw(dV, 0.01)
+    y1 = sdeint.itoMilstein(f, G, H, y0, tspan, dW=dW, I=I)["trajectory"]
+    y2 = sdeint.itoMilstein(f, Gfolded, Hfolded, y0, tspan, dW=dV,
+                            I=IV)["trajectory"]
+    assert(np.allclose(y1, y2))
+    for dZ in (sdeint.deltaOU(100, 2, 0.01, 0.05),
+               sdeint.deltaFBM(100, 2, 0.01, 0.7)):
+        y = sdeint.stratHeun(f, G, y0, tspan, dW=dZ)["trajectory"]
+        assert(y.shape == (101, 2) and np.all(np.isfinite(y)))
+
+
+def test_jump_diffusion():
+    """Geometric Brownian motion with log-normal jumps, whose exact solution
+    is y0 exp((mu - s^2/2)t + s W(t)) times the product of the marks"""
+    mu, s, rate = 0.1, 0.3, 2.0
+    f = lambda y, t: mu*y
+    G = lambda y, t: s*y[..., np.newaxis]
+    c = lambda y, t, xi: y*(np.reshape(xi, np.shape(xi) + (1,)) - 1.0)
+    marks = lambda K: np.exp(np.random.normal(0.0, 0.2, K))
+    tspan = np.linspace(0.0, 1.0, 201)
+    times, xi = sdeint.poissonJumps(0.0, 1.0, rate, marks)
+    times = np.concatenate(([0.25, 0.4], times))
+    order = np.argsort(times)
+    times, xi = times[order], np.concatenate(([1.5, 0.5], xi))[order]
+    t = np.union1d(tspan, times)
+    dW = sdeint.deltaW(len(t) - 1, 1, np.diff(t))
+    W = np.concatenate(([0.0], np.cumsum(dW)))
+    jumped = np.array([np.prod(xi[times <= tk]) for tk in tspan])
+    i = np.searchsorted(t, tspan)
+    exact = np.exp((mu - 0.5*s**2)*tspan + s*W[i])*jumped
+    yE = sdeint.itoJumpEuler(f, G, c, np.array([1.0]), tspan, rate,
+                             jumps=(times, xi), dW=dW)["trajectory"][:,0]
+    yS = sdeint.itoJumpSRI2(f, G, c, np.array([1.0]), tspan, rate,
+                            jumps=(times, xi), dW=dW)["trajectory"][:,0]
+    errE = np.max(np.abs(yE - exact))
+    errS = np.max(np.abs(yS - exact))
+    assert(errS < errE and errS < 5e-3)
+    assert(np.isclose(yS[50]/yS[49], 1.5, rtol=0.1))
+    # an ensemble: each path gets its own jumps
+    P = 2000
+    result = sdeint.itoJumpEuler(f, G, c, np.ones((P, 1)), tspan, rate,
+                                 marks=marks, downsample=50)
+    y = result["trajectory"]
+    assert(y.shape == (5, P, 1))
+    assert(len(result["path_jumps"]) == len(result["t_jumps"]))
+    assert(np.isclose(len(result["t_jumps"])/P, rate, rtol=0.1))
+    mean = np.exp(mu + rate*(np.exp(0.02) - 1.0))
+    assert(np.isclose(y[-1].mean(), mean, rtol=0.05))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoJumpSRI2(f, G, c, np.ones((P, 1)), tspan, rate)
+    # several jumps of one path at the same time are all applied, in turn
+    zero_f = lambda y, t: np.zeros_like(y)
+    zero_G = lambda y, t: np.zeros(np.shape(y) + (1,))
+    y1 = sdeint.itoJumpEuler(zero_f, zero_G, c, np.ones(1), tspan, rate,
+                             jumps=([0.3, 0.3], [2.0, 3.0]))["trajectory"]
+    yP = sdeint.itoJumpEuler(zero_f, zero_G, c, np.ones((2, 1)), tspan, rate,
+                             jumps=([0.3, 0.3, 0.3], [0, 1, 0],
+                                    [2.0, 0.5, 3.0]))["trajectory"]
+    assert(np.isclose(y1[-1,0], 6.0) and np.allclose(yP[-1,:,0], [6.0, 0.5]))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoJumpEuler(f, G, c, np.array([1.0]), tspan, rate,
+                            jumps=(np.array([2.0]), np.ones(1)))
+    # a dW or I for tspan alone does not fit the merged grid:
+    dW1 = sdeint.deltaW(200, 1, 0.005)
+    one_jump = (np.array([0.3333]), np.ones(1))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoJumpEuler(f, G, c, np.array([1.0]), tspan, rate,
+                            jumps=one_jump, dW=dW1)
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoJumpEuler(f, G, c, np.array([1.0]), tspan, rate, dW=dW1)
+    dW2 = sdeint.deltaW(201, 1, np.diff(np.union1d(tspan, one_jump[0])))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoJumpSRI2(f, G, c, np.array([1.0]), tspan, rate,
+                           jumps=one_jump, dW=dW2, I=sdeint.Ikpw(dW1, 0.005)[1])
+
+
+def test_scalar_engine():
+    """Scalar equations give the same paths as the equivalent 1D vector
+    systems, also for an ensemble given by y0 of shape (P,)"""
+    a, b = -1.0, 0.5
+    f = lambda y, t: a*y
+    G = lambda y, t: b*y
+    fv = lambda y, t: a*y
+    Gv = lambda y, t: b*y[..., np.newaxis]
+    tspan = np.linspace(0.0, 1.0, 201)
+    dW = sdeint.deltaW(200, 1, 0.005)
+    P = 4
+    y0 = np.linspace(1.0, 2.0, P)
+    dWP = sdeint.deltaW(200, P, 0.005)[..., np.newaxis]
+    for solver in (sdeint.itoEuler, sdeint.stratHeun, sdeint.itoSRI2,
+                   sdeint.stratSRS2):
+        y1 = solver(f, G, 1.0, tspan, dW=dW)["trajectory"]
+        y2 = solver(fv, Gv, np.array([1.0]), tspan, dW=dW)["trajectory"]
+        assert(y1.shape == (201, 1) and np.allclose(y1, y2))
+        ensemble = sdeint.SDEProblem(f, G, y0, tspan, scalar=True)
+        yP = solver(ensemble, dW=dWP, downsample=50)["trajectory"]
+        assert(yP.shape == (5, P, 1))
+        y3 = solver(f, G, y0[2], tspan, dW=dWP[:,2,:],
+                    downsample=50)["trajectory"]
+        assert(np.allclose(yP[:,2,:], y3))
+    # other options use the vector algorithms
+    y = sdeint.itoEuler(f, G, 1.0, tspan, t_eval=[0.5, 1.0])["trajectory"]
+    assert(y.shape == (2, 1))
+    y = sdeint.itoEuler(ensemble, dW=dWP, t_eval=[0.5, 1.0])["trajectory"]
+    yE = sdeint.itoEuler(ensemble, dW=dWP)["trajectory"]
+    assert(y.shape == (2, P, 1) and np.allclose(y[-1], yE[-1]))
+    # G is not called again to decide, and an ensemble must be declared:
+    calls = [0]
+    def Gc(y, t):
+        calls[0] += 1
+        return b*y
+    problem = sdeint.SDEProblem(f, Gc, 1.0, tspan)
+    calls[0] = 0
+    sdeint.itoEuler(problem, dW=dW)
+    assert(calls[0] == 200)
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoEuler(f, G, y0, tspan)
+
+
+def test_itoMilstein_constant_terms():
+    """Constant or low-rank H and constant G give the same paths as the
+    equivalent functions, with dense or packed integrals"""
+    d, m, R = 3, 2, 2
+    U = np.random.normal(size=(d, R))
+    V = np.random.normal(size=(m, R))
+    W = np.random.normal(size=(m, R))
+    H = np.einsum('ir,jr,kr->ijk', U, V, W)
+    B = 0.3*np.random.normal(size=(d, m))
+    f = lambda y, t: -y
+    G = lambda y, t: B
+    y0 = np.ones(d)
+    tspan = np.linspace(0.0, 1.0, 101)
+    dW = sdeint.deltaW(100, m, 0.01)
+    A, I = sdeint.Ikpw(dW, 0.01)
+    packed = sdeint.PackedIntegrals.from_dense(dW, 0.01, I)
+    y1 = sdeint.itoMilstein(f, G, lambda y, t: H, y0, tspan, dW=dW,
+                            I=I)["trajectory"]
+    for Hc in (H, (U, V, W)):
+        for Ic in (I, packed):
+            for Gc in (G, B):
+                y2 = sdeint.itoMilstein(f, Gc, Hc, y0, tspan, dW=dW,
+                                        I=Ic)["trajectory"]
+                assert(np.allclose(y1, y2))
+    # with constant G the Milstein term vanishes
+    y3 = sdeint.itoMilstein(f, B, None, y0, tspan, dW=dW)["trajectory"]
+    y4 = sdeint.itoEuler(f, G, y0, tspan, dW=dW)["trajectory"]
+    assert(np.allclose(y3, y4))
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoMilstein(f, G, np.zeros((d, m)), y0, tspan)
+    with pytest.raises(sdeint.SDEValueError):
+        sdeint.itoMilstein(f, G, (U, V, W[:1]), y0, tspan)
+
+
+def test_list_y0():
+    """y0 may be given as a list, for every algorithm"""
+    f = lambda y, t: -1.0*y
+    G = lambda y, t: 0.2*np.eye(2)
+    tspan = np.linspace(0.0, 1.0, 11)
+    dW = sdeint.deltaW(10, 2, 0.1)
+    for solver in (sdeint.itoEuler, sdeint.stratHeun, sdeint.itoSRI2,
+                   sdeint.stratSRS2):
+        y1 = solver(f, G, [1, 2.0], tspan, dW=dW)["trajectory"]
+        y2 = solver(f, G, np.array([1.0, 2.0]), tspan, dW=dW)["trajectory"]
+        assert(np.allclose(y1, y2))
+    problem = sdeint.SDEProblem(f, G, [1.0, 2.0], tspan)
+    y = sdeint.itoEuler(problem, y0=[3, 4], dW=dW)["trajectory"]
+    assert(np.allclose(y[0], [3.0, 4.0]))
+    y = sdeint.itoJumpEuler(f, G, lambda y, t, xi: 0.1*np.eye(2)[0], [1.0, 2.0],
+                            tspan, rate=2.0)["trajectory"]
+    assert(y.shape[1] == 2)
@@ -0,0 +1,60 @@
+"""Tests for pathwise sensitivities by forward mode differentiation.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.sensitivity import sensitivities
+
+f = lambda y, t, theta: theta[0]*y
+G = lambda y, t, theta: theta[1]*y.reshape((1, 1))
+theta = np.array([0.3, 0.5])
+y0 = np.array([1.0])
+tspan = np.linspace(0.0, 1.0, 201)
+h = tspan[1] - tspan[0]
+
+
+def test_euler_sensitivities():
+    """Geometric Brownian motion, where the derivative of the Euler solution
+    is known in closed form"""
+    dW = sdeint.deltaW(200, 1, h)
+    result = sensitivities(f, G, y0, tspan, theta, dW=dW,
+                           functionals={'final': 'terminal',
+                                        'area': 'integral'})
+    y = result["trajectory"]
+    factors = 1.0 + theta[0]*h + theta[1]*dW[:, 0]
+    assert(np.allclose(y[1:, 0], np.cumprod(factors)))
+    S = result["sensitivity"]
+    assert(S.shape == (201, 1, 2))
+    assert(np.allclose(S[-1, 0, 0], y[-1, 0]*np.sum(h/factors)))
+    assert(np.allclose(S[-1, 0, 1], y[-1, 0]*np.sum(dW[:, 0]/factors)))
+    # the same, with user supplied Jacobians:
+    f_jac = (lambda y, t, th: th[0]*np.eye(1),
+             lambda y, t, th: np.array([[y[0], 0.0]]))
+    G_jac = (lambda y, t, th: th[1]*np.ones((1, 1, 1)),
+             lambda y, t, th: np.array([[[0.0, y[0]]]]))
+    result2 = sensitivities(f, G, y0, tspan, theta, dW=dW, f_jac=f_jac,
+                            G_jac=G_jac)
+    assert(np.allclose(result2["sensitivity"], S))
+    grads = result["gradients"]
+    assert(np.allclose(grads['final'], S[-1]))
+    assert(np.allclose(grads['area'], 0.5*h*np.sum(S[1:] + S[:-1], axis=0)))
+    assert(np.allclose(result["functionals"]['final'], y[-1]))
+    with pytest.raises(sdeint.SDEValueError):
+        sensitivities(f, G, y0, tspan, theta, functionals={'peak': 'max'})
+
+
+def test_sri2_sensitivities():
+    """The sensitivity from SRI2 is the derivative of the SRI2 solution on
+    the same Brownian path, checked by complex step through the solver"""
+    dW = sdeint.deltaW(200, 1, h)
+    __, I = sdeint.Ikpw(dW, h)
+    S = sensitivities(f, G, y0, tspan, theta, solver=sdeint.itoSRI2, dW=dW,
+                      I=I)["sensitivity"]
+    eps = 1e-20
+    for j in range(2):
+        th = theta.astype(complex)
+        th[j] += 1j*eps
+        y = sdeint.itoSRI2(lambda y, t: f(y, t, th), lambda y, t: G(y, t, th),
+                           y0.astype(complex), tspan, dW=dW, I=I)["trajectory"]
+        assert(np.allclose(S[:, :, j], y.imag/eps))
@@ -0,0 +1,53 @@
+"""Tests for the pseudo-spectral SPDE front end.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.spde import PeriodicSPDE, FourierMultiplier
+
+
+def test_fourier_operators():
+    """Matrix-free operators agree with the dense matrices they represent"""
+    spde = PeriodicSPDE((8, 6), length=(2.0, 3.0), nu=0.3,
+                        noise_spectrum=lambda k2: np.exp(-k2))
+    d = spde.d
+    Ldense = np.column_stack([spde.L.dot(e) for e in np.eye(d)])
+    # the Laplacian is symmetric, and exact on a Fourier mode:
+    assert(np.allclose(Ldense, Ldense.T))
+    x, y = spde.x
+    u = np.sin(2*np.pi*x/2.0)*np.cos(2*2*np.pi*y/3.0)
+    k2 = (2*np.pi/2.0)**2 + (4*np.pi/3.0)**2
+    assert(np.allclose(spde.L.dot(u.ravel()), -0.3*k2*u.ravel()))
+    from scipy import linalg
+    h = 0.05
+    v = np.random.normal(size=(3, d))
+    assert(np.allclose(spde.L.expm_dot(h, v), linalg.expm(h*Ldense).dot(v.T).T))
+    assert(np.allclose(spde.L.imex_solve(h, v),
+                       np.linalg.solve(np.eye(d) - h*Ldense, v.T).T))
+    G = spde.G(v, 0.0)
+    assert(G.shape == (3, d, d))
+    Gdense = np.column_stack([spde.G(v[0], 0.0).dot(e) for e in np.eye(d)])
+    assert(np.allclose(G.dot(v)[1], Gdense.dot(v[1])))
+
+
+def test_stochastic_heat_equation():
+    """Stationary variance of du = (nu u_xx - u)dt + dW(t,x) with space-time
+    white noise on a periodic grid"""
+    n = 32
+    nu = 0.5
+    spde = PeriodicSPDE((n,), nu=nu, F=lambda u, t: -u, sigma=1.0)
+    P = 400
+    tspan = np.linspace(0.0, 4.0, 801)
+    result = spde.integrate(np.zeros((P, n)), tspan, downsample=200)
+    y = result["trajectory"]
+    assert(y.shape == (5, P, n))
+    k = np.fft.fftfreq(n, 1.0/n)
+    expected = np.sum(1.0/(2.0*(1.0 + nu*k**2)))/(2*np.pi)
+    assert(np.isclose(y[-1].var(), expected, rtol=0.15))
+    # the same problem with the existing explicit solvers, G matrix-free:
+    f = lambda u, t: spde.L.dot(u) + spde.f(u, t)
+    y = sdeint.itoEuler(f, spde.G, np.zeros(n), tspan)["trajectory"]
+    assert(y.shape == (len(tspan), n) and np.all(np.isfinite(y)))
+    with pytest.raises(sdeint.SDEValueError):
+        spde.integrate(np.zeros(n + 1), tspan)
@@ -0,0 +1,70 @@
+"""Tests for simulating a batch of parameter values with common random
+numbers.
+"""
+
+import pytest
+import numpy as np
+import sdeint
+from sdeint.sweep import parameter_sweep
+
+f = lambda y, t, theta: -theta[0]*y + np.sin(y)
+G = lambda y, t, theta: np.array([[theta[1], 0.0], [0.1*y[0], theta[1]]])
+
+
+def f_vec(y, t, thetas):
+    return -thetas[:, :1]*y + np.sin(y)
+
+
+def G_vec(y, t, thetas):
+    K = len(thetas)
+    out = np.zeros((K, 2, 2))
+    out[:, 0, 0] = out[:, 1, 1] = thetas[:, 1]
+    out[:, 1, 0] = 0.1*y[:, 0]
+    return out
+
+
+def test_parameter_sweep():
+    tspan = np.linspace(0.0, 2.0, 201)
+    h = tspan[1] - tspan[0]
+    thetas = np.array([[0.5, 0.2], [0.6, 0.2], [0.5, 0.3], [1.0, 0.1]])
+    y0 = np.array([1.0, -0.5])
+    dW = sdeint.deltaW(200, 2, h)
+    __, I = sdeint.Ikpw(dW, h)
+    for solver, kwargs in ((sdeint.itoEuler, dict(dW=dW)),
+                           (sdeint.itoSRI2, dict(dW=dW, I=I))):
+        y = parameter_sweep(f, G, y0, tspan, thetas, solver=solver,
+                            **kwargs)["trajectory"]
+        assert(y.shape == (201, 4, 2))
+        # each parameter vector is integrated on the same Brownian path:
+        for k in range(4):
+            yk = solver(lambda y, t: f(y, t, thetas[k]),
+                        lambda y, t: G(y, t, thetas[k]), y0, tspan,
+                        **kwargs)["trajectory"]
+            assert(np.allclose(y[:, k], yk))
+        yv = parameter_sweep(f_vec, G_vec, y0, tspan, thetas, solver=solver,
+                             vectorized=True, **kwargs)["trajectory"]
+        assert(np.allclose(yv, y))
+    # without given noise, the parameter vectors still share one path:
+    y = parameter_sweep(f_vec, G_vec, y0, tspan, thetas[[0, 0]],
+                        vectorized=True)["trajectory"]
+    assert(np.allclose(y[:, 0], y[:, 1]))
+    with pytest.raises(sdeint.SDEValueError):
+        parameter_sweep(f, G, np.zeros((3, 2)), tspan, thetas)
+
+
+def test_parameter_sweep_functionals():
+    """Functionals without the trajectory, with one value per parameter"""
+    tspan = np.linspace(0.0, 1.0, 101)
+    thetas = np.array([[0.5, 0.2], [1.0, 0.2], [2.0, 0.1]])
+    y0 = np.array([1.0, -0.5])
+    dW = sdeint.deltaW(100, 2, 0.01)
+    peak = sdeint.functionals.RunningMax(lambda y, t: np.abs(y).max(axis=1))
+    result = parameter_sweep(f, G, y0, tspan, thetas, solver=sdeint.itoEuler,
+                             dW=dW, downsample=None,
+                             functionals={'final': 'terminal', 'peak': peak})
+    assert("trajectory" not in result)
+    y = parameter_sweep(f, G, y0, tspan, thetas, solver=sdeint.itoEuler,
+                        dW=dW)["trajectory"]
+    values = result["functionals"]
+    assert(np.allclose(values['final'], y[-1]))
+    assert(np.allclose(values['peak'], np.abs(y).max(axis=(0, 2))))
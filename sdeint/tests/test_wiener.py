@@ -4,7 +4,9 @@
 import pytest
 import numpy as np
 from sdeint.wiener import (deltaW, _t, _dot, Ikpw, Jkpw, Iwik, Jwik, _vec, 
-                           _unvec, _kp, _kp2, _P, _K, _a)
+                           _unvec, _kp, _kp2, _P, _K, _a, deltaW2pt,
+                           deltaW3pt, Iweak, PackedIntegrals, deltaWcorr,
+                           Icorr, deltaOU, deltaFBM, CounterNoise)
 
 numpy_version = list(map(int, np.version.short_version.split('.')))
 if numpy_version >= [1,10,0]:
@@ -131,3 +133,156 @@ def test_Iwik_Jwik_identities():
     assert(np.allclose(J + _t(J), _dot(dW, _t(dW))))
     A = _unvec(_dot(_dot((Ims - Pm), _t(Km)), Atilde))
     assert(np.allclose(2.0*(J - A), _dot(dW, _t(dW))))
+
+
+def test_weak_increments():
+    """Two-point and three-point variables must match the Gaussian moments
+    needed for weak order 1.0 and 2.0 respectively."""
+    dW2 = deltaW2pt(N, m, h)
+    assert(np.allclose(np.abs(dW2), np.sqrt(h)))
+    dW3 = deltaW3pt(N, m, h)
+    assert(np.all(np.isclose(dW3, 0.0) | np.isclose(np.abs(dW3),
+                                                      np.sqrt(3*h))))
+    assert(np.isclose(np.mean(dW3), 0.0, rtol=0, atol=0.05*np.sqrt(h)))
+    assert(np.isclose(np.mean(dW3**2), h, rtol=0.05, atol=0))
+    assert(np.isclose(np.mean(dW3**4), 3*h**2, rtol=0.1, atol=0))
+
+
+def test_Iweak_identities():
+    dW = deltaW3pt(N, m, h).reshape((N, m, 1))
+    V, I = Iweak(dW, h)
+    assert(V.shape == (N, m, m) and I.shape == (N, m, m))
+    Im = broadcast_to(np.eye(m), (N, m, m))
+    assert(np.allclose(I + _t(I), _dot(dW, _t(dW)) - h*Im))
+    assert(np.allclose(np.abs(V), h))
+    assert(np.allclose(V + _t(V), -2*h*Im))
+
+
+def test_variable_step_identities():
+    """Increments and repeated integrals with a different h for each step"""
+    hs = np.random.uniform(0.1*h, 2.0*h, N)
+    dW = deltaW(N, m, hs)
+    assert(np.isclose(np.mean(dW**2/hs.reshape((N, 1))), 1.0, rtol=0.05))
+    dW = dW.reshape((N, m, 1))
+    Im = broadcast_to(np.eye(m), (N, m, m))
+    hm = hs.reshape((N, 1, 1))
+    for Imethod in (Ikpw, Iwik, Iweak):
+        A, I = Imethod(dW, hs)
+        assert(I.shape == (N, m, m))
+        assert(np.allclose(I + _t(I), _dot(dW, _t(dW)) - hm*Im))
+    for Jmethod in (Jkpw, Jwik):
+        A, J = Jmethod(dW, hs)
+        assert(np.allclose(J + _t(J), _dot(dW, _t(dW))))
+
+
+def test_packed_integrals():
+    """Packed integrals store only the Levy areas and rebuild the same I, J"""
+    dW = deltaW(N, m, h)
+    for method in (Ikpw, Jkpw, Iwik, Jwik):
+        s = np.random.randint(2**32)
+        np.random.seed(s)
+        __, IJ = method(dW, h)
+        np.random.seed(s)
+        __, P = method(dW, h, packed=True)
+        assert(isinstance(P, PackedIntegrals) and P.shape == (N, m, m))
+        assert(P.A.shape == (N, m*(m-1)//2))
+        assert(np.allclose(np.asarray(P), IJ))
+        assert(np.allclose(P[3,:,:], IJ[3]) and np.allclose(P[5], IJ[5]))
+        assert(np.allclose(PackedIntegrals.from_dense(
+            dW, h, IJ, P.stratonovich).dense(), IJ))
+    # the packed methods return only the m(m-1)/2 areas, not any (N, m, m)
+    # array:
+    for method in (Ikpw, Jkpw, Iwik, Jwik):
+        A, P = method(dW, h, packed=True)
+        assert(A.shape == (N, m*(m-1)//2) and A is P.A)
+        assert(not any(isinstance(v, np.ndarray) and v.shape == (N, m, m)
+                       for v in vars(P).values()))
+    # step sizes given as a list, as accepted by the dense methods:
+    hs = list(np.random.uniform(0.5*h, 1.5*h, N))
+    for method in (Ikpw, Jkpw, Iwik, Jwik):
+        seed = np.random.randint(2**31 - 1)
+        np.random.seed(seed)
+        __, IJ = method(dW, hs)
+        np.random.seed(seed)
+        __, P = method(dW, hs, packed=True)
+        assert(np.allclose(np.asarray(P), IJ))
+
+
+def test_correlated_and_colored_noise():
+    C = np.array([[1.0, 0.5, 0.0], [0.5, 2.0, 0.3], [0.0, 0.3, 0.5]])
+    dW = deltaWcorr(N, C, h)
+    assert(dW.shape == (N, 3))
+    assert(np.allclose(np.cov(dW.T)/h, C, atol=0.1))
+    L = np.linalg.cholesky(C)
+    np.random.seed(s)
+    dW1 = deltaWcorr(N, L, h, factor=True)
+    np.random.seed(s)
+    assert(np.allclose(deltaWcorr(N, C, h), dW1))
+    np.random.seed(s)
+    A, I = Icorr(dW, h, C)
+    # the symmetric part of I is fixed by the increments: I + I^T = dW dW^T - Ch
+    assert(np.allclose(I + _t(I), _dot(dW[:,:,np.newaxis], dW[:,np.newaxis,:])
+                       - h*C))
+    assert(np.allclose(A + _t(A), 0.0))
+    np.random.seed(s)
+    A, J = Icorr(dW, h, C, Imethod=Jkpw)
+    assert(np.allclose(J - I, 0.5*h*C))
+    # Ornstein-Uhlenbeck: exact variance of the stationary integral over h
+    tau = 0.01
+    dZ = deltaOU(N, 2, 0.05, tau)
+    expected = 0.05 - tau*(1.0 - np.exp(-0.05/tau))
+    assert(np.allclose(dZ.var(axis=0), expected, rtol=0.1))
+    assert(np.allclose(deltaOU(N, 2, 0.05, 1e-6).var(axis=0), 0.05, rtol=0.1))
+    # the same as the step by step recursion for X
+    tau, x0 = 0.5, np.array([1.0, -2.0])
+    np.random.seed(s)
+    dZ = deltaOU(N, 2, h, tau, x0)
+    np.random.seed(s)
+    e1, e2 = np.random.normal(0.0, 1.0, (2, N, 2))
+    a = np.exp(-h/tau)
+    l11 = np.sqrt(0.5*(1.0 - a**2)/tau)
+    l21 = 0.5*(1.0 - a)**2/l11
+    l22 = np.sqrt(h - 2.0*tau*(1.0 - a) + 0.5*tau*(1.0 - a**2) - l21**2)
+    x = x0
+    for n in range(N):
+        assert(np.allclose(dZ[n], tau*(1.0 - a)*x + l21*e1[n] + l22*e2[n]))
+        x = a*x + l11*e1[n]
+    # fractional Brownian motion: covariance of the fractional Gaussian noise
+    hurst = 0.75
+    X = deltaFBM(N, 4, h, hurst)
+    k = np.arange(3)
+    gamma = 0.5*h**(2*hurst)*(np.abs(k + 1)**(2*hurst) - 2*k**(2*hurst) +
+                              np.abs(k - 1)**(2*hurst))
+    autocov = [np.mean(X[:N-j]*X[j:]) for j in k]
+    assert(np.allclose(autocov, gamma, rtol=0.0, atol=0.15*gamma[0]))
+    assert(deltaFBM(5, 2, h, 0.5).shape == (5, 2))
+    with pytest.raises(ValueError):
+        deltaFBM(5, 2, h, 1.5)
+
+
+def test_counter_noise():
+    """Any block of any path can be regenerated, independently of chunking"""
+    noise = CounterNoise(3, 0.01, seed=s, block=16)
+    N = 100
+    dW = noise.deltaW(0, N, path=5)
+    assert(dW.shape == (N, 3))
+    chunks = [noise.deltaW(a, min(a + 7, N), path=5) for a in range(0, N, 7)]
+    assert(np.array_equal(np.concatenate(chunks), dW))
+    assert(np.array_equal(noise.deltaW(37, 38, path=5), dW[37:38]))
+    other = CounterNoise(3, 0.01, seed=s, block=16)
+    assert(np.array_equal(other.deltaW(0, N, path=5), dW))
+    assert(not np.allclose(noise.deltaW(0, N, path=6), dW))
+    assert(np.isclose(np.var(noise.deltaW(0, 20000)), 0.01, rtol=0.05))
+    dWe = noise.deltaW(10, 50, path=range(8))
+    assert(dWe.shape == (40, 8, 3))
+    assert(np.array_equal(dWe[:, 5], dW[10:50]))
+    for Imethod in (Ikpw, Jwik):
+        dW1, I = noise.integrals(0, N, path=2, Imethod=Imethod)
+        assert(np.array_equal(dW1, noise.deltaW(0, N, path=2)))
+        dW2, I2 = noise.integrals(40, 60, path=2, Imethod=Imethod)
+        assert(np.array_equal(dW2, dW1[40:60]) and np.array_equal(I2, I[40:60]))
+    dW3, I3 = noise.integrals(0, 10, path=[1, 2])
+    assert(dW3.shape == (10, 2, 3) and I3.shape == (10, 2, 3, 3))
+    # the generators also accept an explicit random number generator:
+    rng = noise.generator(0, 0)
+    assert(deltaW(4, 2, 0.1, rng).shape == (4, 2))
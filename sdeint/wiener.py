@@ -22,12 +22,24 @@ Finally we implement the method of Wiktorsson (2001) which improves on the
 previous method by also approximating the tail-sum distribution by a
 multivariate normal distribution.
 
+When only weak convergence is needed (i.e. expectations of functionals of the
+solution), the Wiener increments and the multiple integrals can instead be
+replaced by simple discrete random variables with matching low order moments
+(Kloeden and Platen (1999) section 14.2). Then no Levy areas are simulated.
+
+CounterNoise generates the Wiener increments and multiple integrals of any
+block of time steps of any sample path directly from a counter-based random
+number generator, so that noise can be generated in parallel or regenerated
+on demand with results that do not depend on how the work is divided.
+
 References:
   P. Kloeden, E. Platen and I. Wright (1992) The approximation of multiple
     stochastic integrals
   M. Wiktorsson (2001) Joint Characteristic Function and Simultaneous
     Simulation of Iterated Ito Integrals for Multiple Independent Brownian
     Motions
+  P. Kloeden and E. Platen (1999) Numerical Solution of Stochastic
+    Differential Equations, revised and updated 3rd printing
 """
 
 import numpy as np
@@ -39,15 +51,39 @@ else:
     from ._broadcast import broadcast_to
 
 
-def deltaW(N, m, h):
+def _hshape(h, ndim):
+    """The time step size h, either unchanged if it is a scalar, or if an
+    array of N step sizes, reshaped to (N, 1, ...) with ndim axes in total so
+    that it broadcasts against arrays with one time step per row."""
+    if np.ndim(h) == 0:
+        return h
+    h = np.asarray(h)
+    return h.reshape((-1,) + (1,)*(ndim - 1))
+
+
+def _rng(rng):
+    """The source of random numbers: a numpy.random.Generator, or if None the
+    global numpy.random state"""
+    return np.random if rng is None else rng
+
+
+def deltaW(N, m, h, rng=None):
     """Generate sequence of Wiener increments for m independent Wiener
     processes W_j(t) j=0..m-1 for each of N time intervals of length h.    
 
+    Args:
+      N (int): number of time intervals
+      m (int): number of Wiener processes
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time intervals.
+      rng (numpy.random.Generator, optional): the random number generator
+        to use, e.g. from CounterNoise. Default the global numpy.random state.
+
     Returns:
       dW (array of shape (N, m)): The [n, j] element has the value
       W_j((n+1)*h) - W_j(n*h) 
     """
-    return np.random.normal(0.0, np.sqrt(h), (N, m))
+    return _rng(rng).normal(0.0, np.sqrt(_hshape(h, 2)), (N, m))
 
 
 def _t(a):
@@ -62,31 +98,134 @@ def _dot(a, b):
     return np.einsum('ijk,ikl->ijl', a, b)
 
 
-def _Aterm(N, h, m, k, dW):
+def _Aterm(N, h, m, k, dW, rng=None):
     """kth term in the sum of Wiktorsson2001 equation (2.2)"""
     sqrt2h = np.sqrt(2.0/h)
-    Xk = np.random.normal(0.0, 1.0, (N, m, 1))
-    Yk = np.random.normal(0.0, 1.0, (N, m, 1))
+    Xk = _rng(rng).normal(0.0, 1.0, (N, m, 1))
+    Yk = _rng(rng).normal(0.0, 1.0, (N, m, 1))
     term1 = _dot(Xk, _t(Yk + sqrt2h*dW))
     term2 = _dot(Yk + sqrt2h*dW, _t(Xk))
     return (term1 - term2)/k
 
 
-def Ikpw(dW, h, n=5):
+def _Aterm_packed(N, h, m, k, dW, upper, rng=None):
+    """As _Aterm, but only the m(m-1)/2 elements above the diagonal, for the
+    index arrays upper = np.triu_indices(m, 1). Shape (N, m(m-1)/2)"""
+    sqrt2h = np.sqrt(2.0/_hshape(h, 2))
+    Xk = _rng(rng).normal(0.0, 1.0, (N, m, 1))[..., 0]
+    Yk = _rng(rng).normal(0.0, 1.0, (N, m, 1))[..., 0]
+    Zk = Yk + sqrt2h*dW[..., 0]
+    i, j = upper
+    return (Xk[:, i]*Zk[:, j] - Zk[:, i]*Xk[:, j])/k
+
+
+class PackedIntegrals(object):
+    """Repeated integrals I_ij (Ito) or J_ij (Stratonovich) for each of N time
+    intervals, stored compactly.
+
+    The symmetric part of each m x m matrix depends only on the Wiener
+    increments: (I + I^T)/2 = (dW dW^T - h 1)/2 for Ito or (J + J^T)/2 =
+    dW dW^T/2 for Stratonovich. The antisymmetric part is the Levy area A. So
+    only the m(m-1)/2 elements of A above the diagonal need to be stored for
+    each time interval, and the matrix is rebuilt when a step is indexed.
+
+    This can be passed to the integration algorithms in place of an array of
+    shape (N, m, m). Indexing with an integer time step, e.g. I[n] or I[n,:,:]
+    gives an m x m array. Other indexing or np.asarray(I) gives a full array.
+
+    Args:
+      dW (array of shape (N, m)): the Wiener increments.
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time steps.
+      A (array of shape (N, m(m-1)/2)): the Levy areas A_ij for i < j, in the
+        order given by np.triu_indices(m, 1).
+      stratonovich (bool): True for J_ij, False for I_ij.
+
+    Attributes:
+      shape: (N, m, m)
+    """
+    def __init__(self, dW, h, A, stratonovich=False):
+        N, m = dW.shape
+        self.dW = dW
+        self.h = h
+        self.A = A
+        self.stratonovich = stratonovich
+        self.shape = (N, m, m)
+        self.ndim = 3
+        self._upper = np.triu_indices(m, 1)
+
+    @classmethod
+    def from_dense(cls, dW, h, IJ, stratonovich=False):
+        """Pack an array of shape (N, m, m) of repeated integrals"""
+        i, j = np.triu_indices(dW.shape[1], 1)
+        A = 0.5*(IJ[:, i, j] - IJ[:, j, i])
+        return cls(dW, h, A, stratonovich)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.dense(), dtype=dtype)
+
+    def matrix(self, n, out=None):
+        """The m x m matrix for time interval n (written into out if given)"""
+        m = self.shape[1]
+        dWn = self.dW[n]
+        if out is None:
+            out = np.empty((m, m))
+        np.multiply.outer(dWn, dWn, out=out)
+        out *= 0.5
+        if not self.stratonovich:
+            hn = self.h if np.ndim(self.h) == 0 else self.h[n]
+            out[np.diag_indices(m)] -= 0.5*hn
+        i, j = self._upper
+        out[i, j] += self.A[n]
+        out[j, i] -= self.A[n]
+        return out
+
+    def dense(self):
+        """All N matrices as an array of shape (N, m, m)"""
+        N, m, __ = self.shape
+        dW = self.dW.reshape((N, m, 1))
+        out = 0.5*_dot(dW, _t(dW))
+        if not self.stratonovich:
+            out -= 0.5*_hshape(self.h, 3)*np.eye(m).reshape((1, m, m))
+        i, j = self._upper
+        out[:, i, j] += self.A
+        out[:, j, i] -= self.A
+        return out
+
+    def __getitem__(self, key):
+        first, rest = (key[0], key[1:]) if isinstance(key, tuple) else (
+            key, ())
+        if isinstance(first, (int, np.integer)):
+            return self.matrix(first)[rest]
+        return self.dense()[key]
+
+
+def Ikpw(dW, h, n=5, packed=False, rng=None):
     """matrix I approximating repeated Ito integrals for each of N time
     intervals, based on the method of Kloeden, Platen and Wright (1992).
 
     Args:
       dW (array of shape (N, m)): giving m independent Weiner increments for
         each time step N. (You can make this array using sdeint.deltaW())
-      h (float): the time step size
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time steps.
       n (int, optional): how many terms to take in the series expansion
+      packed (bool, optional): if True, return the integrals as a
+        PackedIntegrals object storing only the Levy areas above the diagonal,
+        instead of as an array of shape (N, m, m).
+      rng (numpy.random.Generator, optional): the random number generator
+        to use. Default the global numpy.random state.
 
     Returns:
       (A, I) where
         A: array of shape (N, m, m) giving the Levy areas that were used.
         I: array of shape (N, m, m) giving an m x m matrix of repeated Ito 
         integral values for each of the N time intervals.
+      If packed, A has shape (N, m(m-1)/2) holding only the areas above the
+      diagonal, and no array of shape (N, m, m) is formed.
     """
     N = dW.shape[0]
     m = dW.shape[1]
@@ -94,34 +233,53 @@ def Ikpw(dW, h, n=5):
         dW = dW.reshape((N, -1, 1)) # change to array of shape (N, m, 1)
     if dW.shape[2] != 1 or dW.ndim > 3:
         raise(ValueError)
-    A = _Aterm(N, h, m, 1, dW)
+    if packed:
+        h = h if np.ndim(h) == 0 else np.asarray(h)
+        upper = np.triu_indices(m, 1)
+        A = _Aterm_packed(N, h, m, 1, dW, upper, rng)
+        for k in range(2, n+1):
+            A += _Aterm_packed(N, h, m, k, dW, upper, rng)
+        A *= _hshape(h, 2)/(2.0*np.pi)
+        return (A, PackedIntegrals(dW.reshape((N, -1)), h, A))
+    h = _hshape(h, 3)
+    A = _Aterm(N, h, m, 1, dW, rng)
     for k in range(2, n+1):
-        A += _Aterm(N, h, m, k, dW)
+        A += _Aterm(N, h, m, k, dW, rng)
     A = (h/(2.0*np.pi))*A
-    I = 0.5*(_dot(dW, _t(dW)) - np.diag(h*np.ones(m))) + A
+    I = 0.5*(_dot(dW, _t(dW)) - h*np.eye(m).reshape((1, m, m))) + A
     dW = dW.reshape((N, -1)) # change back to shape (N, m)
     return (A, I)
 
 
-def Jkpw(dW, h, n=5):
+def Jkpw(dW, h, n=5, packed=False, rng=None):
     """matrix J approximating repeated Stratonovich integrals for each of N
     time intervals, based on the method of Kloeden, Platen and Wright (1992).
 
     Args:
       dW (array of shape (N, m)): giving m independent Weiner increments for
         each time step N. (You can make this array using sdeint.deltaW())
-      h (float): the time step size
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time steps.
       n (int, optional): how many terms to take in the series expansion
+      packed (bool, optional): if True, return the integrals as a
+        PackedIntegrals object storing only the Levy areas above the diagonal,
+        instead of as an array of shape (N, m, m).
+      rng (numpy.random.Generator, optional): the random number generator
+        to use. Default the global numpy.random state.
 
     Returns:
       (A, J) where
         A: array of shape (N, m, m) giving the Levy areas that were used.
         J: array of shape (N, m, m) giving an m x m matrix of repeated
         Stratonovich integral values for each of the N time intervals.
+      If packed, A has shape (N, m(m-1)/2), as for Ikpw.
     """
     m = dW.shape[1]
-    A, I = Ikpw(dW, h, n)
-    J = I + 0.5*h*np.eye(m).reshape((1, m, m))
+    A, I = Ikpw(dW, h, n, packed, rng)
+    if packed:
+        I.stratonovich = True
+        return (A, I)
+    J = I + 0.5*_hshape(h, 3)*np.eye(m).reshape((1, m, m))
     return (A, J)
 
 
@@ -186,7 +344,7 @@ def _P(m):
 
 def _K(m):
     """ matrix K_m from Wiktorsson2001 """
-    M = m*(m - 1)/2
+    M = m*(m - 1)//2
     K = np.zeros((M, m**2), dtype=np.int64)
     row = 0
     for j in range(1, m):
@@ -197,11 +355,11 @@ def _K(m):
     return K
 
 
-def _AtildeTerm(N, h, m, k, dW, Km0, Pm0):
+def _AtildeTerm(N, h, m, k, dW, Km0, Pm0, rng=None):
     """kth term in the sum for Atilde (Wiktorsson2001 p481, 1st eqn)"""
-    M = m*(m-1)/2
-    Xk = np.random.normal(0.0, 1.0, (N, m, 1))
-    Yk = np.random.normal(0.0, 1.0, (N, m, 1))
+    M = m*(m-1)//2
+    Xk = _rng(rng).normal(0.0, 1.0, (N, m, 1))
+    Yk = _rng(rng).normal(0.0, 1.0, (N, m, 1))
     factor1 = np.dot(Km0, Pm0 - np.eye(m**2))
     factor1 = broadcast_to(factor1, (N, M, m**2))
     factor2 = _kp(Yk + np.sqrt(2.0/h)*dW, Xk)
@@ -210,7 +368,7 @@ def _AtildeTerm(N, h, m, k, dW, Km0, Pm0):
 
 def _sigmainf(N, h, m, dW, Km0, Pm0):
     """Asymptotic covariance matrix \Sigma_\infty  Wiktorsson2001 eqn (4.5)"""
-    M = m*(m-1)/2
+    M = m*(m-1)//2
     Im = broadcast_to(np.eye(m), (N, m, m))
     IM = broadcast_to(np.eye(M), (N, M, M))
     Ims0 = np.eye(m**2)
@@ -225,21 +383,30 @@ def _a(n):
     return np.pi**2/6.0 - sum(1.0/k**2 for k in range(1, n+1))
 
 
-def Iwik(dW, h, n=5):
+def Iwik(dW, h, n=5, packed=False, rng=None):
     """matrix I approximating repeated Ito integrals for each of N time
     intervals, using the method of Wiktorsson (2001).
 
     Args:
       dW (array of shape (N, m)): giving m independent Weiner increments for
         each time step N. (You can make this array using sdeint.deltaW())
-      h (float): the time step size
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time steps.
       n (int, optional): how many terms to take in the series expansion
+      packed (bool, optional): if True, return the integrals as a
+        PackedIntegrals object storing only the Levy areas above the diagonal,
+        instead of as an array of shape (N, m, m).
+      rng (numpy.random.Generator, optional): the random number generator
+        to use. Default the global numpy.random state.
 
     Returns:
       (Atilde, I) where
         Atilde: array of shape (N, m(m-1)/2, 1) giving the area integrals used.
         I: array of shape (N, m, m) giving an m x m matrix of repeated Ito
         integral values for each of the N time intervals.
+      If packed, the areas are instead returned as an array of shape
+      (N, m(m-1)/2) holding those above the diagonal (in the order of
+      np.triu_indices(m, 1)), and no array of shape (N, m, m) is formed.
     """
     N = dW.shape[0]
     m = dW.shape[1]
@@ -247,25 +414,37 @@ def Iwik(dW, h, n=5):
         dW = dW.reshape((N, -1, 1)) # change to array of shape (N, m, 1)
     if dW.shape[2] != 1 or dW.ndim > 3:
         raise(ValueError)
+    h = _hshape(h, 3)
     if m == 1:
+        if packed:
+            dW = dW.reshape((N, -1))
+            return (np.zeros((N, 0)), PackedIntegrals(
+                dW, h.ravel() if np.ndim(h) else h, np.zeros((N, 0))))
         return (np.zeros((N, 1, 1)), (dW*dW - h)/2.0)
     Pm0 = _P(m)
     Km0 = _K(m)
-    M = m*(m-1)/2
-    Atilde_n = _AtildeTerm(N, h, m, 1, dW, Km0, Pm0)
+    M = m*(m-1)//2
+    Atilde_n = _AtildeTerm(N, h, m, 1, dW, Km0, Pm0, rng)
     for k in range(2, n+1):
-        Atilde_n += _AtildeTerm(N, h, m, k, dW, Km0, Pm0)
+        Atilde_n += _AtildeTerm(N, h, m, k, dW, Km0, Pm0, rng)
     Atilde_n = (h/(2.0*np.pi))*Atilde_n # approximation after n terms
     S = _sigmainf(N, h, m, dW, Km0, Pm0)
     normdW2 = np.sum(np.abs(dW)**2, axis=1)
-    radical = np.sqrt(1.0 + normdW2/h).reshape((N, 1, 1))
+    radical = np.sqrt(1.0 + normdW2/_hshape(h, 2)).reshape((N, 1, 1))
     IM = broadcast_to(np.eye(M), (N, M, M))
     Im = broadcast_to(np.eye(m), (N, m, m))
     Ims0 = np.eye(m**2)
     sqrtS = (S + 2.0*radical*IM)/(np.sqrt(2.0)*(1.0 + radical))
-    G = np.random.normal(0.0, 1.0, (N, M, 1))
+    G = _rng(rng).normal(0.0, 1.0, (N, M, 1))
     tailsum = h/(2.0*np.pi)*_a(n)**0.5*_dot(sqrtS, G)
     Atilde = Atilde_n + tailsum # our final approximation of the areas
+    if packed:
+        # the areas above the diagonal, from their rows of (I - P)K^T:
+        i, j = np.triu_indices(m, 1)
+        C = np.dot(Ims0 - Pm0, Km0.T)[j*m + i]
+        A = np.dot(Atilde[..., 0], C.T)
+        return (A, PackedIntegrals(dW.reshape((N, -1)),
+                                   h.ravel() if np.ndim(h) else h, A))
     factor3 = broadcast_to(np.dot(Ims0 - Pm0, Km0.T), (N, m**2, M))
     vecI = 0.5*(_kp(dW, dW) - _vec(h*Im)) + _dot(factor3, Atilde)
     I = _unvec(vecI)
@@ -273,23 +452,377 @@ def Iwik(dW, h, n=5):
     return (Atilde, I)
 
 
-def Jwik(dW, h, n=5):
+def Jwik(dW, h, n=5, packed=False, rng=None):
     """matrix J approximating repeated Stratonovich integrals for each of N
     time intervals, using the method of Wiktorsson (2001).
 
     Args:
       dW (array of shape (N, m)): giving m independent Weiner increments for
         each time step N. (You can make this array using sdeint.deltaW())
-      h (float): the time step size
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time steps.
       n (int, optional): how many terms to take in the series expansion
+      packed (bool, optional): if True, return the integrals as a
+        PackedIntegrals object storing only the Levy areas above the diagonal,
+        instead of as an array of shape (N, m, m).
+      rng (numpy.random.Generator, optional): the random number generator
+        to use. Default the global numpy.random state.
 
     Returns:
       (Atilde, J) where
         Atilde: array of shape (N, m(m-1)/2, 1) giving the area integrals used.
         J: array of shape (N, m, m) giving an m x m matrix of repeated
         Stratonovich integral values for each of the N time intervals.
+      If packed, the areas have shape (N, m(m-1)/2), as for Iwik.
     """
     m = dW.shape[1]
-    Atilde, I = Iwik(dW, h, n)
-    J = I + 0.5*h*np.eye(m).reshape((1, m, m))
+    Atilde, I = Iwik(dW, h, n, packed, rng)
+    if packed:
+        I.stratonovich = True
+        return (Atilde, I)
+    J = I + 0.5*_hshape(h, 3)*np.eye(m).reshape((1, m, m))
     return (Atilde, J)
+
+
+# The code below this point gives simplified random variables for weak schemes.
+
+def deltaW2pt(N, m, h):
+    """Generate two-point distributed increments that can replace the Wiener
+    increments in a weak order 1.0 scheme, for m noise processes and each of N
+    time intervals of length h. Each takes values +sqrt(h) or -sqrt(h) with
+    equal probability (Kloeden and Platen (1999) eqn 14.1.8).
+
+    Returns:
+      dW (array of shape (N, m))
+    """
+    signs = 2.0*np.random.randint(0, 2, (N, m)) - 1.0
+    return np.sqrt(_hshape(h, 2))*signs
+
+
+def deltaW3pt(N, m, h):
+    """Generate three-point distributed increments that can replace the Wiener
+    increments in a weak order 2.0 scheme, for m noise processes and each of N
+    time intervals of length h. Each takes values +sqrt(3h) or -sqrt(3h) with
+    probability 1/6 each and value 0 with probability 2/3 (Kloeden and Platen
+    (1999) eqn 14.2.8).
+
+    Returns:
+      dW (array of shape (N, m))
+    """
+    u = np.random.random_sample((N, m))
+    signs = np.where(u < 1.0/6.0, -1.0, np.where(u < 1.0/3.0, 1.0, 0.0))
+    return np.sqrt(3.0*_hshape(h, 2))*signs
+
+
+def Iweak(dW, h):
+    """matrix I of simplified multiple Ito integrals for each of N time
+    intervals, sufficient for weak order 2.0 schemes (Kloeden and Platen (1999)
+    eqn 14.2.7). I_ij = (dW_i dW_j + V_ij)/2 where the V_ij for i > j are
+    independent two-point random variables taking values h or -h with equal
+    probability, V_ii = -h and V_ij = -V_ji.
+
+    Args:
+      dW (array of shape (N, m)): giving m increments for each time step N.
+        For a weak order 2.0 scheme you can make this using deltaW3pt()
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time steps.
+
+    Returns:
+      (V, I) where
+        V: array of shape (N, m, m) giving the values V_ij that were used.
+        I: array of shape (N, m, m) giving an m x m matrix of simplified
+        repeated Ito integral values for each of the N time intervals.
+    """
+    N = dW.shape[0]
+    m = dW.shape[1]
+    if dW.ndim < 3:
+        dW = dW.reshape((N, -1, 1)) # change to array of shape (N, m, 1)
+    if dW.shape[2] != 1 or dW.ndim > 3:
+        raise(ValueError)
+    h = _hshape(h, 3)
+    V = h*(2.0*np.random.randint(0, 2, (N, m, m)) - 1.0)
+    V = np.tril(V, -1)
+    V = V - _t(V) - h*np.eye(m).reshape((1, m, m))
+    I = 0.5*(_dot(dW, _t(dW)) + V)
+    return (V, I)
+
+
+# The code below this point generates correlated and colored noise processes.
+
+def _cholesky(C, factor):
+    """lower triangular Cholesky factor of covariance C, unless C already is
+    one (factor=True)"""
+    C = np.atleast_2d(np.asarray(C, dtype=float))
+    if factor:
+        return C
+    return np.linalg.cholesky(C)
+
+
+def deltaWcorr(N, C, h, factor=False):
+    """Generate increments of m correlated Wiener processes, whose increments
+    over an interval of length h have covariance matrix C h, for each of N
+    time intervals. These are L dW for independent increments dW, where L is
+    the Cholesky factor of C (C = L L^T).
+
+    To generate many sequences for the same C, compute L once with
+    np.linalg.cholesky(C) and pass it with factor=True.
+
+    Args:
+      N (int): number of time intervals
+      C (array of shape (m, m)): symmetric positive definite correlation
+        matrix, or its lower triangular Cholesky factor if factor is True
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time intervals.
+      factor (bool, optional): whether C is already the Cholesky factor
+
+    Returns:
+      dW (array of shape (N, m))
+    """
+    L = _cholesky(C, factor)
+    return deltaW(N, L.shape[0], h).dot(L.T)
+
+
+def Icorr(dW, h, C, Imethod=Ikpw, n=5, factor=False):
+    """matrix I approximating repeated Ito integrals of correlated Wiener
+    processes W = L V with C = L L^T, given their increments dW (e.g. from
+    deltaWcorr). The independent increments dV are recovered from dW and
+    their integrals I^V computed with Imethod, then I = L I^V L^T (and
+    likewise for the Levy areas). With Imethod=Jkpw or Jwik this gives the
+    Stratonovich integrals J instead.
+
+    Then dW and I can be passed together to any of the integration
+    algorithms, instead of folding the correlation into a dense G.
+
+    Args:
+      dW (array of shape (N, m)): increments of the correlated processes
+      h (float or array of shape (N,)): the time step size, or a different
+        size for each of the N time steps.
+      C (array of shape (m, m)): the correlation matrix, or its Cholesky
+        factor if factor is True
+      Imethod (callable, optional): Ikpw, Iwik, Jkpw or Jwik
+      n (int, optional): how many terms to take in the series expansion
+      factor (bool, optional): whether C is already the Cholesky factor
+
+    Returns:
+      (A, I) where
+        A: array of shape (N, m, m) giving the Levy areas that were used.
+        I: array of shape (N, m, m) giving an m x m matrix of repeated
+        integral values for each of the N time intervals.
+    """
+    L = _cholesky(C, factor)
+    dV = np.linalg.solve(L, dW.T).T
+    A, I = Imethod(dV, h, n)
+    transform = lambda X: np.einsum('ik,nkl,jl->nij', L, X, L)
+    return (transform(A), transform(I))
+
+
+def deltaOU(N, m, h, tau, x0=None):
+    """Generate increments of colored noise: for m independent stationary
+    Ornstein-Uhlenbeck processes X_j with correlation time tau,
+      dX = -X/tau dt + 1/tau dV(t)
+    return the integrals of X over each of N time intervals of length h. These
+    can be passed as dW to the integration algorithms, to solve
+    dy = f(y,t)dt + G(y,t) X(t)dt. As tau -> 0, X tends to white noise and
+    the increments tend to Wiener increments.
+
+    The pair (X, integral of X) is sampled exactly at each step from its
+    Gaussian transition distribution, so there is no discretization error
+    for any h.
+
+    Args:
+      N (int): number of time intervals
+      m (int): number of independent processes
+      h (float): the time step size
+      tau (float): the correlation time
+      x0 (array of shape (m,), optional): initial values of X. If not given,
+        these are drawn from the stationary distribution N(0, 1/(2 tau)).
+
+    Returns:
+      dW (array of shape (N, m))
+    """
+    a = np.exp(-h/tau)
+    var_x = 0.5*(1.0 - a**2)/tau
+    var_z = h - 2.0*tau*(1.0 - a) + 0.5*tau*(1.0 - a**2)
+    cov = 0.5*(1.0 - a)**2
+    # each step draws (xi_x, xi_z) with that covariance, by Cholesky:
+    l11 = np.sqrt(var_x)
+    l21 = cov/l11
+    l22 = np.sqrt(max(var_z - l21**2, 0.0))
+    e1 = np.random.normal(0.0, 1.0, (N, m))
+    e2 = np.random.normal(0.0, 1.0, (N, m))
+    if x0 is None:
+        x = np.random.normal(0.0, np.sqrt(0.5/tau), (m,))
+    else:
+        x = np.array(x0, dtype=float)
+    # X at the end of each step, x_{n+1} = a x_n + l11 e1[n], by a prefix
+    # scan in log2(N) passes: after the pass with shift s, each entry holds
+    # the sum of the last 2s terms of the recursion
+    xs = l11*e1
+    xs[0] += a*x
+    s = 1
+    while s < N and a**s > 0.0:
+        xs[s:] = xs[s:] + a**s*xs[:-s]
+        s *= 2
+    x_start = np.concatenate((x[np.newaxis], xs[:-1]))
+    return tau*(1.0 - a)*x_start + l21*e1 + l22*e2
+
+
+def deltaFBM(N, m, h, hurst):
+    """Generate increments of m independent fractional Brownian motions with
+    Hurst parameter hurst, over each of N time intervals of length h, by the
+    circulant embedding method of Davies and Harte (1987) using the FFT.
+    These can be passed as dW to the integration algorithms (the Euler-type
+    algorithms are appropriate, since the repeated integrals of Wiener
+    processes do not apply). hurst == 0.5 gives Wiener increments.
+
+    Args:
+      N (int): number of time intervals
+      m (int): number of independent processes
+      h (float): the time step size
+      hurst (float): the Hurst parameter, 0 < hurst < 1
+
+    Returns:
+      dW (array of shape (N, m))
+
+    Raises:
+      ValueError
+    """
+    if not 0.0 < hurst < 1.0:
+        raise ValueError('The Hurst parameter must be between 0 and 1.')
+    k = np.arange(N + 1, dtype=float)
+    H2 = 2.0*hurst
+    gamma = 0.5*(np.abs(k + 1)**H2 - 2.0*k**H2 + np.abs(k - 1)**H2)
+    # first row of a circulant matrix of size 2N containing the covariance:
+    row = np.concatenate((gamma, gamma[N-1:0:-1]))
+    lam = np.fft.fft(row).real
+    if lam.min() < -1e-8*lam.max():
+        raise ValueError('Circulant embedding failed.')
+    lam = np.maximum(lam, 0.0)
+    M = len(row)
+    Z = (np.random.normal(0.0, 1.0, (M, m)) +
+         1j*np.random.normal(0.0, 1.0, (M, m)))
+    X = np.fft.fft(np.sqrt(lam/M).reshape((M, 1))*Z, axis=0)[:N].real
+    return h**hurst*X
+
+
+def poissonJumps(t0, t1, rate, marks=None, paths=None):
+    """Generate the jumps of a compound Poisson process with intensity rate
+    on the interval (t0, t1], all at once: the number of jumps is Poisson
+    distributed and their times are then independent and uniform. For an
+    ensemble, the jumps of all P independent paths are generated together
+    and each one is assigned to a path uniformly at random.
+
+    Args:
+      t0, t1 (float): the time interval
+      rate (float): the intensity (expected number of jumps per unit time)
+      marks (callable(K), optional): returns an array whose first axis has
+        length K, giving the random marks (e.g. jump sizes) of K jumps. If not
+        given, every mark is 1.
+      paths (int, optional): the number of paths P of an ensemble
+
+    Returns:
+      (times, marks) where times is an increasing array of the K jump times.
+      For an ensemble (times, path, marks), where path gives the index of the
+      path on which each jump occurs.
+    """
+    P = 1 if paths is None else paths
+    K = np.random.poisson(rate*(t1 - t0)*P)
+    times = np.sort(t1 - np.random.uniform(0.0, t1 - t0, K))
+    xi = np.ones(K) if marks is None else np.asarray(marks(K))
+    if paths is None:
+        return (times, xi)
+    return (times, np.random.randint(0, P, K), xi)
+
+
+class CounterNoise(object):
+    """Counter-based random-access noise. The random numbers for each block
+    of time steps of each sample path come from a Philox generator keyed by
+    (seed, path) with its counter starting at that block, so the Wiener
+    increments and repeated integrals of any block of any path can be
+    generated directly, without generating or storing those before it.
+
+    The result for a given step does not depend on how the steps are split
+    into calls or shared among workers, so noise can be generated in parallel
+    and regenerated (e.g. to replay a path) instead of being stored.
+
+    Args:
+      m (int): number of Wiener processes
+      h (float): the time step size
+      seed (int): the seed, shared by all paths
+      block (int, optional): the number of time steps in each block
+
+    Usage:
+      noise = CounterNoise(m, h, seed=42)
+      dW = noise.deltaW(0, N)  # all N steps of path 0
+      dW, I = noise.integrals(1000, 1500, path=7)
+      dW = noise.deltaW(0, N, path=range(P))  # ensemble, shape (N, P, m)
+    """
+    def __init__(self, m, h, seed, block=64):
+        if np.ndim(h) != 0:
+            raise ValueError('CounterNoise needs a fixed time step size h.')
+        self.m = m
+        self.h = h
+        self.seed = int(seed)
+        self.block = int(block)
+
+    def generator(self, path, block):
+        """The numpy.random.Generator for one block of one path"""
+        key = np.array([self.seed, path], dtype=np.uint64)
+        counter = np.array([0, 0, block, 0], dtype=np.uint64)
+        return np.random.Generator(np.random.Philox(key=key, counter=counter))
+
+    def _path(self, start, stop, path, fn):
+        """Concatenate fn(generator) over the blocks covering steps
+        start..stop-1 of one path, trimmed to those steps"""
+        if not 0 <= start <= stop:
+            raise ValueError('Need 0 <= start <= stop.')
+        first, last = start//self.block, -(-stop//self.block)
+        pieces = [fn(self.generator(path, b)) for b in range(first, last)]
+        if not pieces:
+            pieces = [fn(self.generator(path, first))]
+        offset = first*self.block
+        return tuple(np.concatenate(p)[start - offset:stop - offset]
+                     for p in zip(*pieces))
+
+    def _paths(self, start, stop, path, fn):
+        """As _path, for one path or a sequence of paths (stacked on axis 1)"""
+        if np.ndim(path) == 0:
+            return self._path(start, stop, path, fn)
+        results = [self._path(start, stop, p, fn) for p in path]
+        return tuple(np.stack(r, axis=1) for r in zip(*results))
+
+    def deltaW(self, start, stop, path=0):
+        """Wiener increments for time steps start..stop-1
+
+        Args:
+          start, stop (int): the range of time steps
+          path (int or sequence of int, optional): the sample path, or paths
+            of an ensemble
+
+        Returns:
+          dW (array of shape (stop-start, m), or (stop-start, P, m) for a
+            sequence of P paths)
+        """
+        fn = lambda rng: (deltaW(self.block, self.m, self.h, rng),)
+        return self._paths(start, stop, path, fn)[0]
+
+    def integrals(self, start, stop, path=0, Imethod=Ikpw, n=5):
+        """Wiener increments and repeated integrals for time steps
+        start..stop-1. The increments are the same as from deltaW().
+
+        Args:
+          start, stop (int): the range of time steps
+          path (int or sequence of int, optional): the sample path, or paths
+            of an ensemble
+          Imethod (callable, optional): Ikpw, Iwik, Jkpw or Jwik
+          n (int, optional): number of terms in the series expansion
+
+        Returns:
+          (dW, I) where dW has shape (stop-start, m) and I has shape
+          (stop-start, m, m), with an extra axis of length P after the first
+          for a sequence of P paths
+        """
+        def fn(rng):
+            dW = deltaW(self.block, self.m, self.h, rng)
+            return (dW, Imethod(dW, self.h, n, rng=rng)[1])
+        return self._paths(start, stop, path, fn)